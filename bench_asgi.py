@@ -0,0 +1,137 @@
+import os
+import statistics
+import time
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from wsgiref.util import setup_testing_defaults
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test.utils import override_settings
+from core.models import Institution
+from store.models import Store, Category, Product
+from tribe_trade_backend.asgi import application as asgi_app
+from tribe_trade_backend.wsgi import application as wsgi_app
+
+User = get_user_model()
+
+# A typical gthread deployment: one worker process with a fixed pool of request threads.
+WSGI_THREADS = int(os.getenv('BENCH_WSGI_THREADS', 16))
+# Time each response spends going out to a slow campus connection.
+CLIENT_DELAY = float(os.getenv('BENCH_CLIENT_DELAY', 1.0))
+CONCURRENCY = [16, 64, 256]
+REQUESTS_PER_CLIENT = 2
+PATHS = ['/api/store/marketplace/?page_size=20', '/api/store/aio/marketplace/?page_size=20']
+
+
+def populate():
+    rng = random.Random(3)
+    institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+    circles = [Category.objects.create(name=name, slug=name.lower()) for name in ('Tech', 'Fashion', 'Food')]
+    stores = []
+    for n in range(20):
+        owner = User.objects.create(email=f"plug{n}@bench.com", username=f"plug{n}", is_plug=True)
+        stores.append(Store.objects.create(owner=owner, institution=institution, name=f"Plug {n}"))
+    Product.objects.bulk_create([
+        Product(store=rng.choice(stores), category=rng.choice(circles), name=f"Drop {n}", price=Decimal(rng.randint(500, 90_000)))
+        for n in range(5000)
+    ])
+
+
+def wsgi_request(path):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path.split('?')[0], 'QUERY_STRING': path.partition('?')[2]}
+    setup_testing_defaults(environ)
+    start = time.perf_counter()
+    result = wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    try:
+        for chunk in result:
+            time.sleep(CLIENT_DELAY)  # the worker thread is held while the client drains the body
+    finally:
+        result.close()
+    return (time.perf_counter() - start) * 1000
+
+
+async def asgi_request(path):
+    url, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': url, 'raw_path': url.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    done = asyncio.Event()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and not message.get('more_body'):
+            await asyncio.sleep(CLIENT_DELAY)  # only this coroutine waits on the slow client
+            done.set()
+
+    start = time.perf_counter()
+    await asgi_app(scope, receive, send)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_wsgi(path, clients):
+    # Connections queue for a free request thread, so latency counts from submission.
+    with ThreadPoolExecutor(max_workers=WSGI_THREADS) as pool:
+        def timed(submitted):
+            wsgi_request(path)
+            return (time.perf_counter() - submitted) * 1000
+        futures = [pool.submit(timed, time.perf_counter()) for _ in range(clients * REQUESTS_PER_CLIENT)]
+        samples = [future.result() for future in futures]
+    connections.close_all()
+    return samples
+
+
+def run_asgi(path, clients):
+    async def client():
+        return [await asgi_request(path) for _ in range(REQUESTS_PER_CLIENT)]
+
+    async def main():
+        return [ms for batch in await asyncio.gather(*(client() for _ in range(clients))) for ms in batch]
+    return asyncio.run(main())
+
+
+def report(label, clients, run):
+    started = time.perf_counter()
+    samples = sorted(run())
+    wall = time.perf_counter() - started
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<22}{clients:>8}{len(samples) / wall:>10.0f}{statistics.median(samples):>10.0f}{p99:>10.0f}")
+
+
+def run_benchmark():
+    print(f"--- Marketplace Read Path: WSGI ({WSGI_THREADS} threads) vs ASGI, {CLIENT_DELAY * 1000:.0f} ms slow clients ---")
+    print(f"{'deployment':<22}{'clients':>8}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    sync_path, async_path = PATHS
+    for clients in CONCURRENCY:
+        report('WSGI, sync views', clients, lambda: run_wsgi(sync_path, clients))
+        report('ASGI, sync views', clients, lambda: run_asgi(sync_path, clients))
+        report('ASGI, async views', clients, lambda: run_asgi(async_path, clients))
+
+
+if __name__ == "__main__":
+    # Run against a throwaway database so the dev data is untouched.
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        populate()
+        # Measure the database read path, not the response cache in front of it.
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}, DEBUG=False):
+            run_benchmark()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,132 @@
+import os
+import statistics
+import time
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.db import connection
+from django.http import JsonResponse
+from django.test.utils import override_settings
+from django.urls import include, path
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from tribe_trade_backend.asgi import application
+from users import hashing
+from users.models import identity_key
+
+User = get_user_model()
+
+CONCURRENCY = int(os.getenv('BENCH_CONCURRENCY', 200))
+# Full-strength PBKDF2 makes 200 logins take minutes on a small box; the comparison holds at any cost.
+ITERATIONS = int(os.getenv('BENCH_PBKDF2_ITERATIONS', 50_000))
+
+
+class BenchHasher(PBKDF2PasswordHasher):
+    iterations = ITERATIONS
+
+
+@csrf_exempt
+def sync_login(request):
+    """The login view as it was: hashing on the request thread."""
+    data = json.loads(request.body)
+    user = User.objects.select_related('institution').filter(username_key=identity_key(data['username'])).first()
+    if user and user.check_password(data['password']):
+        token, created = Token.objects.get_or_create(user=user)
+        return JsonResponse({'token': token.key})
+    return JsonResponse({}, status=400)
+
+
+urlpatterns = [
+    path('bench/sync-login/', sync_login),
+    path('', include('tribe_trade_backend.urls')),
+]
+
+
+async def request(method, url, body=b''):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': url, 'raw_path': url.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json')],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+    }
+    done = asyncio.Event()
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    result = {}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+        elif not message.get('more_body'):
+            done.set()
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    return result['status'], (time.perf_counter() - start) * 1000
+
+
+async def storm(url):
+    body = json.dumps({'username': 'student', 'password': 'campus-rush-2026'}).encode()
+    logins = [request('POST', url, body) for _ in range(CONCURRENCY)]
+
+    async def probe():
+        # A cheap read issued mid-storm: is the server still answering anyone else?
+        await asyncio.sleep(0.05)
+        return await request('GET', '/api/core/institutions/')
+
+    started = time.perf_counter()
+    *results, (_, probe_ms) = await asyncio.gather(*logins, probe())
+    wall = time.perf_counter() - started
+    ok = sorted(ms for status, ms in results if status == 200)
+    rejected = sum(1 for status, _ in results if status == 503)
+    p50 = statistics.median(ok) if ok else 0
+    p99 = ok[max(0, int(len(ok) * 0.99) - 1)] if ok else 0
+    return len(ok), rejected, p50, p99, probe_ms, wall
+
+
+def run_benchmark():
+    user = User(email='student@campus.edu.ng', username='student')
+    user.set_password('campus-rush-2026')
+    user.save()
+
+    print(f"--- Login Storm Benchmark ({CONCURRENCY} concurrent, PBKDF2 x{ITERATIONS:,}, "
+          f"{hashing.pool.executor._max_workers} hash workers, admit {hashing.pool.max_pending}) ---")
+    print(f"{'view':<28}{'ok':>5}{'503':>6}{'p50 (ms)':>10}{'p99 (ms)':>10}{'probe (ms)':>12}{'wall (s)':>10}")
+    admit = hashing.pool.max_pending
+    runs = (
+        ('sync, hashing on request', '/bench/sync-login/', admit),
+        ('async, no admission limit', '/api/users/login/', CONCURRENCY),
+        ('async, bounded pool', '/api/users/login/', admit),
+    )
+    for label, url, max_pending in runs:
+        hashing.pool.max_pending = max_pending
+        ok, rejected, p50, p99, probe_ms, wall = asyncio.run(storm(url))
+        print(f"{label:<28}{ok:>5}{rejected:>6}{p50:>10.0f}{p99:>10.0f}{probe_ms:>12.0f}{wall:>10.2f}")
+    hashing.pool.max_pending = admit
+
+
+if __name__ == "__main__":
+    # Run against a throwaway database so the dev data is untouched.
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(ROOT_URLCONF='__main__', PASSWORD_HASHERS=['__main__.BenchHasher'], DEBUG=False):
+            run_benchmark()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
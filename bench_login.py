@@ -0,0 +1,77 @@
+import os
+import statistics
+import time
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+import uuid
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from users.models import identity_key
+
+User = get_user_model()
+
+USERS = int(os.getenv('BENCH_USERS', 1_000_000))
+RUNS = 10  # the iexact scans take seconds each at 1M users
+
+
+def populate():
+    print(f"Seeding {USERS:,} users...")
+    batch = []
+    for n in range(USERS):
+        email, username = f"Student{n}@Campus.edu.ng", f"Student{n}"
+        # bulk_create skips save(), so set the keys the way it would.
+        batch.append(User(
+            id=uuid.uuid4(), email=email, username=username, password='!',
+            email_key=identity_key(email), username_key=identity_key(username),
+        ))
+        if len(batch) == 10_000:
+            User.objects.bulk_create(batch)
+            batch = []
+    User.objects.bulk_create(batch)
+
+
+def iexact(identity):
+    """The lookup login used to run: email first, then username, both case-insensitive."""
+    identity = identity.strip()
+    return (
+        User.objects.filter(email__iexact=identity.lower()).first()
+        or User.objects.filter(username__iexact=identity).first()
+    )
+
+
+def keyed(identity):
+    identity = identity_key(identity)
+    matches = User.objects.filter(Q(email_key=identity) | Q(username_key=identity))[:2]
+    return min(matches, key=lambda match: match.email_key != identity, default=None)
+
+
+def timed(lookup, identity):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        lookup(identity)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_benchmark():
+    print("--- Login Lookup Benchmark ---")
+    print(f"{'identity':<32}{'iexact (ms)':>14}{'keyed (ms)':>12}{'speedup':>10}")
+    for identity in (f"student{USERS // 2}@campus.edu.ng", f"STUDENT{USERS - 1}", "nobody@campus.edu.ng"):
+        old, new = timed(iexact, identity), timed(keyed, identity)
+        print(f"{identity:<32}{old:>14.2f}{new:>12.3f}{old / new:>9.0f}x")
+
+
+if __name__ == "__main__":
+    # Run against a throwaway database so the dev data is untouched.
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        populate()
+        run_benchmark()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,112 @@
+import os
+import random
+import statistics
+import time
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from core.models import Institution
+from store.models import Store, Category, Product
+from store.search import create_index, search_products
+from store.views import marketplace_queryset
+
+User = get_user_model()
+
+PRODUCTS = int(os.getenv('BENCH_PRODUCTS', 100_000))
+RUNS = 20
+# Common terms match thousands of drops; rare ones match a handful, which is where a
+# LIKE '%term%' scan has to read the whole table before it can fill a page.
+TERMS = ['macbook', 'iphone charger', 'ankara', 'textbook calculus', 'sneak', 'playstation', 'drone', 'zzzz']
+
+ADJECTIVES = ['Used', 'Brand New', 'Fairly Used', 'Premium', 'Budget', 'Original', 'Vintage', 'Limited']
+ITEMS = ['MacBook Pro', 'iPhone Charger', 'Ankara Dress', 'Jollof Rice Tray', 'Calculus Textbook', 'Sneakers',
+         'Hoodie', 'Power Bank', 'Reading Lamp', 'Mini Fridge', 'Hair Braids', 'Perfume Oil', 'Gas Cooker']
+RARE_ITEMS = ['PlayStation 5', 'DJI Drone']
+CIRCLES = ['Tech', 'Fashion', 'Food', 'Books', 'Beauty', 'Hostel Essentials']
+
+
+def populate():
+    print(f"Seeding {PRODUCTS:,} drops...")
+    institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+    circles = [Category.objects.create(name=name, slug=name.lower().replace(' ', '-')) for name in CIRCLES]
+    rng = random.Random(7)
+    stores = []
+    for n in range(200):
+        owner = User(email=f"plug{n}@bench.com", username=f"plug{n}", is_plug=True)
+        owner.set_unusable_password()
+        owner.save()
+        stores.append(Store.objects.create(owner=owner, institution=institution, name=f"{rng.choice(ITEMS)} Plug {n}"))
+
+    batch = []
+    for n in range(PRODUCTS):
+        item = rng.choice(RARE_ITEMS) if rng.random() < 0.001 else rng.choice(ITEMS)
+        batch.append(Product(
+            store=rng.choice(stores),
+            category=rng.choice(circles),
+            name=f"{rng.choice(ADJECTIVES)} {item}",
+            description=f"{item} in great condition, pickup on campus or delivery to your hostel.",
+            price=Decimal(rng.randint(500, 900_000)),
+            is_awoof=rng.random() < 0.01,
+        ))
+        if len(batch) == 5000:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+
+    # bulk_create skips the signals that maintain the index, so build it in one pass.
+    with connection.schema_editor() as editor:
+        create_index(editor)
+
+
+def icontains(queryset, term, limit):
+    condition = Q()
+    for word in term.split():
+        condition &= (
+            Q(name__icontains=word) | Q(description__icontains=word)
+            | Q(store__name__icontains=word) | Q(category__name__icontains=word)
+        )
+    return queryset.filter(condition).order_by('-created_at', '-id')[:limit]
+
+
+def timed(strategy, term, params):
+    queryset = marketplace_queryset(params)
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        list(strategy(queryset, term, 50))
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_benchmark():
+    # The marketplace searches within the buyer's filters: all drops, one circle (a sixth
+    # of them) and awoof deals (one in a hundred), where most top matches get filtered out.
+    scopes = [
+        ('all', {}),
+        ('circle', {'circle': Category.objects.get(name='Tech').id}),
+        ('awoof', {'awoof': '1'}),
+    ]
+    for scope, params in scopes:
+        print(f"--- Marketplace Search Benchmark ({scope}) ---")
+        print(f"{'term':<20}{'fts5 (ms)':>12}{'icontains (ms)':>16}{'speedup':>10}")
+        for term in TERMS:
+            fts = timed(search_products, term, params)
+            scan = timed(icontains, term, params)
+            print(f"{term:<20}{fts:>12.2f}{scan:>16.2f}{scan / fts:>9.1f}x")
+
+
+if __name__ == "__main__":
+    # Run against a throwaway database so the dev data is untouched.
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        populate()
+        run_benchmark()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
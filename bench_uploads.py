@@ -0,0 +1,118 @@
+import io
+import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+from django.core.handlers.wsgi import WSGIRequest
+from PIL import Image
+from rest_framework.exceptions import APIException
+from core.uploads import BoundedUploadHandler
+
+CONCURRENCY = int(os.getenv('BENCH_CONCURRENCY', 32))
+MB = 1024 * 1024
+BOUNDARY = 'BenchBoundary7MA4YWxkTrZu0gW'
+FIELDS = ('image', 'image2', 'image3', 'image4', 'image5')
+# Drop form submissions: five phone photos, a form small enough (under 2.5MB in all) for
+# Django's in-memory handler, and five photos far over the limits.
+SCENARIOS = [('5 x 8MB', 8 * MB), ('5 x 400KB', 400 * 1024), ('5 x 30MB', 30 * MB)]
+
+ZEROS = memoryview(bytes(MB))
+
+
+def photo_head():
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), 'orange').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+HEAD = photo_head()
+
+
+class UploadBody(io.RawIOBase):
+    """A multipart body generated as it is read, so the client side holds almost nothing."""
+
+    def __init__(self, file_size):
+        self.pieces = []
+        for field in FIELDS:
+            self.pieces.append(memoryview((
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{field}"; filename="{field}.jpg"\r\n'
+                f'Content-Type: image/jpeg\r\n\r\n'
+            ).encode()))
+            self.pieces.append(memoryview(HEAD))
+            padding = file_size - len(HEAD)
+            # Views of one shared block of zeros: the padding costs no memory of its own.
+            self.pieces += [ZEROS] * (padding // MB) + [ZEROS[:padding % MB]]
+            self.pieces.append(memoryview(b'\r\n'))
+        self.pieces.append(memoryview(f'--{BOUNDARY}--\r\n'.encode()))
+        self.length = sum(len(piece) for piece in self.pieces)
+        self.iterator = iter(self.pieces)
+        self.piece, self.offset = memoryview(b''), 0
+        self.consumed = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        out = bytearray()
+        while size < 0 or len(out) < size:
+            if self.offset == len(self.piece):
+                self.piece, self.offset = next(self.iterator, None), 0
+                if self.piece is None:
+                    self.piece = memoryview(b'')
+                    break
+            take = len(self.piece) - self.offset if size < 0 else min(size - len(out), len(self.piece) - self.offset)
+            out += self.piece[self.offset:self.offset + take]
+            self.offset += take
+        self.consumed += len(out)
+        return bytes(out)
+
+
+def upload(file_size, bounded):
+    """Parse one drop form submission; returns (bytes read from the socket, accepted)."""
+    body = UploadBody(file_size)
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/store/my-drops/', 'SERVER_NAME': 'bench', 'SERVER_PORT': '80',
+        'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}', 'CONTENT_LENGTH': str(body.length),
+        'wsgi.input': body, 'wsgi.url_scheme': 'http',
+    })
+    if bounded:
+        request.upload_handlers = [BoundedUploadHandler(request)]
+    try:
+        files = request.FILES
+    except APIException:
+        return body.consumed, False
+    for upload in files.values():
+        upload.close()
+    return body.consumed, True
+
+
+def run(file_size, bounded):
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(lambda _: upload(file_size, bounded), range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    read = sum(consumed for consumed, _ in results)
+    accepted = sum(ok for _, ok in results)
+    return peak / MB, elapsed, read / MB, accepted
+
+
+def run_benchmark():
+    print(f"--- Multipart Upload Benchmark ({CONCURRENCY} concurrent drop forms) ---")
+    print(f"{'payload':<11}{'handlers':<10}{'peak heap (MB)':>16}{'time (s)':>10}{'body read (MB)':>16}{'accepted':>10}")
+    for label, file_size in SCENARIOS:
+        for name, bounded in (('django', False), ('bounded', True)):
+            peak, elapsed, read, accepted = run(file_size, bounded)
+            print(f"{label:<11}{name:<10}{peak:>16.1f}{elapsed:>10.2f}{read:>16.0f}{accepted:>7}/{CONCURRENCY}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
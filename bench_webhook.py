@@ -0,0 +1,102 @@
+import os
+import statistics
+import time
+import django
+
+# Setup Django environment
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tribe_trade_backend.settings')
+django.setup()
+
+import json
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from core.models import Institution
+from orders.models import Order, OrderItem
+from orders.settlement import process_batch
+from store import balances
+from store.models import Store, Product, LedgerEntry
+
+User = get_user_model()
+
+RUNS = 10
+# (items in the order, plugs they are spread across)
+SHAPES = [(1, 1), (20, 3), (100, 5), (500, 10)]
+
+
+def populate():
+    institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+    citizen = User.objects.create(email="citizen@bench.com", username="citizen")
+    stores = []
+    for n in range(max(plugs for _, plugs in SHAPES)):
+        owner = User.objects.create(email=f"plug{n}@bench.com", username=f"plug{n}", is_plug=True, is_citizen=False)
+        store = Store.objects.create(owner=owner, institution=institution, name=f"Plug {n}")
+        stores.append((store, Product.objects.create(store=store, name=f"Drop {n}", price=Decimal('2500.00'))))
+    return citizen, stores
+
+
+def place_order(citizen, stores, items, plugs, ref):
+    order = Order.objects.create(customer=citizen, total_amount=0, payment_ref=ref)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=stores[n % plugs][1], store=stores[n % plugs][0], quantity=1)
+        for n in range(items)
+    ])
+    return order
+
+
+def per_item(ref):
+    """The settlement loop this webhook used to run: one credit per item, under the order's row lock."""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(payment_ref=ref)
+        if not order.is_paid:
+            order.is_paid = True
+            order.save(update_fields=['is_paid'])
+            for item in order.items.all():
+                balances.lock_in_escrow(item.store_id, item.product.price * item.quantity, order=order, order_item=item)
+
+
+def per_store(ref):
+    """The webhook as it runs now: record the event, then one inbox pass settles it with a credit per store."""
+    payload = {'event': 'charge.completed', 'data': {'id': f"tx-{ref}", 'status': 'successful', 'tx_ref': ref}}
+    response = Client().post('/api/orders/payments/webhook/', json.dumps(payload), content_type='application/json')
+    assert response.status_code == 200, f"webhook answered {response.status_code}"
+    outcome = process_batch()
+    assert outcome == {'processed': 1, 'retried': 0, 'failed': 0}, f"inbox pass {outcome}"
+
+
+def timed(settle, citizen, stores, items, plugs):
+    samples, queries = [], 0
+    for run in range(RUNS):
+        ref = f"{settle.__name__}-{items}-{run}"
+        place_order(citizen, stores, items, plugs, ref)
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            settle(ref)
+            samples.append((time.perf_counter() - start) * 1000)
+        queries = len(captured)
+        order = Order.objects.get(payment_ref=ref)
+        assert order.is_paid, f"{ref} was not settled"
+        assert LedgerEntry.objects.filter(order=order, account='ESCROW').aggregate(total=Sum('amount'))['total'] == Decimal('2500.00') * items
+    return statistics.median(samples), queries
+
+
+def run_benchmark(citizen, stores):
+    print("--- Webhook Settlement Benchmark ---")
+    print(f"{'items/plugs':<14}{'per-item (ms)':>15}{'queries':>9}{'inbox (ms)':>16}{'queries':>9}")
+    for items, plugs in SHAPES:
+        old_ms, old_queries = timed(per_item, citizen, stores, items, plugs)
+        new_ms, new_queries = timed(per_store, citizen, stores, items, plugs)
+        print(f"{f'{items}/{plugs}':<14}{old_ms:>15.2f}{old_queries:>9}{new_ms:>16.2f}{new_queries:>9}")
+
+
+if __name__ == "__main__":
+    # Run against a throwaway database so the dev data is untouched.
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        run_benchmark(*populate())
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
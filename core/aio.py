@@ -0,0 +1,79 @@
+"""
+Async-native read views for the public catalog endpoints.
+
+They sit alongside the DRF views (mounted under `aio/`) and return the same
+payloads, but load rows with Django's async ORM and the async cache API, so under
+asgi.py an in-flight request holds no thread of its own. Under WSGI they still
+work; Django runs them in a per-request event loop.
+"""
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from .cache import anamespace_version, cache_key, cached_response, etag_for, response_cache
+
+
+class AsyncReadView(View):
+    """
+    GET-only base: subclasses provide `get_queryset(request)` and `serializer_class`
+    (and optionally a `detail_serializer_class` for single rows).
+    A `pk` URL kwarg retrieves one row; otherwise the (optionally paginated) list is
+    served, cached under `cache_namespace` exactly like CachedListMixin.
+    """
+    http_method_names = ['get', 'head', 'options']
+    serializer_class = None
+    detail_serializer_class = None
+    pagination_class = None
+    cache_namespace = None
+    renderer = JSONRenderer()
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    async def get(self, request, pk=None, **kwargs):
+        request = Request(request)
+        try:
+            if pk is not None:
+                return JsonResponse(await self.retrieve(request, pk))
+            if self.cache_namespace is None:
+                return JsonResponse(await self.list(request), safe=False)
+            return await self.cached_list(request)
+        except Http404:
+            model = self.get_queryset(request).model
+            return JsonResponse({'detail': f"No {model._meta.object_name} matches the given query."}, status=404)
+        except APIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+
+    async def cached_list(self, request):
+        cache = response_cache()
+        key = cache_key(self.cache_namespace, await anamespace_version(self.cache_namespace), request)
+        cached = await cache.aget(key)
+        if cached is None:
+            content = self.renderer.render(await self.list(request))
+            cached = (etag_for(content), content)
+            await cache.aset(key, cached, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        etag, content = cached
+        return cached_response(request, etag, content, self.renderer.media_type)
+
+    async def list(self, request):
+        queryset = self.get_queryset(request)
+        if self.pagination_class is None:
+            return self.serialize([row async for row in queryset], request, many=True)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, self)
+        return paginator.get_paginated_response(self.serialize(page, request, many=True)).data
+
+    async def retrieve(self, request, pk):
+        queryset = self.get_queryset(request)
+        try:
+            instance = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise Http404
+        return self.serialize(instance, request)
+
+    def serialize(self, data, request, many=False):
+        # Rows arrive fully loaded (select_related/prefetch_related), so this touches no database.
+        serializer_class = self.serializer_class if many else (self.detail_serializer_class or self.serializer_class)
+        return serializer_class(data, many=many, context={'request': request, 'view': self}).data
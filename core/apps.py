@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .signals import (
+            connect_council_stats, connect_activity_feed, connect_response_cache, connect_event_stream, connect_tombstones,
+            connect_blob_refcounts,
+        )
+        connect_council_stats()
+        connect_activity_feed()
+        connect_response_cache()
+        connect_event_stream()
+        connect_tombstones()
+        connect_blob_refcounts()
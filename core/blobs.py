@@ -0,0 +1,120 @@
+"""
+Reference counts for content-addressed media (see core.storage).
+
+`StoredBlob.refcount` is the number of model file fields naming a blob, kept up to
+date by core.signals.connect_blob_refcounts and by the writers that store names
+outside file fields (the photo variants in store.images). Counts only gate garbage
+collection, so `recount()` can always rebuild them from the rows themselves.
+"""
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, FileField
+from django.utils import timezone
+from .models import StoredBlob
+
+# An unreferenced blob is kept this long: its upload may belong to a transaction
+# that hasn't committed yet, or be about to be reused by an identical upload.
+GC_GRACE = timedelta(hours=24)
+
+
+def tracked_fields():
+    """`{model: [field names]}` for every file field stored in content-addressed storage (core.storage, core.s3)."""
+    tracked = {}
+    for model in apps.get_models():
+        fields = [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and getattr(field.storage, 'content_addressed', False)
+        ]
+        if fields:
+            tracked[model] = fields
+    return tracked
+
+
+def register(name, size):
+    now = timezone.now()
+    if not StoredBlob.objects.filter(name=name).update(written_at=now):
+        StoredBlob.objects.bulk_create([StoredBlob(name=name, size=size, written_at=now)], ignore_conflicts=True)
+
+
+def _adjust(names, sign):
+    for name, count in Counter(name for name in names if name).items():
+        StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + sign * count)
+
+
+def retain(names):
+    _adjust(names, 1)
+
+
+def release(names):
+    _adjust(names, -1)
+
+
+def references():
+    """Count every stored name the database points at, streaming the rows."""
+    from store.images import variant_names  # photo variants are named in a JSON column
+    counts = Counter()
+    for model, fields in tracked_fields().items():
+        for row in model._default_manager.values_list(*fields).iterator(chunk_size=2000):
+            counts.update(name for name in row if name)
+    ProductImage = apps.get_model('store', 'ProductImage')
+    for variants in ProductImage.objects.exclude(variants={}).values_list('variants', flat=True).iterator(chunk_size=2000):
+        counts.update(variant_names(variants))
+    return counts
+
+
+@transaction.atomic
+def recount():
+    counts = references()
+    StoredBlob.objects.update(refcount=0)
+    for name, count in counts.items():
+        StoredBlob.objects.filter(name=name).update(refcount=count)
+    return counts
+
+
+def adopt_strays(storage, grace=GC_GRACE, dry_run=False, batch_size=500):
+    """
+    Register stored files that have no StoredBlob row and are older than `grace`, so
+    collect_garbage deletes them. A save inside a transaction that rolls back leaves one:
+    the file is written at once, but its row goes with the transaction. Returns how many.
+    """
+    cutoff = timezone.now() - grace
+    adopted = 0
+    files = (entry for entry in storage.content_files() if entry[2] < cutoff)
+    while True:
+        batch = list(islice(files, batch_size))
+        if not batch:
+            return adopted
+        known = set(StoredBlob.objects.filter(name__in=[name for name, _, _ in batch]).values_list('name', flat=True))
+        strays = {name: StoredBlob(name=name, size=size, written_at=modified) for name, size, modified in batch if name not in known}
+        if strays and not dry_run:
+            # Nothing should point at a stray, but count any row that does rather than delete under it.
+            for model, fields in tracked_fields().items():
+                for field in fields:
+                    for name in model._default_manager.filter(**{f'{field}__in': list(strays)}).values_list(field, flat=True):
+                        strays[name].refcount += 1
+            # A save that registers one meanwhile wins the insert; its row is left alone.
+            StoredBlob.objects.bulk_create(strays.values(), ignore_conflicts=True)
+        adopted += len(strays)
+
+
+def collect_garbage(storage, grace=GC_GRACE, dry_run=False):
+    """Delete blobs unreferenced for longer than `grace`. Returns (files, bytes)."""
+    cutoff = timezone.now() - grace
+    orphans = StoredBlob.objects.filter(refcount__lte=0, written_at__lt=cutoff)
+    deleted = reclaimed = 0
+    for blob in orphans.iterator(chunk_size=500):
+        if not dry_run:
+            # Re-check in the DELETE itself: a new reference or re-upload may have landed since.
+            # The file goes inside the same transaction, so the row stays locked until it is
+            # gone: a concurrent save of the same bytes waits in register() and then writes
+            # the file afresh, rather than finding it and skipping the write (see core.storage).
+            with transaction.atomic():
+                if not StoredBlob.objects.filter(pk=blob.pk, refcount__lte=0, written_at__lt=cutoff).delete()[0]:
+                    continue
+                storage.delete(blob.name)
+        deleted += 1
+        reclaimed += blob.size
+    return deleted, reclaimed
@@ -0,0 +1,93 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def namespace_version(namespace):
+    """
+    Responses are stored under the current version of their namespace, so invalidating
+    a namespace is one write that orphans every stored page at once.
+    Versions are timestamps rather than counters so an evicted version key can never
+    be reset back onto stale pages.
+    """
+    return response_cache().get_or_set(f'respcache:{namespace}:version', time.time_ns)
+
+
+async def anamespace_version(namespace):
+    return await response_cache().aget_or_set(f'respcache:{namespace}:version', time.time_ns)
+
+
+def cache_key(namespace, version, request):
+    # Bodies carry absolute URLs (cursor links, photos), so the origin is part of the key:
+    # the same API is reached as localhost and by LAN IP.
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(repr((request.scheme, request.get_host(), request.path, params)).encode()).hexdigest()
+    return f'respcache:{namespace}:{version}:{digest}'
+
+
+def etag_for(content):
+    return f'"{hashlib.md5(content).hexdigest()}"'
+
+
+def cached_response(request, etag, content, content_type):
+    """The stored body, or a bare 304 when the client already holds it."""
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def invalidate(*namespaces):
+    def bump():
+        cache = response_cache()
+        for namespace in namespaces:
+            cache.set(f'respcache:{namespace}:version', time.time_ns(), None)
+    # Bump now so this connection reads its own write, and again on commit because a
+    # concurrent reader may have re-cached the pre-commit rows in between.
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedListMixin:
+    """
+    Caches the rendered JSON body of a public list endpoint, keyed on its origin and query params,
+    and answers `If-None-Match` with 304 so clients can skip the payload entirely.
+    Set `cache_namespace`; writes to the models feeding it call `invalidate()` (see core.signals).
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        cache = response_cache()
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = renderer.render(response.data, request.accepted_media_type, {
+                'request': request, 'response': response, 'view': self,
+            })
+            cached = (etag_for(content), content)
+            cache.set(key, cached, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+        etag, content = cached
+        return cached_response(request, etag, content, renderer.media_type)
+
+    def response_cache_key(self, request):
+        return cache_key(self.cache_namespace, namespace_version(self.cache_namespace), request)
@@ -0,0 +1,136 @@
+"""
+In-process pub/sub behind the dashboard event streams (Server-Sent Events).
+
+Model writes call publish(), which delivers once the surrounding transaction
+commits; each open stream holds a bounded queue on its event loop, so an idle
+dashboard costs one parked coroutine and no queries.
+
+Delivery is best effort and per process: clients refetch whenever their stream
+(re)connects and on `resync`, so a missed event only delays an update. Running
+several web processes needs a shared broker (e.g. Redis pub/sub) in place of
+this one.
+
+Streams are long-lived, so they are only served under ASGI (tribe_trade_backend.asgi,
+e.g. `uvicorn tribe_trade_backend.asgi:application`). Under runserver or another WSGI
+server they answer 503 at once and the screens keep polling.
+
+EventSource can't send headers, so a stream authenticates with a short-lived signed
+ticket in the query string (see issue_ticket) rather than the API token, which would
+otherwise end up in access and proxy logs.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+COUNCIL = 'council'
+
+TICKET_SALT = 'core.events.stream'
+# Long enough to open the stream right after asking; clients fetch a new one per connect.
+TICKET_MAX_AGE = 60
+
+
+def plug_channel(store_id):
+    return f'plug:{store_id}'
+
+
+def citizen_channel(user_id):
+    return f'citizen:{user_id}'
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class Subscription:
+    def __init__(self, channels, maxsize):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.stale = False
+
+    def offer(self, message):
+        """Runs on the subscriber's loop. A stream that falls behind is told to refetch instead."""
+        if self.stale:
+            if not self.queue.empty():
+                return  # the pending resync already covers this
+            self.stale = False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event(0, 'resync', {}))
+            self.stale = True
+
+
+class Broker:
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        subscription = Subscription(tuple(channels), self.maxsize)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].discard(subscription)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+    def publish_now(self, channel, event, data):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        if not subscribers:
+            return
+        message = format_event(next(self.ids), event, data)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The stream's loop has closed; its finally block will unsubscribe it.
+                pass
+
+
+broker = Broker()
+
+
+def watched():
+    """Whether any stream is open, so callers can skip building a payload nobody reads."""
+    return bool(broker.subscribers)
+
+
+def publish(channels, event, data=None):
+    """Send `event` to every stream on `channels` once the current transaction commits."""
+    if isinstance(channels, str):
+        channels = [channels]
+    if not any(channel in broker.subscribers for channel in channels):
+        return  # nobody is watching; a stream that opens later starts from a fresh fetch
+
+    def send():
+        for channel in channels:
+            broker.publish_now(channel, event, data or {})
+    transaction.on_commit(send)
+
+
+def issue_ticket(user):
+    return signing.dumps({'user': str(user.pk)}, salt=TICKET_SALT)
+
+
+def redeem_ticket(ticket):
+    """The user id a stream ticket was issued to, or None if it is forged or expired."""
+    try:
+        return signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_MAX_AGE)['user']
+    except signing.BadSignature:
+        return None
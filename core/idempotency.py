@@ -0,0 +1,87 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+
+class IdempotentCreateMixin:
+    """
+    Honour an `Idempotency-Key` header on create: the first request claims the key,
+    and retries of it replay the stored response instead of writing again.
+
+    The write and the stored response commit together, so a claim that is still
+    unanswered after IDEMPOTENCY_LOCK_TIMEOUT belongs to a request that died without
+    writing anything, and the next retry takes it over. Until then, concurrent
+    duplicates get 409 and should retry shortly.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key must be at most 255 characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        endpoint = f"{request.method} {request.path}"
+        fingerprint = hashlib.sha256(json.dumps(request.data, sort_keys=True, default=str).encode()).hexdigest()
+        now = timezone.now()
+
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is not None and record.created_at < now - key_ttl():
+            record.delete()
+            record = None
+
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, endpoint=endpoint, fingerprint=fingerprint, created_at=now,
+                    )
+            except IntegrityError:
+                # A concurrent duplicate claimed the key first.
+                record = IdempotencyKey.objects.get(user=request.user, key=key)
+            else:
+                return self.create_once(record, request, *args, **kwargs)
+
+        if record.endpoint != endpoint or record.fingerprint != fingerprint:
+            return Response(
+                {"error": "This Idempotency-Key was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record.status_code is None:
+            abandoned = IdempotencyKey.objects.filter(
+                pk=record.pk, status_code__isnull=True, created_at__lt=now - lock_timeout(),
+            ).update(created_at=now)
+            if abandoned:
+                return self.create_once(record, request, *args, **kwargs)
+            return Response(
+                {"error": "A request with this Idempotency-Key is still being processed."},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+    def create_once(self, record, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['status_code', 'response_body'])
+        except Exception:
+            # Nothing was written, so release the key for the client's next attempt.
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        return response
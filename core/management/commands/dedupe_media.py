@@ -0,0 +1,149 @@
+import hashlib
+import os
+import shutil
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from core import blobs
+from core.cache import invalidate
+from core.storage import CHUNK_SIZE, content_name, is_content_name
+from users.authentication import evict
+
+
+def files_under(root):
+    """Yield media paths lazily, so the walk never holds the whole tree in memory."""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for file in sorted(files):
+            yield os.path.join(directory, file)
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media saved before content-addressed storage to content names in one streaming pass: "
+        "identical files collapse into one, rows are repointed and reference counts rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Files repointed per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be reclaimed.")
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        self.dry_run = options['dry_run']
+        self.seen = set()
+        self.stats = {'files': 0, 'duplicates': 0, 'reclaimed': 0}
+        self.variant_photos = {} if self.dry_run else self.legacy_variants()
+        batch = {}
+        for path in files_under(root):
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if is_content_name(name) or name.endswith('.upload'):
+                continue
+            directory, extension = os.path.dirname(name), os.path.splitext(name)[1]
+            target = content_name(directory, sha256_of(path), extension)
+            batch[name] = (target, os.path.getsize(path))
+            if len(batch) >= options['batch_size']:
+                self.flush(root, batch)
+                batch = {}
+        self.flush(root, batch)
+
+        if not self.dry_run:
+            self.requeue_variants()
+            blobs.recount()
+            invalidate('marketplace')
+        verb = "Would reclaim" if self.dry_run else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.stats['files']} files moved to content names, {self.stats['duplicates']} duplicates. "
+            f"{verb} {self.stats['reclaimed'] / 1024 / 1024:.1f} MiB."
+        ))
+
+    def flush(self, root, batch):
+        # A dry run writes nothing, so it has to remember the targets it has already counted.
+        seen = self.seen if self.dry_run else set()
+        for name, (target, size) in batch.items():
+            self.stats['files'] += 1
+            if target in seen or os.path.exists(os.path.join(root, target)):
+                self.stats['duplicates'] += 1
+                self.stats['reclaimed'] += size
+            seen.add(target)
+        if self.dry_run or not batch:
+            return
+
+        # 1. Make sure every content-named copy exists (a hard link costs no space).
+        #    Registered first, as ContentAddressedStorage does, so a concurrent gc_media can't delete it after the check.
+        for name, (target, size) in batch.items():
+            target_path = os.path.join(root, target)
+            with transaction.atomic():
+                blobs.register(target, size)
+                if not os.path.exists(target_path):
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    try:
+                        os.link(os.path.join(root, name), target_path)
+                    except OSError:
+                        shutil.copyfile(os.path.join(root, name), target_path)
+
+        # 2. Repoint the rows. A crash before step 3 leaves both names on disk; rerunning finishes the job.
+        #    auto_now fields are set by hand (.update() skips them), so `?since=` clients pick up the new names.
+        renamed = {name: target for name, (target, size) in batch.items()}
+        users = set()
+        with transaction.atomic():
+            now = timezone.now()
+            for model, fields in blobs.tracked_fields().items():
+                touched = {field.name: now for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)}
+                for field in fields:
+                    rows = model._default_manager.filter(**{f'{field}__in': list(renamed)}).values_list('pk', field)
+                    for pk, name in rows:
+                        model._default_manager.filter(pk=pk, **{field: name}).update(**{field: renamed[name]}, **touched)
+                        if model._meta.label == settings.AUTH_USER_MODEL:
+                            users.add(pk)
+            self.repoint_variants(renamed)
+        if users:
+            # Cached authenticated users still carry the old avatar name.
+            evict(*Token.objects.filter(user_id__in=users).values_list('key', flat=True))
+
+        # 3. Drop the old names.
+        for name in batch:
+            os.remove(os.path.join(root, name))
+
+    def legacy_variants(self):
+        """`{old name: {photo pks}}` for every photo variant rendered before content names."""
+        from store.images import variant_names
+        from store.models import ProductImage
+        photos = {}
+        for pk, variants in ProductImage.objects.exclude(variants={}).values_list('pk', 'variants').iterator():
+            for name in variant_names(variants):
+                if not is_content_name(name):
+                    photos.setdefault(name, set()).add(pk)
+        return photos
+
+    def repoint_variants(self, renamed):
+        """
+        Photo variants are named in a JSON column, so tracked_fields() misses them. Point them at
+        the content-named copies too, so they keep serving after step 3 without a re-render.
+        """
+        from store.images import rename_variants
+        from store.models import ProductImage
+        pks = {pk for name in renamed for pk in self.variant_photos.get(name, ())}
+        for photo in ProductImage.objects.select_for_update().filter(pk__in=pks).only('pk', 'variants'):
+            ProductImage.objects.filter(pk=photo.pk).update(variants=rename_variants(photo.variants, renamed))
+
+    def requeue_variants(self):
+        """Re-render the photos whose variants still use old names: their files were missing from disk."""
+        from store.images import variant_names
+        from store.models import ProductImage
+        stale = [
+            pk for pk, variants in ProductImage.objects.exclude(variants={}).values_list('pk', 'variants').iterator()
+            if any(not is_content_name(name) for name in variant_names(variants))
+        ]
+        for start in range(0, len(stale), 500):
+            ProductImage.objects.filter(pk__in=stale[start:start + 500]).update(variants={}, variants_status='PENDING')
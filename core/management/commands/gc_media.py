@@ -0,0 +1,25 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from core import blobs
+
+
+class Command(BaseCommand):
+    help = "Delete media blobs no row has referenced for longer than the grace period (run this periodically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=blobs.GC_GRACE.total_seconds() / 3600)
+        parser.add_argument('--recount', action='store_true', help="Rebuild reference counts from the rows first.")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            blobs.recount()
+        grace = timedelta(hours=options['grace_hours'])
+        strays = blobs.adopt_strays(default_storage, grace=grace, dry_run=options['dry_run'])
+        files, size = blobs.collect_garbage(default_storage, grace=grace, dry_run=options['dry_run'])
+        if strays:
+            verb = "Would register" if options['dry_run'] else "Registered"
+            self.stdout.write(f"{verb} {strays} stored files with no blob row (saves that were rolled back).")
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {files} unreferenced blobs ({size / 1024 / 1024:.1f} MiB)."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Tombstone
+from core.sync import tombstone_ttl
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_TTL (run this periodically)."
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_ttl()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired tombstones."))
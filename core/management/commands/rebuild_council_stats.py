@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.models import CouncilStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the Council dashboard snapshot from the users, orders and verification tables."
+
+    def handle(self, *args, **options):
+        snapshot = CouncilStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Council stats rebuilt: {snapshot.total_citizens} citizens, {snapshot.total_plugs} plugs, "
+            f"N{snapshot.revenue} revenue, {snapshot.active_disputes} disputes, {snapshot.pending_mandates} pending mandates."
+        ))
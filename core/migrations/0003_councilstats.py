@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_institution_inst_category_institution_inst_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouncilStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_citizens', models.IntegerField(default=0)),
+                ('total_plugs', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_disputes', models.IntegerField(default=0)),
+                ('pending_mandates', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Council Stats',
+                'verbose_name_plural': 'Council Stats',
+            },
+        ),
+    ]
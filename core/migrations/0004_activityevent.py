@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_recent_activity(apps, schema_editor):
+    """Backfill the pulse with the latest members, drops and orders so it isn't empty after deploy."""
+    ActivityEvent = apps.get_model('core', 'ActivityEvent')
+    User = apps.get_model('users', 'CustomUser')
+    Product = apps.get_model('store', 'Product')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+
+    def role(user):
+        if user.is_plug: return 'Plug'
+        if user.is_citizen: return 'Citizen'
+        return 'Tribe Member'
+
+    events = [
+        ActivityEvent(kind='USER', actor=u.username, detail=f"{u.email} ({role(u)})", created_at=u.date_joined)
+        for u in User.objects.order_by('-date_joined')[:20]
+    ] + [
+        ActivityEvent(kind='DROP', actor=p.store.owner.username, detail=f"{p.name} - ₦{p.price}", created_at=p.created_at)
+        for p in Product.objects.select_related('store__owner').order_by('-created_at')[:20]
+    ] + [
+        ActivityEvent(
+            kind='ORDER', actor=i.order.customer.username, detail=f"{i.product.name} (₦{i.product.price})",
+            status=i.status, created_at=i.created_at,
+        )
+        for i in OrderItem.objects.select_related('order__customer', 'product').order_by('-created_at')[:20]
+    ]
+    ActivityEvent.objects.bulk_create(sorted(events, key=lambda event: event.created_at))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_councilstats'),
+        ('users', '0005_verificationrequest_verification_feed_idx_and_more'),
+        ('store', '0008_payoutrequest_payout_store_created_idx_and_more'),
+        ('orders', '0008_order_order_customer_feed_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('USER', 'Tribe Member Joined'), ('DROP', 'New Drop Launched'), ('ORDER', 'Transaction Active')], max_length=10)),
+                ('actor', models.CharField(max_length=150)),
+                ('detail', models.CharField(max_length=255)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='activity_feed_idx')],
+            },
+        ),
+        migrations.RunPython(seed_recent_activity, migrations.RunPython.noop),
+    ]
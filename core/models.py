@@ -1,4 +1,10 @@
-from django.db import models
+import hashlib
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+from .events import COUNCIL, publish
 
 class Institution(models.Model):
     TYPE_CHOICES = [
@@ -27,3 +33,229 @@ class CampusLocation(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.institution.name})"
+
+class CouncilStats(models.Model):
+    """
+    Single-row snapshot of the Council dashboard totals.
+    Kept current by the signal handlers in core.signals, so reading it is O(1).
+    Rebuild from scratch with `manage.py rebuild_council_stats`.
+    """
+    total_citizens = models.IntegerField(default=0)
+    total_plugs = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_disputes = models.IntegerField(default=0)
+    pending_mandates = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SNAPSHOT_ID = 1
+
+    class Meta:
+        verbose_name = "Council Stats"
+        verbose_name_plural = "Council Stats"
+
+    def __str__(self):
+        return f"Council Stats (updated {self.updated_at:%Y-%m-%d %H:%M})"
+
+    @classmethod
+    def current(cls):
+        snapshot = cls.objects.filter(pk=cls.SNAPSHOT_ID).first()
+        return snapshot or cls.rebuild()
+
+    @classmethod
+    def bump(cls, **deltas):
+        """Apply counter deltas in a single UPDATE; seeds the snapshot on first use."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SNAPSHOT_ID).update(
+            **{field: models.F(field) + delta for field, delta in deltas.items()},
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            cls.rebuild()
+        publish(COUNCIL, 'stats', deltas)
+
+    @classmethod
+    def rebuild(cls):
+        from django.apps import apps
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        Order = apps.get_model('orders', 'Order')
+        OrderItem = apps.get_model('orders', 'OrderItem')
+        VerificationRequest = apps.get_model('users', 'VerificationRequest')
+
+        snapshot, _ = cls.objects.update_or_create(pk=cls.SNAPSHOT_ID, defaults={
+            'total_citizens': User.objects.filter(is_citizen=True).count(),
+            'total_plugs': User.objects.filter(is_plug=True).count(),
+            'revenue': Order.objects.aggregate(total=models.Sum('total_amount'))['total'] or 0,
+            'active_disputes': OrderItem.objects.filter(status='DISPUTED').count(),
+            'pending_mandates': VerificationRequest.objects.filter(status='PENDING').count(),
+        })
+        return snapshot
+
+class ActivityEvent(models.Model):
+    """
+    Append-only log behind the Council live pulse. Rows are written once, when a
+    member joins, a drop launches or an order item is placed, and never updated.
+    """
+    KIND_CHOICES = [
+        ('USER', 'Tribe Member Joined'),
+        ('DROP', 'New Drop Launched'),
+        ('ORDER', 'Transaction Active'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    actor = models.CharField(max_length=150)
+    detail = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='activity_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.actor} - {self.detail}"
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(kind='USER', actor=user.username, detail=f"{user.email} ({user.role_display})", created_at=user.date_joined)
+
+    @classmethod
+    def for_drop(cls, product):
+        return cls(kind='DROP', actor=product.store.owner.username, detail=f"{product.name} - ₦{product.price}", created_at=product.created_at)
+
+    @classmethod
+    def for_order_item(cls, item):
+        return cls(
+            kind='ORDER',
+            actor=item.order.customer.username,
+            detail=f"{item.product.name} (₦{item.product.price})",
+            status=item.status,
+            created_at=item.created_at,
+        )
+
+    def as_pulse(self):
+        pulse = {
+            "id": self.id,
+            "type": self.kind,
+            "label": self.get_kind_display(),
+            "user": self.actor,
+            "detail": self.detail,
+            "timestamp": self.created_at,
+        }
+        if self.kind == 'ORDER':
+            pulse["status"] = self.status
+        return pulse
+
+class CatalogSnapshot(models.Model):
+    """
+    Precomputed JSON body for a rarely-changing public catalog, identified by a content hash.
+    Deleted whenever its source rows change and rebuilt on the next read.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    version = models.CharField(max_length=16)
+    payload = models.TextField()
+    generated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}@{self.version}"
+
+    @classmethod
+    def institutions(cls):
+        snapshot = cls.objects.filter(key='institutions').first()
+        return snapshot or cls.build_institutions()
+
+    @classmethod
+    def build_institutions(cls):
+        catalog = [
+            {
+                "id": inst.id,
+                "name": inst.name,
+                "slug": inst.slug,
+                "inst_type": inst.inst_type,
+                "inst_category": inst.inst_category,
+                "locations": [{"id": loc.id, "name": loc.name} for loc in inst.locations.all()],
+            }
+            for inst in Institution.objects.prefetch_related('locations').order_by('id')
+        ]
+        body = json.dumps(catalog, separators=(',', ':'), ensure_ascii=False)
+        version = hashlib.sha256(body.encode()).hexdigest()[:16]
+        payload = f'{{"version":"{version}","institutions":{body}}}'
+        snapshot, _ = cls.objects.update_or_create(key='institutions', defaults={'version': version, 'payload': payload})
+        return snapshot
+
+    @classmethod
+    def expire(cls, key):
+        # Same double expiry as core.cache.invalidate: now, and again once the write is visible.
+        cls.objects.filter(key=key).delete()
+        transaction.on_commit(lambda: cls.objects.filter(key=key).delete())
+
+class IdempotencyKey(models.Model):
+    """
+    The first response to a create request sent with an `Idempotency-Key` header,
+    replayed to retries of the same request (see core.idempotency).
+    A row without a status code is a request still in flight.
+    Rows older than IDEMPOTENCY_KEY_TTL are ignored and purged by `manage.py purge_idempotency_keys`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.endpoint})"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted row, kept so delta-sync clients (see core.sync) learn to drop it too.
+    `scope_id` is what the owning list is filtered on (the store for order items, the
+    user for verification requests). Rows older than SYNC_TOMBSTONE_TTL are purged by
+    `manage.py purge_tombstones`; clients holding an older mark must resync in full.
+    """
+    kind = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    scope_id = models.CharField(max_length=64, blank=True)  # str() of an int or UUID key
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'scope_id', 'deleted_at'], name='tombstone_scope_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class StoredBlob(models.Model):
+    """
+    A file in content-addressed media storage (see core.storage), with the number of
+    model fields currently pointing at it. Blobs at zero references for longer than
+    a grace period are deleted by `manage.py gc_media`.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    written_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['written_at'], condition=models.Q(refcount__lte=0), name='storedblob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
@@ -0,0 +1,315 @@
+"""
+S3-compatible object storage (AWS S3, MinIO, R2, ...), with direct browser uploads.
+
+Set S3_BUCKET to store media in a bucket instead of MEDIA_ROOT. S3Storage keeps the
+content-addressed names and blob counts of core.storage, so `gc_media` works unchanged.
+
+Photos then skip the app tier entirely:
+
+1. The client asks `POST /api/core/uploads/` for a ticket, declaring the photo's kind,
+   content type, size and SHA-256. It gets back a presigned PUT URL for the photo's
+   content name, and an opaque `upload` token.
+2. It PUTs the bytes straight to the bucket. The signature covers the length and
+   checksum, so the bucket refuses anything other than the declared file.
+3. It sends the token wherever it would have sent the file (`image`, `uploaded_images`,
+   `id_card`, `avatar`). core.uploads.PhotoUploadField checks the token, HEADs the object
+   and reads its first bytes to check it is an image, then records the key.
+
+Requests are signed with AWS Signature Version 4, implemented here on the standard library.
+"""
+import base64
+import hashlib
+import hmac
+import io
+import os
+import posixpath
+import tempfile
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import parse_qsl, quote, urlsplit
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+from .storage import CHUNK_SIZE, content_name, is_content_name
+
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+# Bytes read back from a direct upload to check it: enough for the signature and, in
+# all but freak cases, the header (JPEG EXIF blocks are at most 64KB).
+HEADER_BYTES = 256 * 1024
+
+TOKEN_SALT = 'core.s3.upload'
+
+Head = namedtuple('Head', ['size', 'content_type', 'sha256'])
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _quote(value, safe='-_.~'):
+    return quote(value, safe=safe)
+
+
+class Signer:
+    """AWS Signature Version 4 for one set of credentials and region."""
+    algorithm = 'AWS4-HMAC-SHA256'
+
+    def __init__(self, access_key, secret_key, region, service='s3'):
+        self.access_key, self.secret_key = access_key, secret_key
+        self.region, self.service = region, service
+
+    def scope(self, now):
+        return f"{now:%Y%m%d}/{self.region}/{self.service}/aws4_request"
+
+    def signature(self, method, url, headers, query, payload_hash, now):
+        """Sign the canonical request; `headers` are the (lowercase) headers to sign."""
+        parts = urlsplit(url)
+        canonical_headers = ''.join(f"{name}:{' '.join(str(headers[name]).split())}\n" for name in sorted(headers))
+        canonical_request = '\n'.join([
+            method,
+            _quote(parts.path or '/', safe='/-_.~'),
+            '&'.join(f"{_quote(key)}={_quote(value)}" for key, value in sorted(query.items())),
+            canonical_headers,
+            ';'.join(sorted(headers)),
+            payload_hash,
+        ])
+        string_to_sign = '\n'.join([
+            self.algorithm, f"{now:%Y%m%dT%H%M%SZ}", self.scope(now),
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        key = _hmac(('AWS4' + self.secret_key).encode(), f"{now:%Y%m%d}")
+        for part in (self.region, self.service, 'aws4_request'):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def presign(self, method, url, expires, headers=None, now=None):
+        """A URL that performs `method` until `expires` seconds from now; the client must send `headers` as given."""
+        now = now or datetime.now(dt_timezone.utc)
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        headers['host'] = urlsplit(url).netloc
+        query = {
+            'X-Amz-Algorithm': self.algorithm,
+            'X-Amz-Credential': f"{self.access_key}/{self.scope(now)}",
+            'X-Amz-Date': f"{now:%Y%m%dT%H%M%SZ}",
+            'X-Amz-Expires': str(expires),
+            'X-Amz-SignedHeaders': ';'.join(sorted(headers)),
+        }
+        query['X-Amz-Signature'] = self.signature(method, url, headers, query, UNSIGNED_PAYLOAD, now)
+        return f"{url}?{'&'.join(f'{_quote(key)}={_quote(value)}' for key, value in query.items())}"
+
+    def authorize(self, method, url, headers=None, payload_hash=EMPTY_SHA256, now=None):
+        """The headers to send with a header-signed request."""
+        now = now or datetime.now(dt_timezone.utc)
+        parts = urlsplit(url)
+        signed = {name.lower(): value for name, value in (headers or {}).items()}
+        signed.update({
+            'host': parts.netloc,
+            'x-amz-content-sha256': payload_hash,
+            'x-amz-date': f"{now:%Y%m%dT%H%M%SZ}",
+        })
+        query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        signature = self.signature(method, url, signed, query, payload_hash, now)
+        signed['authorization'] = (
+            f"{self.algorithm} Credential={self.access_key}/{self.scope(now)}, "
+            f"SignedHeaders={';'.join(sorted(name for name in signed if name != 'authorization'))}, Signature={signature}"
+        )
+        del signed['host']  # urllib sends it
+        return signed
+
+
+class S3Client:
+    """The handful of object calls the app makes, against one bucket (path-style URLs, as MinIO serves them)."""
+
+    def __init__(self, endpoint, bucket, region, access_key, secret_key, timeout=30):
+        self.endpoint, self.bucket, self.timeout = endpoint.rstrip('/'), bucket, timeout
+        self.signer = Signer(access_key, secret_key, region)
+
+    def object_url(self, key):
+        return f"{self.endpoint}/{self.bucket}/{_quote(key, safe='/-_.~')}"
+
+    def request(self, method, key, headers=None, body=None, payload_hash=EMPTY_SHA256, query=None):
+        url = self.object_url(key)
+        if query:
+            url += '?' + '&'.join(f"{_quote(name)}={_quote(value)}" for name, value in sorted(query.items()))
+        request = urllib.request.Request(url, data=body, method=method, headers=self.signer.authorize(method, url, headers, payload_hash))
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def head(self, key):
+        """Size, content type and SHA-256 (hex, when the bucket stored one) of an object, or None if absent."""
+        try:
+            with self.request('HEAD', key, {'x-amz-checksum-mode': 'ENABLED'}) as response:
+                checksum = response.headers.get('x-amz-checksum-sha256')
+                return Head(
+                    int(response.headers['Content-Length']), response.headers.get('Content-Type'),
+                    base64.b64decode(checksum).hex() if checksum else None,
+                )
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise
+
+    def get(self, key, length=None):
+        """The object's bytes as a stream; the first `length` bytes only if given."""
+        headers = {'range': f'bytes=0-{length - 1}'} if length else None
+        return self.request('GET', key, headers)
+
+    def put(self, key, file, size, sha256, content_type):
+        headers = {
+            'content-length': str(size), 'content-type': content_type,
+            'x-amz-checksum-sha256': base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        with self.request('PUT', key, headers, body=file, payload_hash=sha256):
+            pass
+
+    def delete(self, key):
+        with self.request('DELETE', key):
+            pass
+
+    def list(self, prefix=''):
+        """Yield `(key, size, last modified)` for every object under `prefix`, a page (ListObjectsV2) at a time."""
+        query = {'list-type': '2', **({'prefix': prefix} if prefix else {})}
+        while True:
+            with self.request('GET', '', query=query) as response:
+                page = ElementTree.parse(response).getroot()
+            for item in page.iterfind('{*}Contents'):
+                modified = datetime.fromisoformat(item.findtext('{*}LastModified').replace('Z', '+00:00'))
+                yield item.findtext('{*}Key'), int(item.findtext('{*}Size')), modified
+            if page.findtext('{*}IsTruncated') != 'true':
+                return
+            query['continuation-token'] = page.findtext('{*}NextContinuationToken')
+
+    def presign_put(self, key, size, sha256, content_type, expires):
+        headers = {
+            'content-length': str(size), 'content-type': content_type,
+            'x-amz-checksum-sha256': base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        return self.signer.presign('PUT', self.object_url(key), expires, headers), headers
+
+
+def client():
+    return S3Client(
+        settings.S3_ENDPOINT_URL, settings.S3_BUCKET, settings.S3_REGION,
+        settings.S3_ACCESS_KEY_ID, settings.S3_SECRET_ACCESS_KEY,
+    )
+
+
+def content_type_for(name):
+    return {
+        '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.gif': 'image/gif', '.webp': 'image/webp',
+    }.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+
+
+@deconstructible
+class S3Storage(Storage):
+    """Content-addressed storage (see core.storage) in an S3 bucket."""
+    content_addressed = True
+
+    def __init__(self, media_url=None):
+        self.client = client()
+        self.media_url = media_url or settings.S3_MEDIA_URL or f"{self.client.endpoint}/{self.client.bucket}/"
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        # Hash while spooling to a temp file: the PUT needs the length and checksum up front.
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.TemporaryFile() as spool:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks(CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+            name = content_name(posixpath.dirname(name), digest.hexdigest(), os.path.splitext(name)[1])
+            # As in core.storage: register first, so a `gc_media` deleting this object finishes
+            # before it is looked for; an object whose row is rolled back is found by listing.
+            from .blobs import register
+            with transaction.atomic():
+                register(name, size)
+                if self.client.head(name) is None:
+                    spool.seek(0)
+                    self.client.put(name, spool, size, digest.hexdigest(), content_type_for(name))
+        return name
+
+    def _open(self, name, mode='rb'):
+        spool = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE)
+        with self.client.get(name) as response:
+            while chunk := response.read(CHUNK_SIZE):
+                spool.write(chunk)
+        spool.seek(0)
+        return File(spool, name=name)
+
+    def exists(self, name):
+        return self.client.head(name) is not None
+
+    def delete(self, name):
+        self.client.delete(name)
+
+    def size(self, name):
+        return self.client.head(name).size
+
+    def url(self, name):
+        return self.media_url + _quote(name, safe='/-_.~')
+
+    def content_files(self):
+        """Yield `(name, size, modified)` for every content-named object, as core.storage does."""
+        return ((key, size, modified) for key, size, modified in self.client.list() if is_content_name(key))
+
+
+def enabled():
+    return isinstance(default_storage, S3Storage)
+
+
+def issue_ticket(user, directory, extension, content_type, size, sha256):
+    """Presign the PUT for one photo; returns the response body for the client."""
+    storage = default_storage
+    key = content_name(directory, sha256, extension)
+    expires = settings.S3_UPLOAD_EXPIRES
+    url, headers = storage.client.presign_put(key, size, sha256, content_type, expires)
+    # Counted from now, so an upload that is never attached is collected by `gc_media`.
+    from .blobs import register
+    register(key, size)
+    token = signing.dumps({'key': key, 'size': size, 'sha256': sha256, 'user': str(user.pk)}, salt=TOKEN_SALT)
+    return {
+        'upload': token,
+        'url': url,
+        'method': 'PUT',
+        'headers': {name: value for name, value in headers.items() if name != 'content-length'},
+        'expires_in': expires,
+        'exists': storage.client.head(key) is not None,
+    }
+
+
+class TicketError(Exception):
+    pass
+
+
+def redeem_ticket(token, user, directory):
+    """
+    Check an upload token and the object it names. Returns `(key, head bytes)`;
+    raises TicketError if the token is forged, expired or someone else's, or the
+    object is missing or isn't the declared file.
+    """
+    try:
+        ticket = signing.loads(token, salt=TOKEN_SALT, max_age=settings.S3_UPLOAD_EXPIRES + settings.S3_UPLOAD_GRACE)
+    except signing.BadSignature:
+        raise TicketError("This upload has expired or is not valid.")
+    if ticket['user'] != str(getattr(user, 'pk', None)) or posixpath.dirname(posixpath.dirname(ticket['key'])) != directory.rstrip('/'):
+        raise TicketError("This upload has expired or is not valid.")
+    head = default_storage.client.head(ticket['key'])
+    if head is None:
+        raise TicketError("The photo was not uploaded.")
+    if head.size != ticket['size'] or (head.sha256 and head.sha256 != ticket['sha256']):
+        raise TicketError("The uploaded photo does not match the one declared.")
+    with default_storage.client.get(ticket['key'], HEADER_BYTES) as response:
+        return ticket['key'], io.BytesIO(response.read())
@@ -12,3 +12,18 @@ class InstitutionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Institution
         fields = ('id', 'name', 'slug', 'inst_type', 'inst_category', 'locations')
+
+# Image types accepted for direct uploads, with the extension their keys get.
+UPLOAD_TYPES = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+
+class UploadTicketSerializer(serializers.Serializer):
+    """A photo the client is about to PUT straight to the bucket (see core.s3)."""
+    kind = serializers.ChoiceField(choices=['products', 'verifications', 'avatars'])
+    content_type = serializers.ChoiceField(choices=list(UPLOAD_TYPES))
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-f]{64}$')
+
+    def validate_kind(self, value):
+        if value == 'products' and not self.context['request'].user.is_plug:
+            raise serializers.ValidationError("Only plugs can upload drop photos.")
+        return value
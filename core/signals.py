@@ -0,0 +1,176 @@
+from decimal import Decimal
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from . import blobs
+from .cache import invalidate
+from .events import COUNCIL, publish
+from .models import CouncilStats, ActivityEvent, CatalogSnapshot, Tombstone
+
+
+def council_counters():
+    """
+    Map each model feeding the Council dashboard to the columns its counters read
+    and how much a single row contributes to each counter.
+    """
+    return {
+        get_user_model(): (('is_citizen', 'is_plug'), {
+            'total_citizens': lambda user: int(user.is_citizen),
+            'total_plugs': lambda user: int(user.is_plug),
+        }),
+        apps.get_model('orders', 'Order'): (('total_amount',), {
+            'revenue': lambda order: Decimal(str(order.total_amount or 0)),
+        }),
+        apps.get_model('orders', 'OrderItem'): (('status',), {
+            'active_disputes': lambda item: int(item.status == 'DISPUTED'),
+        }),
+        apps.get_model('users', 'VerificationRequest'): (('status',), {
+            'pending_mandates': lambda request: int(request.status == 'PENDING'),
+        }),
+    }
+
+
+def connect_council_stats():
+    for model, (columns, counters) in council_counters().items():
+
+        def contribution(instance, counters=counters):
+            return {field: measure(instance) for field, measure in counters.items()}
+
+        def remember_previous(sender, instance, update_fields=None, columns=columns, contribution=contribution, **kwargs):
+            instance._council_stats_before = None
+            if instance._state.adding:
+                return
+            if update_fields is not None and not set(update_fields) & set(columns):
+                # None of the counted columns are being written, so nothing can change.
+                instance._council_stats_before = contribution(instance)
+                return
+            previous = sender._default_manager.filter(pk=instance.pk).only(*columns).first()
+            if previous is not None:
+                instance._council_stats_before = contribution(previous)
+
+        def apply_delta(sender, instance, created, contribution=contribution, **kwargs):
+            before = None if created else getattr(instance, '_council_stats_before', None)
+            CouncilStats.bump(**{
+                field: value - (before or {}).get(field, 0)
+                for field, value in contribution(instance).items()
+            })
+
+        def remove_contribution(sender, instance, contribution=contribution, **kwargs):
+            CouncilStats.bump(**{field: -value for field, value in contribution(instance).items()})
+
+        uid = f'council_stats_{model._meta.label_lower}'
+        pre_save.connect(remember_previous, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(apply_delta, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(remove_contribution, sender=model, weak=False, dispatch_uid=uid)
+
+
+def connect_activity_feed():
+    feeds = {
+        get_user_model(): ActivityEvent.for_user,
+        apps.get_model('store', 'Product'): ActivityEvent.for_drop,
+        apps.get_model('orders', 'OrderItem'): ActivityEvent.for_order_item,
+    }
+    for model, build in feeds.items():
+
+        def record(sender, instance, created, raw=False, build=build, **kwargs):
+            if created and not raw:
+                build(instance).save()
+
+        post_save.connect(record, sender=model, weak=False, dispatch_uid=f'activity_feed_{model._meta.label_lower}')
+
+
+def connect_response_cache():
+    """Drop cached public list responses whenever a model they render from changes."""
+    dependents = {
+        apps.get_model('core', 'Institution'): ('institutions', 'marketplace'),
+        apps.get_model('core', 'CampusLocation'): ('institutions', 'campuses'),
+        apps.get_model('store', 'Category'): ('circles', 'marketplace'),
+        apps.get_model('store', 'Store'): ('marketplace',),
+        apps.get_model('store', 'Product'): ('marketplace',),
+        apps.get_model('store', 'ProductImage'): ('marketplace',),
+    }
+    for model, namespaces in dependents.items():
+
+        def expire(sender, namespaces=namespaces, **kwargs):
+            invalidate(*namespaces)
+            if 'institutions' in namespaces:
+                CatalogSnapshot.expire('institutions')
+
+        uid = f'response_cache_{model._meta.label_lower}'
+        post_save.connect(expire, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(expire, sender=model, weak=False, dispatch_uid=uid)
+
+
+def connect_event_stream():
+    """Feed the dashboard event streams (core.events) from saves the views make."""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VerificationRequest = apps.get_model('users', 'VerificationRequest')
+
+    def order_item_saved(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        instance.announce(created=created)
+        if instance.status == 'DISPUTED':
+            publish(COUNCIL, 'dispute', {'id': instance.pk})
+
+    def verification_saved(sender, instance, raw=False, **kwargs):
+        if not raw:
+            publish(COUNCIL, 'verification', {'id': instance.pk, 'status': instance.status})
+
+    post_save.connect(order_item_saved, sender=OrderItem, weak=False, dispatch_uid='event_stream_orderitem')
+    post_save.connect(verification_saved, sender=VerificationRequest, weak=False, dispatch_uid='event_stream_verification')
+
+
+def connect_tombstones():
+    """Record deletes from the lists that support `?since=` sync (core.sync), with the column each is scoped on."""
+    scopes = {
+        apps.get_model('orders', 'OrderItem'): 'store_id',
+        apps.get_model('users', 'VerificationRequest'): 'user_id',
+    }
+    for model, scope in scopes.items():
+
+        def bury(sender, instance, scope=scope, **kwargs):
+            Tombstone.objects.create(kind=sender._meta.label_lower, object_id=instance.pk, scope_id=str(getattr(instance, scope)))
+
+        post_delete.connect(bury, sender=model, weak=False, dispatch_uid=f'tombstone_{model._meta.label_lower}')
+
+
+def connect_blob_refcounts():
+    """Count the file fields pointing at each content-addressed blob (see core.blobs)."""
+    for model, fields in blobs.tracked_fields().items():
+
+        def names(instance, fields=fields):
+            return {field: getattr(instance, field).name or None for field in fields}
+
+        def remember_files(sender, instance, update_fields=None, raw=False, fields=fields, names=names, **kwargs):
+            instance._blob_names_before = {}
+            if raw or instance._state.adding:
+                return
+            if update_fields is not None and not set(update_fields) & set(fields):
+                instance._blob_names_before = names(instance)
+                return
+            previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+            instance._blob_names_before = {field: name or None for field, name in (previous or {}).items()}
+
+        def count_files(sender, instance, raw=False, names=names, **kwargs):
+            if raw:
+                return
+            before, after = getattr(instance, '_blob_names_before', {}), names(instance)
+            blobs.retain(name for field, name in after.items() if name != before.get(field))
+            blobs.release(name for field, name in before.items() if name != after.get(field))
+
+        def release_files(sender, instance, names=names, **kwargs):
+            blobs.release(names(instance).values())
+
+        uid = f'blob_refcounts_{model._meta.label_lower}'
+        pre_save.connect(remember_files, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(count_files, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(release_files, sender=model, weak=False, dispatch_uid=uid)
+
+    from store.images import variant_names  # photo variants are named in a JSON column
+
+    def release_variants(sender, instance, **kwargs):
+        blobs.release(variant_names(instance.variants or {}))
+
+    ProductImage = apps.get_model('store', 'ProductImage')
+    post_delete.connect(release_variants, sender=ProductImage, weak=False, dispatch_uid='blob_refcounts_variants')
@@ -0,0 +1,90 @@
+"""
+Content-addressed media storage.
+
+Files are named by the SHA-256 of their bytes under their upload directory
+(`products/3f/3fa4…e1.jpg`), so a photo saved twice is written once and both rows
+share it. Every name written is registered as a core.StoredBlob; core.signals
+counts the model fields pointing at each blob and `manage.py gc_media` deletes
+the ones nothing has used for a while. `manage.py dedupe_media` converts files
+saved before this storage was installed.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+CHUNK_SIZE = 1024 * 1024
+
+CONTENT_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{64}(?:\.\w+)?$')
+
+
+def content_name(directory, digest, extension):
+    return posixpath.join(directory, digest[:2], f"{digest}{extension.lower()}")
+
+
+def is_content_name(name):
+    return bool(CONTENT_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    content_addressed = True  # names are content hashes, counted in core.blobs
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save, and an existing file under
+        # that name holds the same bytes, so there is never a clash to avoid.
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1]
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        # Hash while copying into a temp file beside the target: one read of the upload.
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory), suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            name = content_name(directory, digest.hexdigest(), extension)
+            path = self.path(name)
+            # Register before looking for an existing file, in one transaction: that waits
+            # out a `gc_media` deleting this blob (see core.blobs.collect_garbage), so a file
+            # found here is not about to be deleted under the new reference. If the caller's
+            # transaction rolls back, the row goes with it; `gc_media` finds the file by
+            # listing storage instead (see core.blobs.adopt_strays).
+            from .blobs import register
+            with transaction.atomic():
+                register(name, size)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                    os.replace(temp_path, path)
+                    temp_path = None
+        finally:
+            if temp_path:
+                os.unlink(temp_path)
+        return name
+
+    def content_files(self):
+        """Yield `(name, size, modified)` for every content-named file, walking the tree lazily."""
+        for directory, subdirectories, files in os.walk(self.location):
+            for file in files:
+                path = os.path.join(directory, file)
+                name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                if not is_content_name(name):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # collected since the walk listed it
+                    continue
+                yield name, stat.st_size, datetime.fromtimestamp(stat.st_mtime, dt_timezone.utc)
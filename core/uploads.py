@@ -0,0 +1,151 @@
+"""
+Bounded multipart uploads for the photo endpoints (drops, mandate ID cards, avatars).
+
+Django's default handlers keep files under 2.5MB in memory and accept a body of any
+size. BoundedUploadHandler instead streams every file to a temp file as it arrives and
+refuses with 413:
+
+- a request whose Content-Length is over UPLOAD_MAX_REQUEST_SIZE, before any of the body is read;
+- a request or file that grows past UPLOAD_MAX_REQUEST_SIZE / UPLOAD_MAX_FILE_SIZE
+  (chunked bodies, lying lengths), at the chunk that crosses the limit.
+
+A file must also start with the signature of an image format Pillow decodes, checked
+on its first chunk, and once complete its header (never the pixels) is read to turn
+away decompression bombs.
+
+With S3 storage, PhotoUploadField also takes the token of a photo the client sent
+straight to the bucket (see core.s3), so no photo bytes reach the app at all.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+# Largest photo (in pixels) anything will decode; store.images renders under the same cap.
+MAX_PIXELS = 50_000_000
+
+# Enough of a file's start to tell the formats below apart.
+SIGNATURE_LENGTH = 12
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "This upload is too large."
+    default_code = 'payload_too_large'
+
+
+def image_format(head):
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'JPEG'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'PNG'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):g}MB"
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+
+    def __init__(self, request=None, max_file_size=None, max_request_size=None):
+        super().__init__(request)
+        self.max_file_size = max_file_size or settings.UPLOAD_MAX_FILE_SIZE
+        self.max_request_size = max_request_size or settings.UPLOAD_MAX_REQUEST_SIZE
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > self.max_request_size:
+            raise PayloadTooLarge(f"Uploads are limited to {megabytes(self.max_request_size)} per request.")
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_request_size:
+            self.reject(PayloadTooLarge(f"Uploads are limited to {megabytes(self.max_request_size)} per request."))
+        if start + len(raw_data) > self.max_file_size:
+            self.reject(PayloadTooLarge(f"{self.file_name} is over the {megabytes(self.max_file_size)} limit per photo."))
+        if len(self.head) < SIGNATURE_LENGTH:
+            self.head += raw_data[:SIGNATURE_LENGTH]
+            if len(self.head) >= SIGNATURE_LENGTH and not image_format(self.head):
+                self.reject(self.not_an_image())
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not image_format(self.head):
+            self.reject(self.not_an_image())
+        upload = super().file_complete(file_size)
+        try:
+            with Image.open(upload) as image:  # parses the header; pixels are only decoded on load()
+                pixels = image.width * image.height
+        except Exception:
+            self.reject(self.not_an_image())
+        if pixels > MAX_PIXELS:
+            self.reject(ValidationError({self.field_name: [f"{self.file_name} has too many pixels to process."]}))
+        upload.seek(0)
+        return upload
+
+    def not_an_image(self):
+        return ValidationError({self.field_name: [f"{self.file_name} is not a JPEG, PNG, GIF or WebP image."]})
+
+    def reject(self, exc):
+        # Django only cleans up handlers' temp files on StopUpload, so drop this one here.
+        self.file.close()
+        raise exc
+
+
+class BoundedUploadMixin:
+    """
+    Parse this view's multipart bodies with BoundedUploadHandler. Set
+    `upload_max_file_size` / `upload_max_request_size` to override the settings.
+    """
+    upload_max_file_size = None
+    upload_max_request_size = None
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Must happen before anything (CSRF checks included) reads request.POST or FILES.
+        request.upload_handlers = [BoundedUploadHandler(
+            request, max_file_size=self.upload_max_file_size, max_request_size=self.upload_max_request_size,
+        )]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+class DirectUpload(str):
+    """The key of a photo uploaded straight to the bucket, with its upright size."""
+    width = height = None
+
+
+class PhotoUploadField(serializers.ImageField):
+    """An image file, or the `upload` token of one sent straight to the bucket (see core.s3)."""
+
+    def __init__(self, upload_to, **kwargs):
+        self.upload_to = upload_to
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        from . import s3
+        from store.images import upright_size
+        if not s3.enabled():
+            self.fail('invalid')
+        try:
+            key, head = s3.redeem_ticket(data, self.context['request'].user, self.upload_to)
+        except s3.TicketError as exc:
+            raise ValidationError(str(exc))
+        if not image_format(head.getvalue()[:SIGNATURE_LENGTH]):
+            raise ValidationError("The uploaded file is not a JPEG, PNG, GIF or WebP image.")
+        width, height = upright_size(head)
+        if width is None or width * height > MAX_PIXELS:
+            raise ValidationError("The uploaded photo could not be read or has too many pixels to process.")
+        upload = DirectUpload(key)
+        upload.width, upload.height = width, height
+        return upload
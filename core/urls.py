@@ -1,9 +1,25 @@
 from django.urls import path
-from .views import InstitutionListView, CampusLocationListView, CouncilStatsView, CouncilDataPurgeView
+from .views import (
+    InstitutionListView, InstitutionCatalogView, CampusLocationListView, CouncilStatsView, CouncilDataPurgeView,
+    AsyncInstitutionListView, AsyncCampusLocationListView, EventTicketView, PlugEventStream, CouncilEventStream, CitizenEventStream,
+    DirectUploadView,
+)
 
 urlpatterns = [
     path('institutions/', InstitutionListView.as_view(), name='institution-list'),
+    path('institutions/catalog/', InstitutionCatalogView.as_view(), name='institution-catalog'),
+    path('institutions/catalog/<str:version>/', InstitutionCatalogView.as_view(), name='institution-catalog-version'),
     path('campuses/', CampusLocationListView.as_view(), name='campus-list'),
+    # Async-native twins of the public read endpoints, for ASGI deployments
+    path('aio/institutions/', AsyncInstitutionListView.as_view(), name='aio-institution-list'),
+    path('aio/campuses/', AsyncCampusLocationListView.as_view(), name='aio-campus-list'),
+    # Server-Sent Events streams that replace dashboard polling (see core.events)
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
+    path('events/plug/', PlugEventStream.as_view(), name='events-plug'),
+    path('events/council/', CouncilEventStream.as_view(), name='events-council'),
+    path('events/citizen/', CitizenEventStream.as_view(), name='events-citizen'),
+    # Presigned URLs for uploading photos straight to S3-compatible storage (see core.s3)
+    path('uploads/', DirectUploadView.as_view(), name='direct-upload'),
     path('council-stats/', CouncilStatsView.as_view(), name='council-stats'),
     path('council-purge/', CouncilDataPurgeView.as_view(), name='council-purge'),
 ]
@@ -1,24 +1,64 @@
+import asyncio
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.utils.cache import patch_cache_control
 from store.models import Store
-from orders.models import Order, OrderItem
-from django.db.models import Sum
-from .models import Institution, CampusLocation
-from .serializers import InstitutionSerializer, CampusLocationSerializer
+from users.authentication import CachedTokenAuthentication
+from .events import COUNCIL, broker, citizen_channel, format_event, issue_ticket, plug_channel, redeem_ticket, TICKET_MAX_AGE
+from .models import Institution, CampusLocation, CouncilStats, ActivityEvent, CatalogSnapshot
+from . import s3
+from .serializers import InstitutionSerializer, CampusLocationSerializer, UploadTicketSerializer, UPLOAD_TYPES
+from .aio import AsyncReadView
+from .cache import CachedListMixin
+from .uploads import PayloadTooLarge, megabytes
 
 User = get_user_model()
 
-class InstitutionListView(generics.ListAPIView):
-    queryset = Institution.objects.all()
+class InstitutionListView(CachedListMixin, generics.ListAPIView):
+    queryset = Institution.objects.prefetch_related('locations')
     serializer_class = InstitutionSerializer
     permission_classes = (permissions.AllowAny,)
+    cache_namespace = 'institutions'
 
-class CampusLocationListView(generics.ListAPIView):
+class InstitutionCatalogView(APIView):
+    """
+    Compact institutions + campuses catalog for the signup and marketplace pickers,
+    served from a precomputed snapshot in one round trip.
+    The unversioned URL revalidates cheaply by ETag; the versioned URL is immutable.
+    """
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
+
+    def get(self, request, version=None):
+        snapshot = CatalogSnapshot.institutions()
+        if version is not None and version != snapshot.version:
+            return Response({"detail": "Catalog version has been superseded.", "version": snapshot.version}, status=404)
+
+        etag = f'"{snapshot.version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(snapshot.payload, content_type='application/json')
+        response['ETag'] = etag
+        if version is None:
+            patch_cache_control(response, public=True, max_age=300, stale_while_revalidate=86400)
+        else:
+            patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+        return response
+
+class CampusLocationListView(CachedListMixin, generics.ListAPIView):
     queryset = CampusLocation.objects.all()
     serializer_class = CampusLocationSerializer
     permission_classes = (permissions.AllowAny,)
+    cache_namespace = 'campuses'
 
     def get_queryset(self):
         institution_id = self.request.query_params.get('institution')
@@ -26,6 +66,23 @@ class CampusLocationListView(generics.ListAPIView):
             return CampusLocation.objects.filter(institution_id=institution_id)
         return CampusLocation.objects.all()
 
+class AsyncInstitutionListView(AsyncReadView):
+    serializer_class = InstitutionSerializer
+    cache_namespace = 'institutions'
+
+    def get_queryset(self, request):
+        return Institution.objects.prefetch_related('locations')
+
+class AsyncCampusLocationListView(AsyncReadView):
+    serializer_class = CampusLocationSerializer
+    cache_namespace = 'campuses'
+
+    def get_queryset(self, request):
+        institution_id = request.query_params.get('institution')
+        if institution_id:
+            return CampusLocation.objects.filter(institution_id=institution_id)
+        return CampusLocation.objects.all()
+
 class CouncilStatsView(APIView):
     """
     Consolidated metrics for the Tribe Council (SuperAdmin) Dashboard.
@@ -33,55 +90,31 @@ class CouncilStatsView(APIView):
     permission_classes = (permissions.IsAdminUser,)
 
     def get(self, request):
-        from users.models import VerificationRequest
-        from store.models import Product
-        
-        # Get Live Activity Feed (Last 10 items across different models)
-        activity = []
-        
-        # New Signups
-        for u in User.objects.all().order_by('-id')[:10]:
-            activity.append({
-                "type": "USER",
-                "label": "Tribe Member Joined",
-                "user": u.username,
-                "detail": f"{u.email} ({u.role_display})",
-                "timestamp": u.date_joined if hasattr(u, 'date_joined') else "Recent"
-            })
-            
-        # New Drops
-        for p in Product.objects.all().order_by('-id')[:10]:
-            activity.append({
-                "type": "DROP",
-                "label": "New Drop Launched",
-                "user": p.store.owner.username,
-                "detail": f"{p.name} - ₦{p.price}",
-                "timestamp": p.created_at
-            })
-            
-        # Recent Orders
-        for item in OrderItem.objects.all().order_by('-id')[:10]:
-            activity.append({
-                "type": "ORDER",
-                "label": "Transaction Active",
-                "user": item.order.customer.username,
-                "detail": f"{item.product.name} (₦{item.price})",
-                "status": item.status,
-                "timestamp": item.order.created_at if hasattr(item.order, 'created_at') else "Recent"
-            })
-
-        # Sort combined activity by "timestamp" descending (mocking timestamps for some)
-        # For simplicity in this mock-heavy environment, let's just use the lists separately or combined.
-        # The user wants "everything sent there", so I'll provide a 'live_pulse' list.
-        
+        # Live Activity Feed: one indexed range scan over the append-only event log.
+        # Pollers pass the newest event id they saw as ?since= to page forward through the
+        # events after it, 20 at a time (each page listed newest first, like the feed);
+        # `pulse_has_more` says another page is waiting, so a burst is never skipped.
+        since = request.query_params.get('since')
+        has_more = False
+        if since and since.isdigit():
+            events = list(ActivityEvent.objects.filter(id__gt=int(since)).order_by('id')[:21])
+            has_more = len(events) > 20
+            pulse = events[:20][::-1]
+        else:
+            pulse = ActivityEvent.objects.order_by('-created_at', '-id')[:20]
+        live_pulse = [event.as_pulse() for event in pulse]
+
+        # Totals are maintained incrementally (see core.signals), so this is a single-row read.
+        snapshot = CouncilStats.current()
         stats = {
-            "total_citizens": User.objects.filter(is_citizen=True).count(),
-            "total_plugs": User.objects.filter(is_plug=True).count(),
-            "revenue": float(Order.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0),
-            "active_disputes": OrderItem.objects.filter(status='DISPUTED').count(),
-            "pending_mandates": VerificationRequest.objects.filter(status='PENDING').count(),
+            "total_citizens": snapshot.total_citizens,
+            "total_plugs": snapshot.total_plugs,
+            "revenue": float(snapshot.revenue),
+            "active_disputes": snapshot.active_disputes,
+            "pending_mandates": snapshot.pending_mandates,
             "uptime": "99.9%",
-            "live_pulse": sorted(activity, key=lambda x: str(x.get('timestamp', '')), reverse=True)[:20]
+            "live_pulse": live_pulse,
+            "pulse_has_more": has_more,
         }
         return Response(stats)
 
@@ -100,5 +133,105 @@ class CouncilDataPurgeView(APIView):
         Order.objects.all().delete()
         Product.objects.all().delete()
         VerificationRequest.objects.all().delete()
+        ActivityEvent.objects.all().delete()
+        CouncilStats.rebuild()
         
         return Response({"status": "Tribe state sanitized. All test data purged."})
+
+class EventTicketView(APIView):
+    """A short-lived ticket for opening an event stream (see core.events)."""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        return Response({"ticket": issue_ticket(request.user), "expires_in": TICKET_MAX_AGE}, status=201)
+
+class EventStreamView(View):
+    """
+    Server-Sent Events stream for one dashboard role, fed by core.events.
+    EventSource can't send headers, so the stream may also authenticate with ?ticket=
+    from EventTicketView. Every (re)connect starts with a `ready` event, on which clients refetch.
+    """
+    http_method_names = ['get', 'options']
+    heartbeat = 15
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would drain the endless stream into memory and never answer.
+            return JsonResponse({"detail": "Live updates need the ASGI server; poll instead."}, status=503)
+        user = await self.authenticate(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        channels = await self.get_channels(user)
+        if not channels:
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+        response = StreamingHttpResponse(self.stream(channels), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+        return response
+
+    async def authenticate(self, request):
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Token '):
+            try:
+                user, _ = await sync_to_async(CachedTokenAuthentication().authenticate_credentials)(header[len('Token '):])
+            except AuthenticationFailed:
+                return None
+            return user
+        user_id = redeem_ticket(request.GET.get('ticket', ''))
+        if user_id is None:
+            return None
+        return await User.objects.filter(pk=user_id, is_active=True).afirst()
+
+    async def get_channels(self, user):
+        raise NotImplementedError
+
+    async def stream(self, channels):
+        # Subscribe inside the generator so a client gone before the first read holds nothing.
+        subscription = broker.subscribe(channels)
+        try:
+            yield f"retry: 5000\n{format_event(0, 'ready', {})}"
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+class PlugEventStream(EventStreamView):
+    """New order items and escrow/wallet movements for the plug's store."""
+
+    async def get_channels(self, user):
+        store_id = await Store.objects.filter(owner=user).values_list('id', flat=True).afirst()
+        return [plug_channel(store_id)] if user.is_plug and store_id else []
+
+class CouncilEventStream(EventStreamView):
+    """New disputes, verification requests and dashboard counter deltas."""
+
+    async def get_channels(self, user):
+        return [COUNCIL] if user.is_staff else []
+
+class CitizenEventStream(EventStreamView):
+    """Status changes on the citizen's own order items."""
+
+    async def get_channels(self, user):
+        return [citizen_channel(user.pk)]
+
+
+class DirectUploadView(APIView):
+    """Presigned PUT URLs for sending photos straight to the bucket (see core.s3)."""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        if not s3.enabled():
+            return Response({"detail": "Direct uploads are not enabled; send the photo with the form."}, status=404)
+        serializer = UploadTicketSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        photo = serializer.validated_data
+        if photo['size'] > settings.UPLOAD_MAX_FILE_SIZE:
+            raise PayloadTooLarge(f"Photos are limited to {megabytes(settings.UPLOAD_MAX_FILE_SIZE)}.")
+        ticket = s3.issue_ticket(
+            request.user, photo['kind'], UPLOAD_TYPES[photo['content_type']], photo['content_type'], photo['size'], photo['sha256'],
+        )
+        return Response(ticket, status=201)
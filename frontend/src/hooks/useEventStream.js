@@ -0,0 +1,94 @@
+import { useEffect, useRef } from 'react';
+import api, { baseURL } from '../services/api';
+
+const EVENTS = ['ready', 'order_item', 'balance', 'dispute', 'verification', 'stats', 'resync'];
+
+// How long a stream may take to say `ready` before the screen starts polling.
+const READY_TIMEOUT = 5000;
+
+// Subscribes to a dashboard event stream (plug, council or citizen) and calls `onEvent`
+// whenever something the screen shows may have changed. Events are hints, not data:
+// screens refetch, and a burst of events collapses into a single refetch.
+//
+// Streams need the ASGI server. Whenever the stream is not live (runserver, a buffering
+// proxy, a dropped connection) the screen is refreshed every `poll` ms instead, and the
+// stream is retried on the same cadence.
+export const useEventStream = (role, onEvent, { poll = 30000, debounce = 300 } = {}) => {
+    const handler = useRef(onEvent);
+    handler.current = onEvent;
+
+    useEffect(() => {
+        if (!localStorage.getItem('tribe_token')) return undefined;
+
+        let source = null;
+        let closed = false;
+        let connected = false;
+        let timer = null;
+        let pollTimer = null;
+        let readyTimer = null;
+        let retryTimer = null;
+
+        const schedule = (event) => {
+            clearTimeout(timer);
+            timer = setTimeout(() => handler.current(event), debounce);
+        };
+        const startPolling = () => {
+            if (!pollTimer) pollTimer = setInterval(() => handler.current({ type: 'poll' }), poll);
+        };
+        const stopPolling = () => {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        };
+        const retry = () => {
+            startPolling();
+            clearTimeout(retryTimer);
+            retryTimer = setTimeout(connect, poll);
+        };
+
+        async function connect() {
+            if (typeof EventSource === 'undefined') {
+                startPolling();
+                return;
+            }
+            let ticket;
+            try {
+                // EventSource cannot send headers, so it authenticates with a short-lived
+                // ticket in the query string rather than the API token.
+                ({ data: { ticket } } = await api.post('/core/events/ticket/'));
+            } catch {
+                if (!closed) retry();
+                return;
+            }
+            if (closed) return;
+
+            source = new EventSource(`${baseURL}/core/events/${role}/?ticket=${encodeURIComponent(ticket)}`);
+            readyTimer = setTimeout(startPolling, READY_TIMEOUT);
+            source.addEventListener('ready', (event) => {
+                clearTimeout(readyTimer);
+                stopPolling();
+                if (connected) schedule(event); // refetch anything missed while the stream was down
+                connected = true; // the screen's own mount fetch covers the first connect
+            });
+            EVENTS.filter((name) => name !== 'ready').forEach((name) => source.addEventListener(name, schedule));
+            // The ticket expires within a minute, so reconnect with a fresh one
+            // instead of letting EventSource retry the same URL.
+            source.onerror = () => {
+                source.close();
+                clearTimeout(readyTimer);
+                connected = true; // so the next `ready` refetches whatever the gap missed
+                retry();
+            };
+        }
+
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(timer);
+            clearTimeout(readyTimer);
+            clearTimeout(retryTimer);
+            stopPolling();
+            if (source) source.close();
+        };
+    }, [role, poll, debounce]);
+};
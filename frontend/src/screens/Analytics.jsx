@@ -15,6 +15,7 @@ import {
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 
 const Analytics = () => {
@@ -38,10 +39,10 @@ const Analytics = () => {
 
     useEffect(() => {
         fetchAnalytics(true);
-        const interval = setInterval(() => fetchAnalytics(false), 30000);
-        return () => clearInterval(interval);
     }, []);
 
+    useEventStream('plug', () => fetchAnalytics(false));
+
     if (isLoading) return (
         <div className="min-h-screen flex items-center justify-center">
             <Loader2 className="animate-spin text-[#10B981]" size={40} />
@@ -141,7 +141,7 @@ const Checkout = () => {
             };
 
             console.log("DEBUG: Attempting Order Registration", orderData);
-            const response = await api.post('/orders/orders/', orderData);
+            const response = await api.post('/orders/orders/', orderData, { headers: { 'Idempotency-Key': payment_ref } });
             console.log("DEBUG: Order Registered Successfully", response.data);
             return { tx_ref: payment_ref, order: response.data };
         } catch (error) {
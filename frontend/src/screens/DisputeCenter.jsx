@@ -11,6 +11,7 @@ import {
     ArrowRight
 } from 'lucide-react';
 import api from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 
 const DisputeCenter = () => {
@@ -30,11 +31,10 @@ const DisputeCenter = () => {
 
     useEffect(() => {
         fetchDisputes();
-        // Live Realtime Polling
-        const interval = setInterval(fetchDisputes, 15000);
-        return () => clearInterval(interval);
     }, []);
 
+    useEventStream('council', fetchDisputes, { poll: 15000 });
+
     const resolveDispute = async (id, resolution) => {
         const loadingToast = toast.loading(`Finalizing FairPlay resolution...`);
         try {
@@ -13,7 +13,7 @@ import {
     Truck
 } from 'lucide-react';
 import { mapTerm } from '../constants/dictionary';
-import api from '../services/api';
+import api, { uploadPhoto } from '../services/api';
 import { toast } from 'react-hot-toast';
 
 const DropCreator = () => {
@@ -91,12 +91,14 @@ const DropCreator = () => {
                         image4: null,
                         image5: null
                     });
+                    // The first five gallery photos fill the slots; an upload into one replaces that photo.
+                    const gallery = dropRes.data.gallery || [];
                     setPreviews({
-                        image: dropRes.data.image,
-                        image2: dropRes.data.image2,
-                        image3: dropRes.data.image3,
-                        image4: dropRes.data.image4,
-                        image5: dropRes.data.image5
+                        image: gallery[0]?.image || null,
+                        image2: gallery[1]?.image || null,
+                        image3: gallery[2]?.image || null,
+                        image4: gallery[3]?.image || null,
+                        image5: gallery[4]?.image || null
                     });
                     setDeliveryMode(parseFloat(dropRes.data.campus_delivery_fee) > 0 ? 'PAID' : 'FREE');
                 }
@@ -114,13 +116,13 @@ const DropCreator = () => {
         setIsSaving(true);
         try {
             const data = new FormData();
-            Object.keys(formData).forEach(key => {
+            for (const key of Object.keys(formData)) {
                 if (['image', 'image2', 'image3', 'image4', 'image5'].includes(key)) {
-                    if (formData[key] instanceof File) data.append(key, formData[key]);
+                    if (formData[key] instanceof File) data.append(key, await uploadPhoto('products', formData[key]));
                 } else if (formData[key] !== '' && formData[key] !== null && formData[key] !== undefined) {
                     data.append(key, formData[key]);
                 }
-            });
+            }
 
             if (isEditMode) {
                 await api.patch(`/store/my-drops/${id}/`, data, {
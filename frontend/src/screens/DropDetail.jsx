@@ -85,13 +85,7 @@ const DropDetail = () => {
 
     if (!drop) return null;
 
-    const allImages = [
-        drop.image,
-        drop.image2,
-        drop.image3,
-        drop.image4,
-        drop.image5
-    ].filter(img => img !== null && img !== undefined);
+    const allImages = (drop.gallery || []).map(photo => photo.image).filter(Boolean);
 
     const getImageUrl = (img) => {
         if (!img) return null;
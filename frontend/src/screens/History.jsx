@@ -14,7 +14,7 @@ import {
     RotateCcw
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import { fetchAll } from '../services/api';
 import { toast } from 'react-hot-toast';
 import { mapTerm } from '../constants/dictionary';
 
@@ -29,8 +29,7 @@ const History = () => {
         const fetchHistory = async () => {
             try {
                 // Fetching plug orders (already contains history in the database)
-                const response = await api.get('/orders/plug-items/');
-                setOrders(response.data);
+                setOrders(await fetchAll('/orders/plug-items/'));
             } catch (error) {
                 console.error("Failed to retrieve order archive.", error);
             } finally {
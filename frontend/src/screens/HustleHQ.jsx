@@ -15,7 +15,8 @@ import {
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { mapTerm } from '../constants/dictionary';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 import ErrorState from '../components/ErrorState';
 import TribeLoader from '../components/TribeLoader';
@@ -31,12 +32,12 @@ const HustleHQ = () => {
         if (showLoading) setIsLoading(true);
         setError(null);
         try {
-            const [storeRes, ordersRes] = await Promise.all([
+            const [storeRes, orders] = await Promise.all([
                 api.get('/store/hustle-hq/my_store/'),
-                api.get('/orders/plug-items/')
+                fetchAll('/orders/plug-items/')
             ]);
             setStore(storeRes.data);
-            setOrders(ordersRes.data);
+            setOrders(orders);
         } catch (error) {
             console.error('Failed to load your HQ data', error);
             if (showLoading) {
@@ -52,10 +53,10 @@ const HustleHQ = () => {
 
     useEffect(() => {
         fetchData(true);
-        const interval = setInterval(() => fetchData(false), 30000); // Pulse every 30 seconds
-        return () => clearInterval(interval);
     }, []);
 
+    useEventStream('plug', () => fetchData(false));
+
     if (isLoading) return (
         <div className="min-h-screen flex items-center justify-center">
             <TribeLoader size={64} />
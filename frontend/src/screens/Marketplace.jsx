@@ -3,7 +3,7 @@ import { Search, Filter, MapPin, Zap, ShoppingBag, ArrowUpRight, Plus, X, Rotate
 import { motion, AnimatePresence } from 'framer-motion';
 import { mapTerm } from '../constants/dictionary';
 import { useNavigate, Link } from 'react-router-dom';
-import api from '../services/api';
+import api, { unwrapList } from '../services/api';
 import { toast } from 'react-hot-toast';
 import ErrorState from '../components/ErrorState';
 import { useCart } from '../context/CartContext';
@@ -11,9 +11,11 @@ import { useCart } from '../context/CartContext';
 const Marketplace = () => {
     const navigate = useNavigate();
     const [searchTerm, setSearchTerm] = useState('');
-    const [activeCircle, setActiveCircle] = useState('All');
+    const [activeCircle, setActiveCircle] = useState('');
     const [drops, setDrops] = useState([]);
-    const [circles, setCircles] = useState(['All']);
+    const [nextPage, setNextPage] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+    const [circles, setCircles] = useState([{ id: '', name: 'All' }]);
     const [institutions, setInstitutions] = useState([]);
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
@@ -29,53 +31,111 @@ const Marketplace = () => {
         institution: ''
     });
 
-    const fetchData = async () => {
-        setIsLoading(true);
-        setError(null);
+    // Circle, campus, awoof and price filters run on the server, so every page of the feed
+    // (and every search) is already narrowed instead of filtering just the first page here.
+    const query = {
+        circle: activeCircle || undefined,
+        institution: filters.institution || undefined,
+        awoof: filters.onlyAwoof ? 1 : undefined,
+        min_price: filters.minPrice || undefined,
+        max_price: filters.maxPrice || undefined,
+    };
+    const queryKey = JSON.stringify(query);
+
+    const fetchPickers = async () => {
         try {
-            const [dropsRes, catsRes, instRes] = await Promise.all([
-                api.get('/store/marketplace/'),
+            const [catsRes, instRes] = await Promise.all([
                 api.get('/store/circles/'),
-                api.get('/core/institutions/')
+                api.get('/core/institutions/catalog/')
             ]);
-            setDrops(dropsRes.data);
-            setCircles(['All', ...catsRes.data.map(c => c.name)]);
-            setInstitutions(instRes.data);
+            setCircles([{ id: '', name: 'All' }, ...catsRes.data]);
+            setInstitutions(instRes.data.institutions);
         } catch (error) {
+            console.error('Failed to load Circles and campuses', error);
+        }
+    };
+
+    const fetchDrops = async (isStale = () => false) => {
+        setIsLoading(true);
+        setError(null);
+        try {
+            const { data } = await api.get('/store/marketplace/', { params: query });
+            if (isStale()) return;
+            setDrops(unwrapList(data));
+            setNextPage(data.next ?? null);
+        } catch (error) {
+            if (isStale()) return;
             console.error('Failed to load the latest Drops', error);
             setError({
                 message: 'Could not load the latest Drops. The Tribe network might be under maintenance.',
                 code: error.response?.status
             });
         } finally {
-            setIsLoading(false);
+            if (!isStale()) setIsLoading(false);
+        }
+    };
+
+    // The `next` link already carries the cursor and the filters.
+    const loadMore = async () => {
+        setIsLoadingMore(true);
+        try {
+            const { data } = await api.get(nextPage);
+            setDrops(current => [...current, ...unwrapList(data)]);
+            setNextPage(data.next ?? null);
+        } catch (error) {
+            console.error('Failed to load more Drops', error);
+            toast.error('Could not load more Drops');
+        } finally {
+            setIsLoadingMore(false);
         }
     };
 
+    const fetchData = () => {
+        fetchPickers();
+        fetchDrops();
+    };
+
     useEffect(() => {
-        fetchData();
+        fetchPickers();
     }, []);
 
-    const filteredDrops = drops.filter(drop => {
-        const matchesCategory = activeCircle === 'All' || drop.category_name === activeCircle;
-        const matchesSearch = drop.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-            drop.description?.toLowerCase().includes(searchTerm.toLowerCase());
+    // Debounced like search, so typing a price doesn't fire a request per key.
+    useEffect(() => {
+        let stale = false;
+        const timer = setTimeout(() => fetchDrops(() => stale), 250);
+        return () => {
+            stale = true;
+            clearTimeout(timer);
+        };
+    }, [queryKey]);
 
-        const price = parseFloat(drop.price);
-        const matchesMinPrice = !filters.minPrice || price >= parseFloat(filters.minPrice);
-        const matchesMaxPrice = !filters.maxPrice || price <= parseFloat(filters.maxPrice);
-        const matchesAwoof = !filters.onlyAwoof || drop.is_awoof;
-        const matchesInstitution = !filters.institution || drop.institution_name === filters.institution;
+    // Search runs on the server (ranked, full catalog); debounce so typing doesn't fire a request per key.
+    const [searchResults, setSearchResults] = useState(null);
+    useEffect(() => {
+        const term = searchTerm.trim();
+        if (!term) {
+            setSearchResults(null);
+            return;
+        }
+        const timer = setTimeout(async () => {
+            try {
+                const response = await api.get('/store/marketplace/', { params: { ...query, search: term, page_size: 100 } });
+                setSearchResults(unwrapList(response.data));
+            } catch (error) {
+                console.error('Search failed', error);
+            }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [searchTerm, queryKey]);
 
-        return matchesCategory && matchesSearch && matchesMinPrice && matchesMaxPrice && matchesAwoof && matchesInstitution;
-    });
+    const filteredDrops = searchResults ?? drops;
 
     const resetFilters = (clearCampus = false) => {
         setFilters({
             minPrice: '',
             maxPrice: '',
             onlyAwoof: false,
-            institution: clearCampus ? '' : (user?.institution_name || '')
+            institution: clearCampus ? '' : String(user?.institution ?? '')
         });
         toast.success(clearCampus ? "All filters cleared" : "Filters reset to campus default");
     };
@@ -148,7 +208,7 @@ const Marketplace = () => {
                                     >
                                         <option value="">All Nigerian Campuses</option>
                                         {institutions.map(inst => (
-                                            <option key={inst.id} value={inst.name}>{inst.name}</option>
+                                            <option key={inst.id} value={inst.id}>{inst.name}</option>
                                         ))}
                                     </select>
                                 </div>
@@ -257,20 +317,20 @@ const Marketplace = () => {
                 <div className="flex gap-6 overflow-x-auto pb-4 no-scrollbar -mx-4 px-4">
                     {circles.map(circle => (
                         <button
-                            key={circle}
-                            onClick={() => setActiveCircle(circle)}
+                            key={circle.id || 'all'}
+                            onClick={() => setActiveCircle(circle.id)}
                             className="flex flex-col items-center gap-3 flex-shrink-0 group"
                         >
-                            <div className={`w-20 h-20 rounded-full flex items-center justify-center border transition-all duration-300 relative ${activeCircle === circle
+                            <div className={`w-20 h-20 rounded-full flex items-center justify-center border transition-all duration-300 relative ${activeCircle === circle.id
                                 ? 'border-[#10B981] bg-white ring-2 ring-[#10B981]/10'
                                 : 'border-gray-100 bg-gray-50/50 group-hover:border-[#10B981]/30'
                                 }`}>
-                                <div className={`w-14 h-14 rounded-full flex items-center justify-center font-black text-xl ${activeCircle === circle ? 'bg-[#10B981] text-white shadow-lg' : 'bg-white text-gray-400 border border-gray-100'}`}>
-                                    {circle === 'All' ? '⚡' : circle[0]}
+                                <div className={`w-14 h-14 rounded-full flex items-center justify-center font-black text-xl ${activeCircle === circle.id ? 'bg-[#10B981] text-white shadow-lg' : 'bg-white text-gray-400 border border-gray-100'}`}>
+                                    {circle.id === '' ? '⚡' : circle.name[0]}
                                 </div>
                             </div>
-                            <span className={`text-[11px] font-black uppercase tracking-tighter ${activeCircle === circle ? 'text-[#1F2937]' : 'text-gray-400'}`}>
-                                {circle}
+                            <span className={`text-[11px] font-black uppercase tracking-tighter ${activeCircle === circle.id ? 'text-[#1F2937]' : 'text-gray-400'}`}>
+                                {circle.name}
                             </span>
                         </button>
                     ))}
@@ -408,6 +468,18 @@ const Marketplace = () => {
                     </motion.div>
                 </AnimatePresence>
             )}
+
+            {!isLoading && !error && !searchResults && nextPage && (
+                <div className="mt-10 flex justify-center">
+                    <button
+                        onClick={loadMore}
+                        disabled={isLoadingMore}
+                        className="flex items-center gap-2 text-xs font-black text-gray-400 uppercase tracking-widest hover:text-[#10B981] transition-all disabled:opacity-50"
+                    >
+                        <RotateCcw size={14} className={isLoadingMore ? 'animate-spin' : ''} /> Load More Drops
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
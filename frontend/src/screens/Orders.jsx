@@ -2,7 +2,8 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Package, MapPin, Clock, CheckCircle2, AlertCircle } from 'lucide-react';
 import { mapTerm } from '../constants/dictionary';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 import ErrorState from '../components/ErrorState';
 
@@ -16,13 +17,12 @@ const Orders = () => {
     const [user] = useState(JSON.parse(localStorage.getItem('tribe_user') || '{}'));
     const isHustleHQ = window.location.pathname.startsWith('/hq');
 
-    const fetchOrders = async () => {
-        setIsLoading(true);
+    const fetchOrders = async (showLoading = true) => {
+        if (showLoading) setIsLoading(true);
         setError(null);
         try {
             const endpoint = isHustleHQ ? '/orders/plug-items/' : '/orders/orders/';
-            const response = await api.get(endpoint);
-            setOrders(response.data);
+            setOrders(await fetchAll(endpoint));
         } catch (error) {
             console.error('Failed to load orders', error);
             if (error.response?.status !== 404) {
@@ -37,6 +37,8 @@ const Orders = () => {
         fetchOrders();
     }, []);
 
+    useEventStream(isHustleHQ ? 'plug' : 'citizen', () => fetchOrders(false));
+
     const handleConfirm = async (itemId) => {
         try {
             await api.post(`/orders/citizen-items/${itemId}/confirm-received/`);
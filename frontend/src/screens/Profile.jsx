@@ -7,7 +7,7 @@ import {
 import { mapTerm } from '../constants/dictionary';
 import { useNavigate, Link } from 'react-router-dom';
 import { toast } from 'react-hot-toast';
-import api from '../services/api';
+import api, { uploadPhoto } from '../services/api';
 import TribeLoader from '../components/TribeLoader';
 
 const Profile = () => {
@@ -97,13 +97,12 @@ const Profile = () => {
         const file = e.target.files[0];
         if (!file) return;
 
-        const uploadFormData = new FormData();
-        uploadFormData.append('avatar', file);
-
         setIsUploading(true);
         const toastId = toast.loading('Syncing your new look...');
 
         try {
+            const uploadFormData = new FormData();
+            uploadFormData.append('avatar', await uploadPhoto('avatars', file));
             const response = await api.patch('/users/profile/', uploadFormData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
@@ -11,7 +11,7 @@ import {
     Loader2
 } from 'lucide-react';
 import { mapTerm } from '../constants/dictionary';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
 import ErrorState from '../components/ErrorState';
 import TribeLoader from '../components/TribeLoader';
 
@@ -27,13 +27,13 @@ const PublicStore = () => {
         setIsLoading(true);
         setError(null);
         try {
-            // Fetch store info and its drops
-            const [storeRes, dropsRes] = await Promise.all([
+            // Fetch store info and every one of its drops, not just the first page
+            const [storeRes, storeDrops] = await Promise.all([
                 api.get(`/store/hustle-hq/${id}/`),
-                api.get(`/store/marketplace/?store=${id}`)
+                fetchAll('/store/marketplace/', { store: id })
             ]);
             setStore(storeRes.data);
-            setDrops(dropsRes.data);
+            setDrops(storeDrops);
         } catch (error) {
             console.error('Failed to load store', error);
             setError("We couldn't reach this Plug's shop right now.");
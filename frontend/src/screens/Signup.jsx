@@ -29,8 +29,8 @@ const Signup = () => {
     useEffect(() => {
         const fetchInstitutions = async () => {
             try {
-                const response = await api.get('/core/institutions/');
-                setInstitutions(response.data);
+                const response = await api.get('/core/institutions/catalog/');
+                setInstitutions(response.data.institutions);
             } catch (err) {
                 console.error("Failed to fetch institutions", err);
             }
@@ -14,7 +14,8 @@ import {
     Scale
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 import { motion } from 'framer-motion';
 import TribeLoader from '../components/TribeLoader';
@@ -33,13 +34,13 @@ const TribeCouncil = () => {
 
     const fetchData = async () => {
         try {
-            const [verRes, statsRes] = await Promise.all([
-                api.get('/users/verifications/'),
+            const [pending, statsRes] = await Promise.all([
+                fetchAll('/users/verifications/', { status: 'PENDING' }),
                 api.get('/core/council-stats/')
             ]);
 
-            // Filter only pending on frontend if needed, or backend handles it
-            setVerifications(verRes.data.filter(v => v.status === 'PENDING'));
+            // The whole pending queue, filtered server-side and walked page by page.
+            setVerifications(pending);
             setStats(statsRes.data);
         } catch (error) {
             console.error(error);
@@ -51,11 +52,11 @@ const TribeCouncil = () => {
 
     useEffect(() => {
         fetchData();
-        // Live Realtime Polling: Refresh every 10 seconds
-        const interval = setInterval(fetchData, 10000);
-        return () => clearInterval(interval);
     }, []);
 
+    // Live: the Council stream pushes new mandates and counter changes (polls without it).
+    useEventStream('council', fetchData, { poll: 10000 });
+
     const handleAction = async (id, action) => {
         const loadingToast = toast.loading(`${action === 'approve' ? 'Approving' : 'Rejecting'}...`);
         try {
@@ -10,7 +10,7 @@ import {
 } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { toast } from 'react-hot-toast';
-import api from '../services/api';
+import api, { unwrapList, uploadPhoto } from '../services/api';
 import TribeLoader from '../components/TribeLoader';
 
 const Verify = () => {
@@ -28,8 +28,8 @@ const Verify = () => {
         const checkStatus = async () => {
             setIsLoading(true);
             try {
-                const response = await api.get('/users/verifications/');
-                const pending = response.data.find(req => req.status === 'PENDING');
+                const response = await api.get('/users/verifications/', { params: { status: 'PENDING', page_size: 1 } });
+                const pending = unwrapList(response.data)[0];
                 if (pending) {
                     setStep(3); // Pending screen
                 }
@@ -62,7 +62,7 @@ const Verify = () => {
             const data = new FormData();
             data.append('matric_no', formData.matric_no);
             if (formData.id_card) {
-                data.append('id_card', formData.id_card);
+                data.append('id_card', await uploadPhoto('verifications', formData.id_card));
             }
 
             await api.post('/users/verifications/', data, {
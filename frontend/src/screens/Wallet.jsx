@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo } from 'react';
 import {
     Wallet as WalletIcon,
     ArrowUpRight,
@@ -14,6 +14,7 @@ import {
 import { useNavigate } from 'react-router-dom';
 import { mapTerm } from '../constants/dictionary';
 import api from '../services/api';
+import { useEventStream } from '../hooks/useEventStream';
 import { toast } from 'react-hot-toast';
 import TribeLoader from '../components/TribeLoader';
 
@@ -49,10 +50,14 @@ const Wallet = () => {
 
     useEffect(() => {
         fetchData(true);
-        const interval = setInterval(() => fetchData(false), 30000);
-        return () => clearInterval(interval);
     }, []);
 
+    useEventStream('plug', () => fetchData(false));
+
+    // One key per withdrawal form: resubmitting after a dropped connection replays the
+    // first result instead of debiting the wallet twice.
+    const payoutKey = useMemo(() => crypto.randomUUID(), [withdrawData]);
+
     const handleWithdrawal = async (e) => {
         e.preventDefault();
         if (parseFloat(withdrawData.amount) > store.wallet_balance) {
@@ -62,7 +67,7 @@ const Wallet = () => {
 
         setIsSubmitting(true);
         try {
-            await api.post('/store/payouts/', withdrawData);
+            await api.post('/store/payouts/', withdrawData, { headers: { 'Idempotency-Key': payoutKey } });
             toast.success("Payout request submitted! Funds will arrive within 24 hours.");
             setShowWithdrawForm(false);
             setWithdrawData({ amount: '', bank_details: '' });
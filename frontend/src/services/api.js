@@ -11,8 +11,10 @@ const getBaseURL = () => {
     return `http://${hostname}:8000/api`;
 };
 
+export const baseURL = getBaseURL();
+
 const api = axios.create({
-    baseURL: getBaseURL(),
+    baseURL,
     headers: {
         'Content-Type': 'application/json',
     },
@@ -47,4 +49,43 @@ api.interceptors.response.use(
     }
 );
 
+// List endpoints are cursor-paginated ({ next, previous, results }); unwrap to the rows.
+export const unwrapList = (data) => (Array.isArray(data) ? data : data?.results ?? []);
+
+// Every row of a paginated list, following the `next` cursors, for screens that show the
+// whole list (order archives, the Council queue). Pages are fetched at the largest size.
+export const fetchAll = async (path, params = {}) => {
+    const rows = [];
+    let url = path;
+    let query = { page_size: 200, ...params };
+    while (url) {
+        const { data } = await api.get(url, { params: query });
+        if (Array.isArray(data)) return data;
+        rows.push(...data.results);
+        url = data.next;
+        query = undefined; // the next link already carries the cursor, size and filters
+    }
+    return rows;
+};
+
+// With object storage enabled, photos go straight to the bucket with a presigned PUT and the
+// form carries the returned token instead of the file. Resolves to the file itself when the
+// server has no object storage, so callers can append the result to their FormData either way.
+export const uploadPhoto = async (kind, file) => {
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', await file.arrayBuffer()));
+    const sha256 = Array.from(digest, (byte) => byte.toString(16).padStart(2, '0')).join('');
+    let ticket;
+    try {
+        ({ data: ticket } = await api.post('/core/uploads/', { kind, content_type: file.type, size: file.size, sha256 }));
+    } catch (error) {
+        if (error.response?.status === 404) return file;
+        throw error;
+    }
+    if (!ticket.exists) {
+        const response = await fetch(ticket.url, { method: ticket.method, headers: ticket.headers, body: file });
+        if (!response.ok) throw new Error(`Photo upload failed (${response.status})`);
+    }
+    return ticket.upload;
+};
+
 export default api;
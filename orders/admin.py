@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, WebhookEvent
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -17,3 +17,10 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'product', 'store', 'status', 'tribeguard_status')
     list_filter = ('status', 'tribeguard_status', 'store')
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'tx_ref', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('event_id', 'tx_ref')
+    readonly_fields = ('received_at', 'processed_at')
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from orders.models import WebhookEvent
+from orders.settlement import MAX_ATTEMPTS, process_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the webhook inbox: settle pending payment events with several concurrent workers, "
+        "retrying failures with exponential backoff. Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the inbox is empty.")
+        parser.add_argument('--report-interval', type=float, default=30.0, help="Seconds between throughput reports.")
+        parser.add_argument('--once', action='store_true', help="Exit once no event is due instead of polling.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.totals = Counter()
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        started = time.monotonic()
+
+        workers = [threading.Thread(target=self.work, daemon=True) for _ in range(options['workers'])]
+        for worker in workers:
+            worker.start()
+        try:
+            last_report = started
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.05)
+                if time.monotonic() - last_report >= options['report_interval']:
+                    self.report(started)
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            self.stop.set()
+            for worker in workers:
+                worker.join()
+        self.report(started)
+
+    def work(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    outcome = process_batch(self.options['batch_size'], self.options['max_attempts'])
+                except DatabaseError as exc:
+                    # Lost the connection or timed out on a lock; the claimed batch was rolled back.
+                    self.stderr.write(f"Worker batch failed: {exc}")
+                    connection.close()
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+                with self.lock:
+                    self.totals.update(outcome)
+                if any(outcome.values()):
+                    continue
+                # Nothing due that another worker hasn't already claimed.
+                if self.options['once']:
+                    return
+                self.stop.wait(self.options['poll_interval'])
+        finally:
+            connection.close()
+
+    def report(self, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        pending = WebhookEvent.objects.filter(status='PENDING')
+        oldest = pending.order_by('received_at').values_list('received_at', flat=True).first()
+        lag = (timezone.now() - oldest).total_seconds() if oldest else 0
+        with self.lock:
+            totals = dict(self.totals)
+        settled = totals.get('processed', 0)
+        self.stdout.write(
+            f"processed={settled} retried={totals.get('retried', 0)} failed={totals.get('failed', 0)} "
+            f"rate={settled / elapsed:.1f}/s backlog={pending.count()} oldest_pending={lag:.0f}s"
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderitem_created_at'),
+        ('store', '0008_payoutrequest_payout_store_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['store', '-created_at', '-id'], name='orderitem_store_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(condition=models.Q(('status', 'DISPUTED')), fields=['-created_at', '-id'], name='orderitem_disputed_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # Existing rows start out as last changed when they were created.
+    apps.get_model('orders', 'OrderItem').objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_webhookevent'),
+        ('store', '0010_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['store', 'updated_at', 'id'], name='orderitem_store_sync_idx'),
+        ),
+    ]
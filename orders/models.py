@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from core.events import publish, watched, plug_channel, citizen_channel
 
 class Order(models.Model):
     DELIVERY_CHOICES = [
@@ -19,6 +21,11 @@ class Order(models.Model):
     delivery_phone = models.CharField(max_length=15, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_feed_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.customer.email}"
 
@@ -42,6 +49,63 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RECEIVED')
     tribeguard_status = models.CharField(max_length=20, choices=TRIBEGUARD_CHOICES, default='LOCKED')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every write, including the .update() in orders.views.settle_item; drives `?since=` sync.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-created_at', '-id'], name='orderitem_store_feed_idx'),
+            models.Index(fields=['store', 'updated_at', 'id'], name='orderitem_store_sync_idx'),
+            # Disputes are a tiny slice of all items; keep only those in the index.
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status='DISPUTED'), name='orderitem_disputed_idx'),
+        ]
+
+    def announce(self, created=False):
+        """Push this item's state to its plug's and customer's dashboard streams."""
+        if not watched():
+            return
+        data = {'id': self.pk, 'order': self.order_id, 'status': self.status, 'tribeguard_status': self.tribeguard_status}
+        channels = [plug_channel(self.store_id)]
+        if not created:
+            channels.append(citizen_channel(self.order.customer_id))
+        publish(channels, 'order_item', data)
 
     def __str__(self):
         return f"{self.product.name} in Order {self.order.id}"
+
+class WebhookEvent(models.Model):
+    """
+    Raw payment gateway events, persisted by the webhook and settled later by
+    `manage.py process_webhooks`. Deliveries are deduplicated on the event type and
+    the gateway's transaction id, so retries from Flutterwave are stored only once
+    while later events about the same transaction (e.g. a refund) still land.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSED', 'Processed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50)
+    tx_ref = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event_type', 'event_id'], name='webhook_event_unique'),
+        ]
+        indexes = [
+            # The worker's queue: only events still waiting to be settled.
+            models.Index(fields=['available_at', 'id'], condition=models.Q(status='PENDING'), name='webhook_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
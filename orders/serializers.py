@@ -1,6 +1,13 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from core.models import ActivityEvent
 from .models import Order, OrderItem
-from store.models import Product, Store
+from store.models import Product
+
+PROTOCOL_FEE_RATE = Decimal('0.02')
+FLAT_DELIVERY_FEE = Decimal('500.00')
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
@@ -14,32 +21,86 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ('id', 'product', 'product_name', 'store', 'store_name', 'customer_username', 'citizen_name', 'quantity', 'status', 'tribeguard_status', 'price', 'total_price', 'created_at')
-        read_only_fields = ('id', 'status', 'tribeguard_status')
+        read_only_fields = ('id', 'store', 'status', 'tribeguard_status')
 
     def get_total_price(self, obj):
         return obj.product.price * obj.quantity
 
+class OrderLineSerializer(serializers.Serializer):
+    """
+    A cart line as posted at checkout. Products are resolved for the whole cart in one
+    query by OrderSerializer.validate, and the store always comes from the product.
+    """
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+    def to_representation(self, item):
+        return OrderItemSerializer(item, context=self.context).data
+
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+    items = OrderLineSerializer(many=True)
     customer_email = serializers.EmailField(source='customer.email', read_only=True)
 
     class Meta:
         model = Order
         fields = ('id', 'customer', 'customer_email', 'total_amount', 'payment_ref', 'is_paid', 'delivery_method', 'delivery_address', 'delivery_phone', 'created_at', 'items')
-        read_only_fields = ('id', 'customer', 'created_at', 'is_paid')
+        read_only_fields = ('id', 'customer', 'total_amount', 'created_at', 'is_paid')
 
     def validate_delivery_method(self, value):
         if value in ['TRIBE_RUNNER', 'TRIBE_LOGISTICS']:
             raise serializers.ValidationError("This delivery method is coming soon and cannot be used yet.")
         return value
 
+    def validate_items(self, value):
+        if not value:
+            raise serializers.ValidationError("Your bag is empty.")
+        return value
+
+    def validate(self, attrs):
+        if 'items' not in attrs:
+            # A partial update of the delivery details; the cart and its total stand.
+            return attrs
+        lines = attrs['items']
+        products = Product.objects.select_related('store').in_bulk({line['product'] for line in lines})
+        missing = sorted({line['product'] for line in lines} - products.keys())
+        if missing:
+            raise serializers.ValidationError({'items': [f"Product {pk} does not exist." for pk in missing]})
+        for line in lines:
+            line['product'] = products[line['product']]
+
+        method = attrs.get('delivery_method', 'MEETUP')
+        if method == 'WAYBILL' and any(line['product'].waybill_delivery_fee is None for line in lines):
+            raise serializers.ValidationError({'delivery_method': "One or more items do not support Waybill delivery."})
+        attrs['total_amount'] = self.order_total(lines, method)
+        return attrs
+
+    @staticmethod
+    def order_total(lines, method):
+        """Subtotal plus delivery and the protocol fee, priced the way Checkout shows it."""
+        subtotal = sum((line['product'].price * line['quantity'] for line in lines), Decimal('0.00'))
+        if method == 'PLUG_DELIVERY':
+            delivery = sum((line['product'].campus_delivery_fee for line in lines), Decimal('0.00'))
+        elif method == 'WAYBILL':
+            delivery = sum((line['product'].waybill_delivery_fee for line in lines), Decimal('0.00'))
+        elif method in ('TRIBE_RUNNER', 'TRIBE_LOGISTICS'):
+            delivery = FLAT_DELIVERY_FEE
+        else:
+            delivery = Decimal('0.00')
+        return (subtotal + delivery + subtotal * PROTOCOL_FEE_RATE).quantize(Decimal('0.01'))
+
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        user = self.context['request'].user
-        order = Order.objects.create(customer=user, **validated_data)
-        
-        for item_data in items_data:
-            # Note: In a real app, we would verify the store matches the product
-            OrderItem.objects.create(order=order, **item_data)
-            
+        lines = validated_data.pop('items')
+        validated_data.setdefault('customer', self.context['request'].user)
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=line['product'], store=line['product'].store, quantity=line['quantity'])
+                for line in lines
+            ])
+            # bulk_create skips post_save, so record the pulse events the signal would have.
+            ActivityEvent.objects.bulk_create([ActivityEvent.for_order_item(item) for item in items])
+            for item in items:
+                item.announce(created=True)
+
+        prefetch_related_objects([order], Prefetch('items', queryset=OrderItem.objects.select_related('product', 'store')))
         return order
@@ -0,0 +1,86 @@
+"""
+Settlement of payment gateway events from the WebhookEvent inbox.
+
+The webhook only stores events; `manage.py process_webhooks` claims pending
+ones with `select_for_update(skip_locked=True)` so several workers can drain
+the inbox without stepping on each other, and retries failures with
+exponential backoff.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+from store import balances
+from .models import Order, OrderItem, WebhookEvent
+
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = timedelta(seconds=5)
+MAX_BACKOFF = timedelta(hours=1)
+
+
+class SettlementError(Exception):
+    pass
+
+
+def backoff(attempts):
+    return min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+
+
+def settle_payment(tx_ref):
+    """Mark the order paid and lock its funds in escrow, one credit per store. Returns False if already paid."""
+    order_id = Order.objects.filter(payment_ref=tx_ref).values_list('id', flat=True).first()
+    if order_id is None:
+        # The gateway can report a charge before checkout has registered the order.
+        raise SettlementError(f"Order with ref {tx_ref} not found.")
+
+    with transaction.atomic():
+        # Only the event that flips is_paid settles the order; replays match no row.
+        if not Order.objects.filter(pk=order_id, is_paid=False).update(is_paid=True):
+            return False
+        totals = (
+            OrderItem.objects.filter(order_id=order_id)
+            .values('store_id')
+            .annotate(amount=Sum(F('product__price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)))
+            .order_by()
+        )
+        balances.lock_in_escrow_by_store({row['store_id']: row['amount'] for row in totals}, order_id=order_id)
+    return True
+
+
+def handle_event(event):
+    data = event.payload.get('data', {})
+    if event.event_type == 'charge.completed' and data.get('status') == 'successful':
+        settle_payment(event.tx_ref)
+
+
+def process_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """
+    Claim up to `batch_size` due events and settle each one in its own savepoint.
+    Returns how many were processed, rescheduled and given up on.
+    """
+    outcome = {'processed': 0, 'retried': 0, 'failed': 0}
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=timezone.now())
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for event in events:
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    handle_event(event)
+            except Exception as exc:
+                event.last_error = str(exc)
+                if event.attempts >= max_attempts:
+                    event.status = 'FAILED'
+                    outcome['failed'] += 1
+                else:
+                    event.available_at = timezone.now() + backoff(event.attempts)
+                    outcome['retried'] += 1
+            else:
+                event.status = 'PROCESSED'
+                event.processed_at = timezone.now()
+                outcome['processed'] += 1
+        WebhookEvent.objects.bulk_update(events, ['status', 'attempts', 'last_error', 'available_at', 'processed_at'])
+    return outcome
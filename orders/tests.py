@@ -1,3 +1,272 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APIClient, APITestCase
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from core.models import Institution
+from core.sync import encode_mark
+from store.balances import balance_of, commission_on, lock_in_escrow
+from store.models import Store, Product, PayoutRequest
+from django.utils import timezone
+from store.models import LedgerEntry
+from .models import Order, OrderItem, WebhookEvent
+from .settlement import process_batch, settle_payment
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ConcurrentSettlementTests(TransactionTestCase):
+    """
+    Hammer one store with parallel releases (including duplicate taps) and payouts,
+    then check that not a single kobo was lost or created.
+    """
+    releases = 200
+    payouts = 100
+    payout_amount = Decimal('1000.00')
+
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.plug = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True, is_citizen=False)
+        self.citizen = User.objects.create(email="citizen@tribe.com", username="citizen")
+        self.store = Store.objects.create(owner=self.plug, institution=institution, name="Plug HQ")
+        self.product = Product.objects.create(store=self.store, name="Drop", price=Decimal('2500.00'))
+        order = Order.objects.create(customer=self.citizen, total_amount=0, payment_ref="stress", is_paid=True)
+        self.items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=self.product, store=self.store, status='DELIVERED')
+            for _ in range(self.releases)
+        ])
+        lock_in_escrow(self.store.pk, self.product.price * self.releases)
+
+    def call(self, user, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            return client.post(url, data, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_parallel_releases_and_payouts_balance_exactly(self):
+        payout = (self.plug, '/api/store/payouts/', {'amount': str(self.payout_amount)})
+        jobs = []
+        for n, item in enumerate(self.items):
+            tap = (self.citizen, f'/api/orders/citizen-items/{item.id}/confirm-received/', None)
+            jobs += [tap, tap]  # every item double-tapped
+            if n % 2:
+                jobs.append(payout)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda job: (job[1], self.call(*job)), jobs))
+
+        released = sum(1 for url, code in results if 'confirm-received' in url and code == 200)
+        paid_out = sum(1 for url, code in results if url == '/api/store/payouts/' and code == 201)
+        self.assertEqual(released, self.releases)
+        self.assertEqual(PayoutRequest.objects.count(), paid_out)
+
+        price = self.product.price
+        balance = balance_of(self.store.pk)
+        self.assertEqual(balance.escrow, Decimal('0.00'))
+        self.assertEqual(balance.wallet, (price - commission_on(price)) * self.releases - self.payout_amount * paid_out)
+        self.assertGreaterEqual(balance.wallet, 0)
+        call_command('reconcile_ledger', checkpoint=True, stdout=StringIO())
+
+
+class OrderPlacementTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.citizen = User.objects.create(email="citizen@tribe.com", username="citizen")
+        plug = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True, is_citizen=False)
+        other = User.objects.create(email="other@tribe.com", username="other", is_plug=True, is_citizen=False)
+        self.store = Store.objects.create(owner=plug, institution=institution, name="Plug HQ")
+        self.other_store = Store.objects.create(owner=other, institution=institution, name="Other HQ")
+        self.products = Product.objects.bulk_create([
+            Product(store=self.store, name=f"Drop {n}", price=Decimal('1000.00'), campus_delivery_fee=Decimal('200.00'))
+            for n in range(50)
+        ])
+        self.client.force_authenticate(self.citizen)
+
+    def place(self, products, ref, **extra):
+        return self.client.post('/api/orders/orders/', {
+            'payment_ref': ref,
+            'total_amount': '1.00',
+            'items': [{'product': product.id, 'store': self.other_store.id, 'quantity': 2} for product in products],
+            **extra,
+        }, format='json')
+
+    def test_store_and_total_come_from_the_server(self):
+        response = self.place(self.products[:3], 'ref-1', delivery_method='PLUG_DELIVERY',
+                              delivery_address='Hall 3', delivery_phone='08000000000')
+        self.assertEqual(response.status_code, 201, response.data)
+        # 6000 subtotal + 3 x 200 delivery + 2% protocol fee
+        self.assertEqual(response.data['total_amount'], '6720.00')
+        self.assertEqual({item['store'] for item in response.data['items']}, {self.store.id})
+        self.assertEqual(OrderItem.objects.filter(store=self.store).count(), 3)
+
+    def test_unknown_product_rejects_the_whole_order(self):
+        ghost = Product(id=999999)
+        response = self.place([self.products[0], ghost], 'ref-2')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Product 999999 does not exist.", response.data['items'])
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(self.place(self.products[:1], 'ref-3').status_code, 201)
+        with CaptureQueriesContext(connection) as full:
+            self.assertEqual(self.place(self.products, 'ref-4').status_code, 201)
+        self.assertEqual(len(single), len(full))
+
+    def test_partial_update_leaves_the_cart_alone(self):
+        order = self.place(self.products[:2], 'ref-5').data
+        response = self.client.patch(f"/api/orders/orders/{order['id']}/", {'delivery_address': 'Hall 5'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['delivery_address'], 'Hall 5')
+        self.assertEqual(response.data['total_amount'], order['total_amount'])
+        self.assertEqual(len(response.data['items']), 2)
+
+
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.citizen = User.objects.create(email="citizen@tribe.com", username="citizen")
+        self.plug = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True, is_citizen=False)
+        store = Store.objects.create(owner=self.plug, institution=institution, name="Plug HQ")
+        product = Product.objects.create(store=store, name="Ankara Dress", price=Decimal('5000.00'))
+        order = Order.objects.create(customer=self.citizen, total_amount=Decimal('15000.00'), payment_ref='ref-1', is_paid=True)
+        self.items = OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, store=store, status='DELIVERED') for _ in range(3)
+        ])
+        OrderItem.objects.update(updated_at=timezone.now() - timedelta(minutes=10))
+
+    def sync(self, since='', **params):
+        self.client.force_authenticate(self.plug)
+        response = self.client.get('/api/orders/plug-items/', {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_poll_returns_only_changes_and_deletes(self):
+        first = self.sync()
+        self.assertEqual([row['id'] for row in first['changed']], [item.id for item in self.items])
+        self.assertEqual(self.sync(first['since'])['changed'], [])
+
+        confirmed, removed, _ = self.items
+        self.client.force_authenticate(self.citizen)
+        self.client.post(f'/api/orders/citizen-items/{confirmed.id}/confirm-received/')
+        removed_id = removed.id
+        removed.delete()
+
+        delta = self.sync(first['since'])
+        self.assertEqual([(row['id'], row['tribeguard_status']) for row in delta['changed']], [(confirmed.id, 'RELEASED')])
+        self.assertEqual(delta['deleted'], [removed_id])
+
+    def test_large_deltas_are_paged(self):
+        page = self.sync(page_size=2)
+        self.assertTrue(page['has_more'])
+        rest = self.sync(page['since'], page_size=2)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([row['id'] for row in page['changed'] + rest['changed']], [item.id for item in self.items])
+
+    def test_mark_older_than_retained_deletes_forces_full_sync(self):
+        stale = encode_mark(timezone.now() - timedelta(days=90), 0)
+        self.client.force_authenticate(self.plug)
+        self.assertEqual(self.client.get('/api/orders/plug-items/', {'since': stale}).status_code, 410)
+
+class WebhookSettlementTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        citizen = User.objects.create(email="citizen@tribe.com", username="citizen")
+        self.stores = []
+        for n in range(3):
+            owner = User.objects.create(email=f"plug{n}@tribe.com", username=f"plug{n}", is_plug=True, is_citizen=False)
+            self.stores.append(Store.objects.create(owner=owner, institution=institution, name=f"Plug {n}"))
+        self.orders = {}
+        for ref, count in (('small', 3), ('large', 60)):
+            order = Order.objects.create(customer=citizen, total_amount=0, payment_ref=ref)
+            for n in range(count):
+                store = self.stores[n % 3]
+                product = Product.objects.create(store=store, name=f"Drop {n}", price=Decimal('150.50'))
+                OrderItem.objects.create(order=order, product=product, store=store, quantity=2)
+            self.orders[ref] = order
+
+    def deliver(self, ref, tx_id=None):
+        payload = {'event': 'charge.completed', 'data': {'id': tx_id or f"tx-{ref}", 'status': 'successful', 'tx_ref': ref}}
+        return self.client.post('/api/orders/payments/webhook/', payload, format='json')
+
+    def drain(self):
+        while any(process_batch().values()):
+            pass
+
+    def test_webhook_only_records_the_event(self):
+        self.assertEqual(self.deliver('large').status_code, 200)
+        self.assertEqual(self.deliver('large').status_code, 200)  # Flutterwave retries
+        self.assertEqual(WebhookEvent.objects.filter(status='PENDING').count(), 1)
+        self.assertFalse(LedgerEntry.objects.exists())
+
+    def test_events_of_different_types_for_one_transaction_are_kept(self):
+        self.deliver('large')
+        refund = {'event': 'refund.completed', 'data': {'id': 'tx-large', 'status': 'successful', 'tx_ref': 'large'}}
+        self.assertEqual(self.client.post('/api/orders/payments/webhook/', refund, format='json').status_code, 200)
+        self.client.post('/api/orders/payments/webhook/', refund, format='json')  # retried
+        self.assertEqual(
+            sorted(WebhookEvent.objects.values_list('event_type', flat=True)), ['charge.completed', 'refund.completed'],
+        )
+
+    def test_each_store_is_credited_once_per_order(self):
+        self.deliver('large')
+        self.deliver('large', tx_id='tx-replayed')  # a second charge event for the same order
+        self.drain()
+        for store in self.stores:
+            self.assertEqual(balance_of(store.pk).escrow, Decimal('6020.00'))
+            self.assertEqual(store.ledger_entries.filter(kind='ESCROW_LOCK', account='ESCROW').count(), 1)
+        self.assertTrue(Order.objects.get(payment_ref='large').is_paid)
+        self.assertEqual(WebhookEvent.objects.filter(status='PROCESSED').count(), 2)
+
+    def test_query_count_is_bounded_by_stores_not_items(self):
+        with CaptureQueriesContext(connection) as small:
+            settle_payment('small')
+        with CaptureQueriesContext(connection) as large:
+            settle_payment('large')
+        self.assertEqual(len(small), len(large))
+
+    def test_unknown_reference_backs_off_then_fails(self):
+        self.deliver('nope')
+        for _ in range(3):
+            process_batch(max_attempts=3)
+            WebhookEvent.objects.update(available_at=timezone.now())
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ('FAILED', 3))
+        self.assertIn("not found", event.last_error)
+
+    def test_malformed_payload_is_rejected(self):
+        self.assertEqual(self.client.post('/api/orders/payments/webhook/', {'event': 'charge.completed'}, format='json').status_code, 400)
+
+
+class WebhookWorkerTests(TransactionTestCase):
+    """Several workers draining one inbox must settle every order exactly once."""
+    orders = 60
+
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        citizen = User.objects.create(email="citizen@tribe.com", username="citizen")
+        owner = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True, is_citizen=False)
+        self.store = Store.objects.create(owner=owner, institution=institution, name="Plug HQ")
+        product = Product.objects.create(store=self.store, name="Drop", price=Decimal('1000.00'))
+        for n in range(self.orders):
+            order = Order.objects.create(customer=citizen, total_amount=0, payment_ref=f"ref-{n}")
+            OrderItem.objects.create(order=order, product=product, store=self.store)
+            for delivery in range(2):
+                WebhookEvent.objects.create(
+                    event_id=f"tx-{n}-{delivery}", event_type='charge.completed', tx_ref=f"ref-{n}",
+                    payload={'event': 'charge.completed', 'data': {'status': 'successful', 'tx_ref': f"ref-{n}"}},
+                )
+
+    def test_parallel_workers_drain_the_inbox(self):
+        out = StringIO()
+        call_command('process_webhooks', once=True, workers=4, batch_size=5, stdout=out)
+        self.assertFalse(WebhookEvent.objects.exclude(status='PROCESSED').exists())
+        self.assertEqual(balance_of(self.store.pk).escrow, Decimal('1000.00') * self.orders)
+        self.assertIn(f"processed={self.orders * 2}", out.getvalue())
@@ -1,19 +1,47 @@
-from decimal import Decimal
 from rest_framework import viewsets, permissions, status, decorators
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from core.events import COUNCIL, publish
+from core.idempotency import IdempotentCreateMixin
+from core.models import CouncilStats
+from core.pagination import KeysetCursorPagination
+from core.sync import DeltaSyncMixin
+from store import balances
+from store.models import Store
 from .models import Order, OrderItem
 from .serializers import OrderSerializer, OrderItemSerializer
 
-class OrderViewSet(viewsets.ModelViewSet):
+def settle_item(item, expected, **changes):
+    """
+    Move an item out of TribeGuard's LOCKED state with a conditional UPDATE.
+    Returns False if another request already settled it (or its status moved on).
+    """
+    changes['updated_at'] = timezone.now()  # .update() skips auto_now, which `?since=` sync relies on
+    claimed = OrderItem.objects.filter(pk=item.pk, tribeguard_status='LOCKED', **expected).update(**changes)
+    if not claimed:
+        return False
+    if expected.get('status') == 'DISPUTED' and changes.get('status', 'DISPUTED') != 'DISPUTED':
+        # .update() skips the signals that maintain the Council counters.
+        CouncilStats.bump(active_disputes=-1)
+        publish(COUNCIL, 'dispute', {'id': item.pk})
+    for field, value in changes.items():
+        setattr(item, field, value)
+    item.announce()
+    return True
+
+class OrderViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     ViewSet for Citizens to manage their orders.
     """
     serializer_class = OrderSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user).prefetch_related('items')
+        items = OrderItem.objects.select_related('product', 'store')
+        return Order.objects.filter(customer=self.request.user).select_related('customer').prefetch_related(Prefetch('items', queryset=items))
 
     def perform_create(self, serializer):
         if self.request.user.is_plug:
@@ -21,15 +49,21 @@ class OrderViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Plugs are restricted from placing orders. Use a Citizen account.")
         serializer.save(customer=self.request.user)
 
-class PlugOrderItemViewSet(viewsets.ReadOnlyModelViewSet):
+class PlugOrderItemViewSet(DeltaSyncMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for Vendors (Plugs) to see items ordered from their store.
+    Pass `?since=` for incremental sync (see core.sync).
     """
     serializer_class = OrderItemSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
-        return OrderItem.objects.filter(store__owner=self.request.user)
+        return OrderItem.objects.filter(store__owner=self.request.user).select_related('product', 'store', 'order__customer')
+
+    def get_tombstones(self):
+        stores = Store.objects.filter(owner=self.request.user).values_list('id', flat=True)
+        return super().get_tombstones().filter(scope_id__in=[str(pk) for pk in stores])
 
     @decorators.action(detail=True, methods=['post'], url_path='mark-delivered')
     def mark_delivered(self, request, pk=None):
@@ -56,22 +90,15 @@ class CitizenOrderItemViewSet(viewsets.ReadOnlyModelViewSet):
         item = self.get_object()
         if item.status != 'DELIVERED':
             return Response({"error": "Item must be marked as delivered by the Plug first"}, status=status.HTTP_400_BAD_REQUEST)
-        if item.tribeguard_status == 'RELEASED':
-            return Response({"error": "Funds already released"}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            item.tribeguard_status = 'RELEASED'
-            item.save()
-
-            # TribeGuard Logic: Move funds from Escrow to Wallet (minus 5% commission)
-            store = item.store
-            total_amount = item.product.price * item.quantity
-            commission = total_amount * Decimal('0.03')
-            vendor_amount = total_amount - commission
-            
-            store.escrow_balance -= total_amount
-            store.wallet_balance += vendor_amount
-            store.save()
+            # Claim the release in the same statement that checks it, so a double tap
+            # (or two devices) can't both move the funds.
+            if not settle_item(item, {'status': 'DELIVERED'}, tribeguard_status='RELEASED'):
+                return Response({"error": "Funds already released"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # TribeGuard Logic: Move funds from Escrow to Wallet (minus commission)
+            balances.release_escrow(item.store_id, item.product.price * item.quantity, order_item=item)
 
         return Response(OrderItemSerializer(item).data)
 
@@ -93,21 +120,18 @@ class AdminDisputeViewSet(viewsets.ModelViewSet):
     permission_classes = (permissions.IsAdminUser,)
 
     def get_queryset(self):
-        return OrderItem.objects.filter(status='DISPUTED')
+        return OrderItem.objects.filter(status='DISPUTED').select_related('product', 'store', 'order__customer').order_by('-created_at', '-id')
 
     @decorators.action(detail=True, methods=['post'], url_path='resolve-refund')
     def resolve_refund(self, request, pk=None):
         item = self.get_object()
         with transaction.atomic():
-            item.status = 'PENDING' # Reset or mark as refunded
-            item.tribeguard_status = 'REFUNDED'
-            item.save()
+            # Reset or mark as refunded
+            if not settle_item(item, {'status': 'DISPUTED'}, status='PENDING', tribeguard_status='REFUNDED'):
+                return Response({"error": "Dispute already resolved"}, status=status.HTTP_400_BAD_REQUEST)
 
             # Release from Escrow (Logic: In real app, return to buyer wallet)
-            store = item.store
-            total_amount = item.product.price * item.quantity
-            store.escrow_balance -= total_amount
-            store.save()
+            balances.refund_escrow(item.store_id, item.product.price * item.quantity, order_item=item)
 
         return Response(OrderItemSerializer(item).data)
 
@@ -115,18 +139,11 @@ class AdminDisputeViewSet(viewsets.ModelViewSet):
     def resolve_release(self, request, pk=None):
         item = self.get_object()
         with transaction.atomic():
-            item.status = 'DELIVERED' # Mark as settled
-            item.tribeguard_status = 'RELEASED'
-            item.save()
+            # Mark as settled
+            if not settle_item(item, {'status': 'DISPUTED'}, status='DELIVERED', tribeguard_status='RELEASED'):
+                return Response({"error": "Dispute already resolved"}, status=status.HTTP_400_BAD_REQUEST)
 
             # Give to Vendor
-            store = item.store
-            total_amount = item.product.price * item.quantity
-            commission = total_amount * Decimal('0.03')
-            vendor_amount = total_amount - commission
-            
-            store.escrow_balance -= total_amount
-            store.wallet_balance += vendor_amount
-            store.save()
+            balances.release_escrow(item.store_id, item.product.price * item.quantity, order_item=item)
 
         return Response(OrderItemSerializer(item).data)
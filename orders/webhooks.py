@@ -4,8 +4,7 @@ from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.conf import settings
-from django.db import transaction
-from .models import Order
+from .models import WebhookEvent
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +14,8 @@ def flutterwave_webhook(request):
     """
     Webhook endpoint to receive Flutterwave payment notifications.
     Verification hash is used to ensure the request is from Flutterwave.
+    Events are only recorded here, deduplicated on the event type and Flutterwave's
+    transaction id, so a burst of payments never holds up web workers.
     """
     # Check for secret hash in headers (Flutterwave recommends using a secret hash)
     # If the user didn't specify a SECRET_HASH in FLW settings, we might skip this 
@@ -29,35 +30,16 @@ def flutterwave_webhook(request):
     try:
         data = json.loads(request.body)
         event = data.get('event')
-        
-        if event == 'charge.completed':
-            tx_data = data.get('data', {})
-            status = tx_data.get('status')
-            tx_ref = tx_data.get('tx_ref')
-            amount = tx_data.get('amount')
-            
-            if status == 'successful':
-                with transaction.atomic():
-                    try:
-                        order = Order.objects.select_for_update().get(payment_ref=tx_ref)
-                        
-                        if not order.is_paid:
-                            order.is_paid = True
-                            order.save()
-                            
-                            # Move funds to escrow for each item's store
-                            for item in order.items.all():
-                                store = item.store
-                                price = item.product.price * item.quantity
-                                store.escrow_balance += price
-                                store.save()
-                            
-                            logger.info(f"Order {order.id} marked as PAID via webhook.")
-                    except Order.DoesNotExist:
-                        logger.error(f"Order with ref {tx_ref} not found.")
-                        return HttpResponse(status=404)
-        
-        return HttpResponse(status=200)
-    except Exception as e:
-        logger.error(f"Webhook processing error: {str(e)}")
+        tx_data = data.get('data') or {}
+        if not event or tx_data.get('id') is None:
+            return HttpResponse(status=400)
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Webhook payload rejected: {str(e)}")
         return HttpResponse(status=400)
+
+    # Persist and acknowledge; `manage.py process_webhooks` does the settlement.
+    # A retried delivery hits the unique (event_type, event_id) and is dropped.
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(event_id=str(tx_data['id']), event_type=event, tx_ref=tx_data.get('tx_ref') or '', payload=data)
+    ], ignore_conflicts=True)
+    return HttpResponse(status=200)
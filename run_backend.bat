@@ -15,7 +15,13 @@ if %ERRORLEVEL% NEQ 0 (
 
 echo [Tribe Council] Broadcasting to Network...
 :: The 0.0.0.0:8000 allows your phone to see the server
-python manage.py runserver 0.0.0.0:8000
+:: Live dashboard updates (Server-Sent Events) need an ASGI server; without uvicorn the screens poll.
+python -c "import uvicorn" >nul 2>&1
+if %ERRORLEVEL% EQU 0 (
+    uvicorn tribe_trade_backend.asgi:application --host 0.0.0.0 --port 8000 --reload
+) else (
+    python manage.py runserver 0.0.0.0:8000
+)
 
 echo.
 echo ==========================================
@@ -1,24 +1,49 @@
 from django.contrib import admin
-from .models import Store, Category, Product, PayoutRequest
+from .balances import with_balances
+from .models import Store, Category, Product, ProductImage, PayoutRequest, LedgerEntry
 
 @admin.register(Store)
 class StoreAdmin(admin.ModelAdmin):
     list_display = ('name', 'owner', 'institution', 'wallet_balance', 'escrow_balance')
+    list_select_related = ('owner', 'institution')
     search_fields = ('name', 'owner__email')
 
+    def get_queryset(self, request):
+        # Balances come from the ledger; annotate them rather than aggregating per row.
+        return with_balances(super().get_queryset(request))
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
 
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    fields = ('image', 'position', 'width', 'height', 'variants_status')
+    readonly_fields = ('width', 'height', 'variants_status')
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'store', 'category', 'price', 'is_awoof')
     list_filter = ('is_awoof', 'category', 'store')
     search_fields = ('name', 'store__name')
+    inlines = (ProductImageInline,)
 
 @admin.register(PayoutRequest)
 class PayoutRequestAdmin(admin.ModelAdmin):
     list_display = ('id', 'store', 'amount', 'status', 'created_at')
     list_filter = ('status', 'store')
     search_fields = ('store__name',)
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'store', 'kind', 'account', 'amount', 'txn', 'created_at')
+    list_filter = ('kind', 'account')
+    search_fields = ('store__name', 'txn')
+
+    def has_change_permission(self, request, obj=None):
+        return False  # the ledger is append-only
+
+    def has_delete_permission(self, request, obj=None):
+        return False
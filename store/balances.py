@@ -0,0 +1,134 @@
+"""
+TribeGuard balance mutations, recorded in the double-entry ledger.
+
+Every movement of money is a set of LedgerEntry legs that sum to zero, written
+with one insert. Nothing updates a balance in place, so concurrent escrow locks
+and releases on the same store never contend on a row.
+
+A balance is the latest BalanceCheckpoint plus the ledger entries after it;
+`manage.py reconcile_ledger --checkpoint` verifies the ledger and rolls the
+checkpoints forward.
+"""
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.events import publish, plug_channel
+from .models import Store, LedgerEntry, BalanceCheckpoint
+
+COMMISSION_RATE = Decimal('0.03')
+
+# Entries younger than this are left out of new checkpoints: on Postgres an id can be
+# allocated by a transaction that commits after a higher id is already visible.
+CHECKPOINT_LAG = timedelta(minutes=1)
+
+ZERO = Decimal('0.00')
+
+Balance = namedtuple('Balance', ['escrow', 'wallet'])
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def commission_on(amount):
+    return (amount * COMMISSION_RATE).quantize(Decimal('0.01'))
+
+
+def _entries(store_id, kind, legs, **refs):
+    txn = uuid.uuid4()
+    return [
+        LedgerEntry(store_id=store_id, txn=txn, kind=kind, account=account, amount=amount, **refs)
+        for account, amount in legs if amount
+    ]
+
+
+def _post(store_id, kind, legs, **refs):
+    LedgerEntry.objects.bulk_create(_entries(store_id, kind, legs, **refs))
+    publish(plug_channel(store_id), 'balance', {'kind': kind})
+
+
+def lock_in_escrow(store_id, amount, **refs):
+    """A paid order's funds are held in the plug's escrow."""
+    _post(store_id, 'ESCROW_LOCK', [('ESCROW', amount), ('CLEARING', -amount)], **refs)
+
+
+def lock_in_escrow_by_store(amounts, **refs):
+    """Lock `{store_id: amount}` as one transaction per store, written with a single insert."""
+    LedgerEntry.objects.bulk_create([
+        entry
+        for store_id, amount in amounts.items()
+        for entry in _entries(store_id, 'ESCROW_LOCK', [('ESCROW', amount), ('CLEARING', -amount)], **refs)
+    ])
+    publish([plug_channel(store_id) for store_id in amounts], 'balance', {'kind': 'ESCROW_LOCK'})
+
+
+def release_escrow(store_id, amount, **refs):
+    """Move funds from escrow to the wallet, keeping the Council's commission. Returns the plug's share."""
+    commission = commission_on(amount)
+    vendor_amount = amount - commission
+    _post(store_id, 'RELEASE', [('ESCROW', -amount), ('WALLET', vendor_amount), ('COMMISSION', commission)], **refs)
+    return vendor_amount
+
+
+def refund_escrow(store_id, amount, **refs):
+    _post(store_id, 'REFUND', [('ESCROW', -amount), ('CLEARING', amount)], **refs)
+
+
+def debit_wallet(store_id, amount, **refs):
+    """
+    Pay out of the wallet. Payouts are the one movement that can overdraw, so they
+    serialize per store on the Store row and re-check the balance after posting.
+    """
+    with transaction.atomic():
+        Store.objects.select_for_update().only('pk').get(pk=store_id)
+        _post(store_id, 'PAYOUT', [('WALLET', -amount), ('CLEARING', amount)], **refs)
+        if balance_of(store_id).wallet < 0:
+            raise InsufficientFunds("Insufficient wallet balance for this payout request.")
+
+
+def balance_of(store_id):
+    checkpoint = BalanceCheckpoint.objects.filter(store_id=store_id).order_by('-last_entry_id').first()
+    entries = LedgerEntry.objects.filter(store_id=store_id)
+    escrow = wallet = ZERO
+    if checkpoint:
+        entries = entries.filter(id__gt=checkpoint.last_entry_id)
+        escrow, wallet = checkpoint.escrow_balance, checkpoint.wallet_balance
+    delta = entries.aggregate(
+        escrow=Sum('amount', filter=Q(account='ESCROW')),
+        wallet=Sum('amount', filter=Q(account='WALLET')),
+    )
+    return Balance(escrow + (delta['escrow'] or ZERO), wallet + (delta['wallet'] or ZERO))
+
+
+def with_balances(stores):
+    """
+    Annotate a Store queryset with `ledger_escrow` and `ledger_wallet` (read by
+    Store.balances) in the same query, instead of one balance_of() per store in lists.
+    """
+    money = DecimalField(max_digits=12, decimal_places=2)
+    latest = BalanceCheckpoint.objects.filter(store_id=OuterRef('pk')).order_by('-last_entry_id')
+
+    def since_checkpoint(account):
+        entries = LedgerEntry.objects.filter(store_id=OuterRef('pk'), account=account, id__gt=OuterRef('ledger_checkpoint'))
+        return Coalesce(Subquery(entries.values('store_id').annotate(total=Sum('amount')).values('total')), Value(ZERO), output_field=money)
+
+    def at_checkpoint(field):
+        return Coalesce(Subquery(latest.values(field)[:1]), Value(ZERO), output_field=money)
+
+    return stores.annotate(
+        ledger_checkpoint=Coalesce(Subquery(latest.values('last_entry_id')[:1]), Value(0)),
+    ).annotate(
+        ledger_escrow=at_checkpoint('escrow_balance') + since_checkpoint('ESCROW'),
+        ledger_wallet=at_checkpoint('wallet_balance') + since_checkpoint('WALLET'),
+    )
+
+
+def checkpoint_horizon():
+    """The highest entry id that is safe to fold into a checkpoint."""
+    settled = LedgerEntry.objects.filter(created_at__lt=timezone.now() - CHECKPOINT_LAG)
+    return settled.order_by('-id').values_list('id', flat=True).first()
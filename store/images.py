@@ -0,0 +1,214 @@
+"""
+Derived sizes of drop photos.
+
+Phones upload several-MB originals; the marketplace serves resized copies instead:
+
+    thumb   400px   marketplace cards
+    card    800px   store pages and wide cards
+    detail  1600px  the drop page gallery
+
+each as WebP and JPEG, EXIF-stripped (orientation is applied to the pixels first).
+
+Every photo is a ProductImage row, created PENDING. Rows are never re-pointed at a
+new upload (replacing a photo deletes its row and adds another), so a row's
+variants can't go stale. `manage.py process_images` claims pending rows, renders
+in a process pool off the request path and records the variant files and
+dimensions in `ProductImage.variants`. Until then serializers fall back to the
+original upload.
+"""
+import io
+import os
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+from core import blobs
+from core.cache import invalidate
+from core.uploads import MAX_PIXELS
+
+# ProductImage columns only the worker writes (ProductImage.save leaves them alone).
+IMAGE_WORKER_FIELDS = ('variants', 'variants_status', 'variants_claimed_at', 'width', 'height')
+
+SIZES = {'thumb': 400, 'card': 800, 'detail': 1600}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# A claimed photo whose worker hasn't reported back by then is handed to another.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def render(data):
+    """
+    Resize one original (bytes) into every size and format. Pure CPU work with no
+    Django state, so it runs in worker processes. Returns the upright size of the
+    original and `{size: {'width': w, 'height': h, fmt: bytes, ...}}`.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        if original.width * original.height > MAX_PIXELS:
+            raise ImageRejected(f"{original.width}x{original.height} is too large to process.")
+        # Let the JPEG decoder scale down by up to 8x while decoding instead of
+        # inflating a 12MP photo only to throw most of it away.
+        original.draft('RGB', (max(SIZES.values()),) * 2)
+        upright = _upright(original)
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGBA').convert('RGB') if image.mode in ('P', 'LA') else image.convert('RGB')
+
+        variants = {}
+        for size, edge in sorted(SIZES.items(), key=lambda item: -item[1]):
+            # Resize from the previous (larger) step: cheaper, and the same quality at these ratios.
+            image = image.copy() if max(image.size) <= edge else image.resize(
+                _fit(image.size, edge), Image.Resampling.LANCZOS, reducing_gap=2.0,
+            )
+            variant = {'width': image.width, 'height': image.height}
+            for fmt, options in FORMATS.items():
+                buffer = io.BytesIO()
+                # No exif=/icc_profile= arguments: the encoded copies carry no metadata.
+                image.save(buffer, **options)
+                variant[fmt] = buffer.getvalue()
+            variants[size] = variant
+        return upright, variants
+
+
+# EXIF orientations that turn the stored pixels a quarter turn.
+_QUARTER_TURNS = {5, 6, 7, 8}
+
+
+def _upright(image):
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in _QUARTER_TURNS:
+        return height, width
+    return width, height
+
+
+def upright_size(file):
+    """`(width, height)` of a photo as displayed, read from its header only; `(None, None)` if unreadable."""
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            return _upright(image)
+    except Exception:
+        return None, None
+    finally:
+        file.seek(0)
+
+
+def _fit(size, edge):
+    width, height = size
+    scale = edge / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def variant_name(source, size, fmt):
+    stem, _ = os.path.splitext(os.path.basename(source))
+    return f"products/variants/{stem}-{size}.{fmt}"
+
+
+def store_variants(source, rendered):
+    """Write rendered variants to storage; returns the `ProductImage.variants` entry for `source`."""
+    entry = {}
+    for size, variant in rendered.items():
+        entry[size] = {'width': variant['width'], 'height': variant['height']}
+        for fmt in FORMATS:
+            entry[size][fmt] = default_storage.save(variant_name(source, size, fmt), ContentFile(variant[fmt]))
+    return entry
+
+
+def variant_names(entry):
+    return [entry[size][fmt] for size in SIZES if size in entry for fmt in FORMATS if entry[size].get(fmt)]
+
+
+def rename_variants(entry, renamed):
+    """A copy of a `ProductImage.variants` entry with its file names mapped through `renamed`."""
+    return {
+        size: {key: renamed.get(value, value) if key in FORMATS else value for key, value in variant.items()}
+        for size, variant in entry.items()
+    }
+
+
+def variant(photo, size):
+    """`{'width', 'height', 'webp', 'jpeg'}` (storage names) for one size of a photo, or None until it is rendered."""
+    if photo.variants_status == 'READY':
+        return (photo.variants or {}).get(size)
+    return None
+
+
+def variant_url(photo, size, fmt='webp'):
+    """URL of one derived copy of a photo, or the original while it is still being processed."""
+    if photo is None or not photo.image:
+        return None
+    rendered = variant(photo, size)
+    return default_storage.url(rendered[fmt]) if rendered else photo.image.url
+
+
+def claim(batch_size):
+    """Mark up to `batch_size` due photos PROCESSING; returns them and the claim time."""
+    from .models import ProductImage
+    now = timezone.now()
+    due = Q(variants_status='PENDING') | Q(variants_status='PROCESSING', variants_claimed_at__lt=now - CLAIM_TIMEOUT)
+    ids = ProductImage.objects.filter(due).order_by('id').values_list('id', flat=True)[:batch_size]
+    # One conditional UPDATE per row, so concurrent workers never claim the same photo.
+    claimed = [
+        pk for pk in ids
+        if ProductImage.objects.filter(due, pk=pk).update(variants_status='PROCESSING', variants_claimed_at=now)
+    ]
+    return list(ProductImage.objects.filter(pk__in=claimed).order_by('id')), now
+
+
+def read(photo):
+    with photo.open('rb') as source:
+        return source.read()
+
+
+def process_batch(executor, batch_size=20):
+    """
+    Render one batch of claimed photos on `executor` and record the results. The
+    database is only touched to claim and to record, never while rendering.
+    Returns `{'processed': n, 'failed': n}`.
+    """
+    from .models import ProductImage
+    photos, claimed_at = claim(batch_size)
+    jobs = {}
+    for photo in photos:
+        try:
+            jobs[photo.pk] = executor.submit(render, read(photo.image))
+        except Exception as exc:  # the original is missing or unreadable
+            jobs[photo.pk] = exc
+
+    outcome = {'processed': 0, 'failed': 0}
+    for photo in photos:
+        status, variants, written = 'READY', {}, []
+        width, height = photo.width, photo.height
+        try:
+            job = jobs[photo.pk]
+            if isinstance(job, Exception):
+                raise job
+            (width, height), rendered = job.result()
+            variants = store_variants(photo.image.name, rendered)
+            written = variant_names(variants)
+        except Exception:
+            status = 'FAILED'
+        # Only record the result if the photo is still ours: if it was deleted meanwhile the
+        # new files stay unreferenced and `manage.py gc_media` removes them.
+        with transaction.atomic():
+            recorded = ProductImage.objects.filter(pk=photo.pk, variants_status='PROCESSING', variants_claimed_at=claimed_at).update(
+                variants=variants, variants_status=status, variants_claimed_at=None, width=width, height=height,
+            )
+            if recorded:
+                blobs.retain(written)
+        outcome['processed' if status == 'READY' else 'failed'] += 1
+
+    if photos:
+        # .update() skips the signals that expire cached marketplace pages.
+        invalidate('marketplace')
+    return outcome
@@ -0,0 +1,58 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from store.images import process_batch
+from store.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Render thumbnail, card and detail copies of newly uploaded drop photos. "
+        "Resizing runs in a pool of worker processes. Runs until stopped unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Rendering processes.")
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to sleep when nothing is queued.")
+        parser.add_argument('--retry-failed', action='store_true', help="Queue photos that failed before.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty instead of polling.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            ProductImage.objects.filter(variants_status='FAILED').update(variants_status='PENDING')
+
+        totals = Counter()
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            try:
+                while True:
+                    try:
+                        outcome = process_batch(executor, options['batch_size'])
+                    except DatabaseError as exc:
+                        # The claimed photos are picked up again once their claim times out.
+                        self.stderr.write(f"Image batch failed: {exc}")
+                        connection.close()
+                        time.sleep(options['poll_interval'])
+                        continue
+                    totals.update(outcome)
+                    if any(outcome.values()):
+                        self.report(totals, started)
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                pass
+        self.report(totals, started)
+
+    def report(self, totals, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        backlog = ProductImage.objects.filter(variants_status__in=['PENDING', 'PROCESSING']).count()
+        self.stdout.write(
+            f"processed={totals['processed']} failed={totals['failed']} "
+            f"rate={totals['processed'] / elapsed:.1f}/s backlog={backlog}"
+        )
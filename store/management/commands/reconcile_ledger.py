@@ -0,0 +1,94 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from store.balances import checkpoint_horizon
+from store.models import LedgerEntry, BalanceCheckpoint
+
+ZERO = Decimal('0.00')
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify every store's balance checkpoints against the ledger in one streaming pass, "
+        "and check that every transaction's legs sum to zero. "
+        "With --checkpoint, also write a fresh checkpoint per store (run this periodically)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkpoint', action='store_true', help="Roll every store's checkpoint forward.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        horizon = checkpoint_horizon() if options['checkpoint'] else None
+        checkpoints = defaultdict(list)
+        for cp in BalanceCheckpoint.objects.order_by('store_id', 'last_entry_id').iterator():
+            checkpoints[cp.store_id].append(cp)
+
+        self.problems = []
+        self.new_checkpoints = []
+        self.stores = self.entries = 0
+        current = None
+
+        entries = LedgerEntry.objects.order_by('store_id', 'id').values_list('store_id', 'id', 'txn', 'account', 'amount')
+        for store_id, entry_id, txn, account, amount in entries.iterator(chunk_size=options['chunk_size']):
+            if store_id != (current and current['store_id']):
+                self.finish(current, horizon)
+                current = {
+                    'store_id': store_id, 'pending': checkpoints.pop(store_id, []),
+                    'escrow': ZERO, 'wallet': ZERO, 'last_id': None, 'horizon_totals': None, 'checkpointed_to': None,
+                    'txns': defaultdict(Decimal),
+                }
+            self.verify_checkpoints(current, before_entry=entry_id)
+            if horizon is not None and entry_id > horizon and current['horizon_totals'] is None:
+                current['horizon_totals'] = (current['escrow'], current['wallet'], current['last_id'])
+            if account == 'ESCROW':
+                current['escrow'] += amount
+            elif account == 'WALLET':
+                current['wallet'] += amount
+            current['txns'][txn] += amount
+            current['last_id'] = entry_id
+            self.entries += 1
+        self.finish(current, horizon)
+
+        for store_id, orphans in checkpoints.items():
+            for cp in orphans:
+                self.problems.append(f"Store {store_id}: checkpoint at entry {cp.last_entry_id} has no ledger entries.")
+
+        if self.problems:
+            for problem in self.problems:
+                self.stderr.write(problem)
+            raise CommandError(f"Ledger reconciliation failed with {len(self.problems)} problem(s).")
+
+        if self.new_checkpoints:
+            BalanceCheckpoint.objects.bulk_create(self.new_checkpoints, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f"Ledger reconciled: {self.entries} entries across {self.stores} stores. "
+            f"{len(self.new_checkpoints)} checkpoint(s) written."
+        ))
+
+    def verify_checkpoints(self, state, before_entry):
+        """Compare each checkpoint once the stream has passed its last entry."""
+        while state['pending'] and (before_entry is None or state['pending'][0].last_entry_id < before_entry):
+            cp = state['pending'].pop(0)
+            state['checkpointed_to'] = cp.last_entry_id
+            if (cp.escrow_balance, cp.wallet_balance) != (state['escrow'], state['wallet']):
+                self.problems.append(
+                    f"Store {state['store_id']}: checkpoint at entry {cp.last_entry_id} says escrow {cp.escrow_balance} / "
+                    f"wallet {cp.wallet_balance}, ledger says {state['escrow']} / {state['wallet']}."
+                )
+
+    def finish(self, state, horizon):
+        if state is None:
+            return
+        self.stores += 1
+        self.verify_checkpoints(state, before_entry=None)
+        for txn, total in state['txns'].items():
+            if total != 0:
+                self.problems.append(f"Store {state['store_id']}: transaction {txn} is unbalanced by {total}.")
+        if horizon is None:
+            return
+        escrow, wallet, last_id = state['horizon_totals'] or (state['escrow'], state['wallet'], state['last_id'])
+        if last_id is not None and last_id != state['checkpointed_to']:
+            self.new_checkpoints.append(BalanceCheckpoint(
+                store_id=state['store_id'], escrow_balance=escrow, wallet_balance=wallet, last_entry_id=last_id,
+            ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_rename_delivery_fee_product_campus_delivery_fee_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payoutrequest',
+            index=models.Index(fields=['store', '-created_at'], name='payout_store_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='product_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['store', '-created_at', '-id'], name='product_store_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='product_circle_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_awoof', True)), fields=['-created_at', '-id'], name='product_awoof_feed_idx'),
+        ),
+    ]
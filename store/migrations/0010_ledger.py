@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:21
+
+import uuid
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Carry each store's mutable balances into the ledger as balanced OPENING transactions."""
+    Store = apps.get_model('store', 'Store')
+    LedgerEntry = apps.get_model('store', 'LedgerEntry')
+    BalanceCheckpoint = apps.get_model('store', 'BalanceCheckpoint')
+
+    for store in Store.objects.exclude(escrow_balance=0, wallet_balance=0).iterator():
+        entries = []
+        for account, amount in (('ESCROW', store.escrow_balance), ('WALLET', store.wallet_balance)):
+            if amount:
+                txn = uuid.uuid4()
+                entries.append(LedgerEntry(store=store, txn=txn, kind='OPENING', account=account, amount=amount))
+                entries.append(LedgerEntry(store=store, txn=txn, kind='OPENING', account='CLEARING', amount=-amount))
+        LedgerEntry.objects.bulk_create(entries)
+        BalanceCheckpoint.objects.create(
+            store=store, escrow_balance=store.escrow_balance, wallet_balance=store.wallet_balance,
+            last_entry_id=LedgerEntry.objects.filter(store=store).order_by('-id').values_list('id', flat=True).first(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_order_customer_feed_idx_and_more'),
+        ('store', '0009_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('escrow_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('wallet_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_entry_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to='store.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', '-last_entry_id'], name='checkpoint_store_latest_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txn', models.UUIDField()),
+                ('kind', models.CharField(choices=[('OPENING', 'Opening Balance'), ('ESCROW_LOCK', 'Escrow Lock'), ('RELEASE', 'Release'), ('REFUND', 'Refund'), ('PAYOUT', 'Payout')], max_length=20)),
+                ('account', models.CharField(choices=[('ESCROW', 'Escrow'), ('WALLET', 'Wallet'), ('COMMISSION', 'Council Commission'), ('CLEARING', 'Clearing')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='orders.order')),
+                ('order_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='orders.orderitem')),
+                ('payout', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='store.payoutrequest')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='store.store')),
+            ],
+            options={
+                'verbose_name_plural': 'Ledger Entries',
+                'indexes': [models.Index(fields=['store', 'id'], name='ledger_store_entry_idx'), models.Index(fields=['txn'], name='ledger_txn_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='store',
+            name='escrow_balance',
+        ),
+        migrations.RemoveField(
+            model_name='store',
+            name='wallet_balance',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def queue_existing_photos(apps, schema_editor):
+    # Drops uploaded before the pipeline get their variants from the next `process_images` run.
+    has_photo = models.Q()
+    for field in ('image', 'image2', 'image3', 'image4', 'image5'):
+        has_photo |= models.Q(**{f'{field}__isnull': False}) & ~models.Q(**{field: ''})
+    apps.get_model('store', 'Product').objects.filter(has_photo).update(images_status='PENDING')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='images_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='images_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='READY', editable=False, max_length=20),
+        ),
+        migrations.RunPython(queue_existing_photos, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('images_status__in', ['PENDING', 'PROCESSING'])), fields=['id'], name='product_images_due_idx'),
+        ),
+    ]
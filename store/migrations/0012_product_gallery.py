@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLOTS = ('image', 'image2', 'image3', 'image4', 'image5')
+
+
+def move_photos(apps, schema_editor):
+    """Copy the five photo columns into ProductImage rows, keeping variants already rendered."""
+    from django.core.files.storage import default_storage
+    from store.images import upright_size
+    Product = apps.get_model('store', 'Product')
+    ProductImage = apps.get_model('store', 'ProductImage')
+    has_photo = models.Q()
+    for field in SLOTS:
+        has_photo |= models.Q(**{f'{field}__isnull': False}) & ~models.Q(**{field: ''})
+    batch = []
+    for product in Product.objects.filter(has_photo).only(*SLOTS, 'image_variants').iterator(chunk_size=500):
+        photos = [(field, getattr(product, field).name) for field in SLOTS if getattr(product, field).name]
+        for position, (field, name) in enumerate(photos):
+            entry = dict(product.image_variants.get(field, {}))
+            ready = entry.pop('source', None) == name
+            try:
+                with default_storage.open(name, 'rb') as original:
+                    width, height = upright_size(original)
+            except OSError:
+                width = height = None
+            batch.append(ProductImage(
+                product_id=product.pk, image=name, position=position, width=width, height=height,
+                variants=entry if ready else {}, variants_status='READY' if ready else 'PENDING',
+            ))
+        if len(batch) >= 1000:
+            ProductImage.objects.bulk_create(batch)
+            batch = []
+    ProductImage.objects.bulk_create(batch)
+
+
+def restore_photos(apps, schema_editor):
+    """Put the first five photos of each gallery back into the columns (any more are dropped)."""
+    Product = apps.get_model('store', 'Product')
+    ProductImage = apps.get_model('store', 'ProductImage')
+    galleries = {}
+    for photo in ProductImage.objects.filter(position__lt=len(SLOTS)).order_by('product_id', 'position', 'id').iterator(chunk_size=2000):
+        galleries.setdefault(photo.product_id, []).append(photo)
+    for product_id, photos in galleries.items():
+        columns = {field: photo.image.name for field, photo in zip(SLOTS, photos)}
+        columns['image_variants'] = {
+            field: {'source': photo.image.name, **photo.variants}
+            for field, photo in zip(SLOTS, photos) if photo.variants_status == 'READY'
+        }
+        columns['images_status'] = 'READY' if len(columns['image_variants']) == len(photos) else 'PENDING'
+        Product.objects.filter(pk=product_id).update(**columns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_product_image_variants_product_images_claimed_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(upload_to='products/')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('width', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('variants', models.JSONField(blank=True, default=dict, editable=False)),
+                ('variants_status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', editable=False, max_length=20)),
+                ('variants_claimed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('position', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='store.product'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'position', 'id'], name='product_image_gallery_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(condition=models.Q(('variants_status__in', ['PENDING', 'PROCESSING'])), fields=['id'], name='product_image_due_idx'),
+        ),
+        migrations.RunPython(move_photos, restore_photos),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_images_due_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image2',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image3',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image4',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image5',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='image_variants',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='images_claimed_at',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='images_status',
+        ),
+    ]
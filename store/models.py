@@ -1,12 +1,14 @@
+from decimal import Decimal
 from django.db import models
 from django.conf import settings
+from django.utils.functional import cached_property
+from core import blobs
+from .images import IMAGE_WORKER_FIELDS, upright_size, variant_names
 
 class Store(models.Model):
     owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='store')
     institution = models.ForeignKey('core.Institution', on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
-    wallet_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
-    escrow_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
 
     class Meta:
         verbose_name = "The Plug"
@@ -15,6 +17,28 @@ class Store(models.Model):
     def __str__(self):
         return self.name
 
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Balances come from the ledger, not this row, so drop the cached copy and any
+        # with_balances annotation; the next read sees entries posted since.
+        for name in ('balances', 'ledger_checkpoint', 'ledger_escrow', 'ledger_wallet'):
+            self.__dict__.pop(name, None)
+
+    @cached_property
+    def balances(self):
+        from .balances import Balance, balance_of
+        if hasattr(self, 'ledger_escrow'):  # annotated by store.balances.with_balances
+            return Balance(*(amount.quantize(Decimal('0.01')) for amount in (self.ledger_escrow, self.ledger_wallet)))
+        return balance_of(self.pk)
+
+    @property
+    def wallet_balance(self):
+        return self.balances.wallet
+
+    @property
+    def escrow_balance(self):
+        return self.balances.escrow
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -36,20 +60,83 @@ class Product(models.Model):
     discount_percentage = models.PositiveIntegerField(default=0) # Only used if is_awoof is True
     campus_delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     waybill_delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
-    image2 = models.ImageField(upload_to='products/', blank=True, null=True)
-    image3 = models.ImageField(upload_to='products/', blank=True, null=True)
-    image4 = models.ImageField(upload_to='products/', blank=True, null=True)
-    image5 = models.ImageField(upload_to='products/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "The Drop"
         verbose_name_plural = "The Drops"
+        indexes = [
+            # Marketplace feed and its filters, all keyset-paged on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='product_feed_idx'),
+            models.Index(fields=['store', '-created_at', '-id'], name='product_store_feed_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='product_circle_feed_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_awoof=True), name='product_awoof_feed_idx'),
+        ]
+
+    @property
+    def cover(self):
+        """The first photo. Listings prefetch only that one into `covers`; drop pages prefetch the gallery."""
+        photos = getattr(self, 'covers', None)
+        if photos is None:
+            photos = self.images.all()[:1]
+        return photos[0] if photos else None
 
     def __str__(self):
         return self.name
 
+class ProductImage(models.Model):
+    """One photo of a drop's gallery; position 0 is the cover."""
+    VARIANTS_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to='products/')
+    position = models.PositiveIntegerField(default=0)
+    # Upright size of the original, read from the upload's header (not width_field/height_field,
+    # which would open the file every time a row is loaded).
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Resized, EXIF-stripped copies, written by `manage.py process_images` (see store.images).
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    variants_status = models.CharField(max_length=20, choices=VARIANTS_STATUS_CHOICES, default='PENDING', editable=False)
+    variants_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('position', 'id')
+        indexes = [
+            models.Index(fields=['product', 'position', 'id'], name='product_image_gallery_idx'),
+            models.Index(fields=['id'], condition=models.Q(variants_status__in=['PENDING', 'PROCESSING']), name='product_image_due_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        replaced = {}
+        if self._state.adding:
+            if not self.image._committed:
+                self.width, self.height = upright_size(self.image.file)
+        elif not self.image._committed:
+            # A new upload on an existing row (the admin inline): its variants start over.
+            replaced = type(self).objects.filter(pk=self.pk).values_list('variants', flat=True).first() or {}
+            self.width, self.height = upright_size(self.image.file)
+            self.variants, self.variants_status, self.variants_claimed_at = {}, 'PENDING', None
+            kwargs['update_fields'] = None
+        elif kwargs.get('update_fields') is None:
+            # The variant columns belong to the image worker: a full save from an instance
+            # loaded before it finished must not write its stale copy back over them.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in IMAGE_WORKER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        blobs.release(variant_names(replaced))
+
+    def __str__(self):
+        return f"{self.product} #{self.position}"
+
 class PayoutRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -63,5 +150,67 @@ class PayoutRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     bank_details = models.TextField(blank=True, null=True) # Mock: In real app, use a BankAccount model
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-created_at'], name='payout_store_created_idx'),
+        ]
+
     def __str__(self):
         return f"Payout of {self.amount} for {self.store.name} ({self.status})"
+
+class LedgerEntry(models.Model):
+    """
+    One leg of a double-entry TribeGuard transaction. The legs sharing a `txn` sum to zero.
+    Rows are only ever inserted; a store's escrow and wallet balances are the sums of its
+    ESCROW and WALLET legs (read as latest checkpoint + later entries, see store.balances).
+    """
+    KIND_CHOICES = [
+        ('OPENING', 'Opening Balance'),
+        ('ESCROW_LOCK', 'Escrow Lock'),
+        ('RELEASE', 'Release'),
+        ('REFUND', 'Refund'),
+        ('PAYOUT', 'Payout'),
+    ]
+
+    ACCOUNT_CHOICES = [
+        ('ESCROW', 'Escrow'),
+        ('WALLET', 'Wallet'),
+        ('COMMISSION', 'Council Commission'),
+        ('CLEARING', 'Clearing'),  # money entering or leaving Tribe Trade (gateway, bank)
+    ]
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='ledger_entries')
+    txn = models.UUIDField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    account = models.CharField(max_length=20, choices=ACCOUNT_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    order_item = models.ForeignKey('orders.OrderItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    payout = models.ForeignKey(PayoutRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Ledger Entries"
+        indexes = [
+            models.Index(fields=['store', 'id'], name='ledger_store_entry_idx'),
+            models.Index(fields=['txn'], name='ledger_txn_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.account} {self.amount} ({self.store_id})"
+
+class BalanceCheckpoint(models.Model):
+    """A store's escrow and wallet balances as of ledger entry `last_entry_id`."""
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='balance_checkpoints')
+    escrow_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    wallet_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_entry_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-last_entry_id'], name='checkpoint_store_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} @ entry {self.last_entry_id}"
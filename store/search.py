@@ -0,0 +1,134 @@
+"""
+Ranked full-text search over drops.
+
+SQLite uses an FTS5 table (`store_product_fts`, rowid = product id) holding the drop's
+name and description plus its store and circle names, kept in sync by the signal
+handlers in store.signals. Postgres ranks a weighted tsvector on the fly. Other
+backends fall back to `icontains`.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'store_product_fts'
+
+# bm25() column weights: name, description, store_name, category_name
+FTS_WEIGHTS = (10.0, 2.0, 4.0, 4.0)
+
+INDEX_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, description, store_name, category_name)
+    SELECT p.id, p.name, p.description, s.name, COALESCE(c.name, '')
+    FROM store_product p
+    JOIN store_store s ON s.id = p.store_id
+    LEFT JOIN store_category c ON c.id = p.category_id
+"""
+
+
+def search_terms(term):
+    return re.findall(r'\w+', term.lower())[:10]
+
+
+def uses_fts():
+    return connection.vendor == 'sqlite'
+
+
+def create_index(schema_editor):
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "name, description, store_name, category_name, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+    schema_editor.execute(INDEX_SQL)
+
+
+def _reindex(column, values):
+    if not uses_fts() or not values:
+        return
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM store_product WHERE {column} IN ({placeholders}))",
+            values,
+        )
+        cursor.execute(f"{INDEX_SQL} WHERE p.{column} IN ({placeholders})", values)
+
+
+def reindex_products(product_ids):
+    _reindex('id', list(product_ids))
+
+
+def reindex_store(store_id):
+    """A store rename changes the indexed text of every drop in it."""
+    _reindex('store_id', [store_id])
+
+
+def reindex_category(category_id):
+    _reindex('category_id', [category_id])
+
+
+def unindex(product_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+
+def ranked_ids(term, limit, within=None):
+    """
+    Product ids matching every word of `term` as a prefix, best match first. Pass a
+    queryset as `within` to rank only its rows, so filters never thin out the page.
+    """
+    words = search_terms(term)
+    if not words:
+        return []
+    match = ' '.join(f'"{word}"*' for word in words)
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    scope, params = '', []
+    if within is not None and within.query.where:  # an unfiltered queryset scopes nothing
+        # The unary + keeps SQLite from handing the rowid filter to FTS5, which would then
+        # be probed once per product in scope. This way the MATCH runs once and its hits are
+        # checked against the scope, materialized once as a lookup table.
+        sql, params = within.order_by().values('id').query.sql_with_params()
+        scope, params = f"AND +rowid IN ({sql})", list(params)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {scope} "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid LIMIT %s",
+            [match, *params, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_products(queryset, term, limit):
+    """The `limit` best matches for `term` within `queryset`, best first."""
+    words = search_terms(term)
+    if not words:
+        return queryset.none()
+
+    if uses_fts():
+        # Rank within the filtered drops (campus, circle, store, awoof), then load just the winning rows.
+        top = ranked_ids(term, limit, within=queryset)
+        rows = queryset.in_bulk(top)
+        return [rows[pk] for pk in top]
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        vector = (
+            SearchVector('name', weight='A', config='simple')
+            + SearchVector('store__name', 'category__name', weight='B', config='simple')
+            + SearchVector('description', weight='C', config='simple')
+        )
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config='simple')
+        return (
+            queryset.annotate(document=vector, rank=SearchRank(vector, query))
+            .filter(document=query)
+            .order_by('-rank', '-id')[:limit]
+        )
+
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(name__icontains=word) | Q(description__icontains=word)
+            | Q(store__name__icontains=word) | Q(category__name__icontains=word)
+        )
+    return queryset.filter(condition).order_by('-created_at', '-id')[:limit]
@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import Store, Category, Product, PayoutRequest
+from django.core.files.storage import default_storage
+from django.db import transaction
+from core.uploads import DirectUpload, PhotoUploadField
+from .images import SIZES, variant, variant_url
+from .models import Store, Category, Product, ProductImage, PayoutRequest
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,22 +13,100 @@ class CategorySerializer(serializers.ModelSerializer):
 class StoreSerializer(serializers.ModelSerializer):
     owner_email = serializers.EmailField(source='owner.email', read_only=True)
     institution_name = serializers.CharField(source='institution.name', read_only=True)
+    # Derived from the TribeGuard ledger (see store.balances)
+    wallet_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    escrow_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Store
         fields = ('id', 'owner_email', 'institution', 'institution_name', 'name', 'wallet_balance', 'escrow_balance')
         read_only_fields = ('id', 'owner_email', 'wallet_balance', 'escrow_balance')
 
-class ProductSerializer(serializers.ModelSerializer):
+# The drop form's five photo slots: an upload in one replaces the photo at that place in the gallery.
+PHOTO_SLOTS = ('image', 'image2', 'image3', 'image4', 'image5')
+
+MAX_PHOTOS = 10
+
+class PhotoVariantsMixin:
+    """Serve the resized copies from store.images in place of the original uploads."""
+
+    def absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request and url else url
+
+    def photo_url(self, photo, size):
+        return self.absolute(variant_url(photo, size))
+
+    def photo_sizes(self, photo, sizes):
+        """`{size: {'webp', 'jpeg', 'width', 'height'}}` for a rendered photo, None while it is pending."""
+        rendered = {size: variant(photo, size) for size in sizes} if photo else {}
+        if not rendered or not all(rendered.values()):
+            return None
+        return {
+            size: {
+                'webp': self.absolute(default_storage.url(names['webp'])),
+                'jpeg': self.absolute(default_storage.url(names['jpeg'])),
+                'width': names['width'],
+                'height': names['height'],
+            }
+            for size, names in rendered.items()
+        }
+
+class ProductImageSerializer(PhotoVariantsMixin, serializers.ModelSerializer):
+    """A gallery photo at detail size, plus every size for responsive `srcset`s."""
+    image = serializers.SerializerMethodField()
+    sizes = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductImage
+        fields = ('id', 'position', 'image', 'width', 'height', 'sizes')
+
+    def get_image(self, obj):
+        return self.photo_url(obj, 'detail')
+
+    def get_sizes(self, obj):
+        return self.photo_sizes(obj, SIZES)
+
+def arrange_gallery(photos, slots, removed, uploads):
+    """
+    The gallery after an edit: `photos` in order, with slot uploads replacing the photo
+    at their index (or following the last one), `removed` ids dropped and `uploads` appended.
+    """
+    gallery = list(photos)
+    for index, upload in sorted(slots.items()):
+        if index < len(gallery):
+            gallery[index] = upload
+        else:
+            gallery.append(upload)
+    return [item for item in gallery if getattr(item, 'pk', None) not in removed] + list(uploads)
+
+class ProductSerializer(PhotoVariantsMixin, serializers.ModelSerializer):
     store_name = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
     institution_name = serializers.SerializerMethodField()
+    # Photos are ProductImage rows. Reads carry the cover as `image` and the whole `gallery`;
+    # writes fill slots (`image`..`image5`), append `uploaded_images` and drop `removed_images` by id.
+    # Photos are files, or tokens of ones uploaded straight to the bucket (see core.s3).
+    image = PhotoUploadField(upload_to='products/', write_only=True, required=False)
+    image2 = PhotoUploadField(upload_to='products/', write_only=True, required=False)
+    image3 = PhotoUploadField(upload_to='products/', write_only=True, required=False)
+    image4 = PhotoUploadField(upload_to='products/', write_only=True, required=False)
+    image5 = PhotoUploadField(upload_to='products/', write_only=True, required=False)
+    uploaded_images = serializers.ListField(child=PhotoUploadField(upload_to='products/'), write_only=True, required=False)
+    removed_images = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+    gallery = ProductImageSerializer(source='images', many=True, read_only=True)
+    cover_size = 'card'
 
     class Meta:
         model = Product
-        fields = ('id', 'store', 'store_name', 'category', 'category_name', 'institution_name', 'name', 'price', 'description', 'is_awoof', 'discount_percentage', 'campus_delivery_fee', 'waybill_delivery_fee', 'image', 'image2', 'image3', 'image4', 'image5', 'created_at')
+        fields = ('id', 'store', 'store_name', 'category', 'category_name', 'institution_name', 'name', 'price', 'description', 'is_awoof', 'discount_percentage', 'campus_delivery_fee', 'waybill_delivery_fee', 'image', 'image2', 'image3', 'image4', 'image5', 'uploaded_images', 'removed_images', 'gallery', 'created_at')
         read_only_fields = ('id', 'created_at', 'store')
 
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        data['image'] = self.photo_url(obj.cover, self.cover_size)
+        return data
+
     def get_store_name(self, obj):
         return obj.store.name if obj.store else "Unknown Store"
 
@@ -54,6 +136,81 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Price must be greater than zero.")
         return value
 
+    def validate(self, attrs):
+        photos = list(self.instance.images.all()) if self.instance else []
+        removed = set(attrs.get('removed_images', []))
+        if removed - {photo.pk for photo in photos}:
+            raise serializers.ValidationError({'removed_images': "These photos are not part of this drop."})
+        slots, uploads = self.photo_uploads(attrs)
+        if len(arrange_gallery(photos, slots, removed, uploads)) > MAX_PHOTOS:
+            raise serializers.ValidationError({'uploaded_images': f"A drop can have at most {MAX_PHOTOS} photos."})
+        return attrs
+
+    @staticmethod
+    def photo_uploads(attrs):
+        slots = {index: attrs[field] for index, field in enumerate(PHOTO_SLOTS) if attrs.get(field)}
+        return slots, attrs.get('uploaded_images', [])
+
+    def create(self, validated_data):
+        edit = self.pop_photo_edit(validated_data)
+        with transaction.atomic():
+            product = super().create(validated_data)
+            self.save_gallery(product, *edit)
+        return product
+
+    def update(self, instance, validated_data):
+        edit = self.pop_photo_edit(validated_data)
+        with transaction.atomic():
+            product = super().update(instance, validated_data)
+            self.save_gallery(product, *edit)
+        return product
+
+    def pop_photo_edit(self, validated_data):
+        slots, uploads = self.photo_uploads(validated_data)
+        removed = set(validated_data.get('removed_images', []))
+        for field in PHOTO_SLOTS + ('uploaded_images', 'removed_images'):
+            validated_data.pop(field, None)
+        return slots, removed, uploads
+
+    def save_gallery(self, product, slots, removed, uploads):
+        if not (slots or removed or uploads):
+            return
+        photos = list(product.images.all())
+        gallery = arrange_gallery(photos, slots, removed, uploads)
+        kept = {item.pk for item in gallery if isinstance(item, ProductImage)}
+        for photo in photos:
+            if photo.pk not in kept:
+                photo.delete()
+        # Positions stay 0..n-1, so the cover is always position 0.
+        for position, item in enumerate(gallery):
+            if isinstance(item, DirectUpload):
+                ProductImage.objects.create(product=product, image=str(item), position=position, width=item.width, height=item.height)
+            elif not isinstance(item, ProductImage):
+                ProductImage.objects.create(product=product, image=item, position=position)
+            elif item.position != position:
+                item.position = position
+                item.save(update_fields=['position'])
+        getattr(product, '_prefetched_objects_cache', {}).pop('images', None)
+
+class DropCardSerializer(ProductSerializer):
+    """A marketplace listing: only the cover photo, as a thumbnail."""
+    thumbnail = serializers.SerializerMethodField()
+    cover_size = 'thumb'
+
+    class Meta(ProductSerializer.Meta):
+        fields = tuple(
+            field for field in ProductSerializer.Meta.fields
+            if field not in PHOTO_SLOTS[1:] + ('uploaded_images', 'removed_images', 'gallery')
+        ) + ('thumbnail',)
+
+    def get_thumbnail(self, obj):
+        sizes = self.photo_sizes(obj.cover, ['thumb'])
+        return sizes and sizes['thumb']
+
+class DropDetailSerializer(ProductSerializer):
+    """A drop page: the cover at detail size and the whole gallery."""
+    cover_size = 'detail'
+
 class PayoutRequestSerializer(serializers.ModelSerializer):
     store_name = serializers.CharField(source='store.name', read_only=True)
 
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from . import search
+from .models import Store, Category, Product
+
+
+@receiver(post_save, sender=Product, dispatch_uid='search_index_product')
+def index_product(sender, instance, **kwargs):
+    search.reindex_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='search_unindex_product')
+def unindex_product(sender, instance, **kwargs):
+    search.unindex(instance.pk)
+
+
+@receiver(post_save, sender=Store, dispatch_uid='search_index_store')
+def index_store(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex_store(instance.pk)
+
+
+@receiver(post_save, sender=Category, dispatch_uid='search_index_category')
+def index_category(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex_category(instance.pk)
+
+
+@receiver(pre_delete, sender=Category, dispatch_uid='search_remember_category_drops')
+def remember_category_drops(sender, instance, **kwargs):
+    # on_delete=SET_NULL rewrites the drops without saving them, so note which ones to reindex.
+    instance._search_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category, dispatch_uid='search_index_category_drops')
+def index_category_drops(sender, instance, **kwargs):
+    search.reindex_products(getattr(instance, '_search_product_ids', []))
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+from core.models import Institution
+from . import balances, search
+from .models import Store, Category, Product, ProductImage, LedgerEntry, BalanceCheckpoint
 
-# Create your tests here.
+User = get_user_model()
+
+
+class MarketplaceQueryCountTests(APITestCase):
+    """
+    The marketplace feed must load in a fixed number of queries,
+    no matter how many drops are on the page.
+    """
+
+    def setUp(self):
+        self.institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.category = Category.objects.create(name="Tech", slug="tech")
+
+    def make_drops(self, count):
+        for _ in range(count):
+            n = Product.objects.count()
+            owner = User.objects.create_user(email=f"plug{n}@tribe.com", username=f"plug{n}", password="password", is_plug=True)
+            store = Store.objects.create(owner=owner, institution=self.institution, name=f"Plug {n} HQ")
+            drop = Product.objects.create(store=store, category=self.category, name=f"Drop {n}", price=Decimal('1500.00'))
+            for position in range(3):
+                ProductImage.objects.create(product=drop, image=f'products/drop{n}-{position}.jpg', position=position)
+
+    def count_marketplace_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/store/marketplace/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self.make_drops(2)
+        small = self.count_marketplace_queries()
+        self.make_drops(20)
+        large = self.count_marketplace_queries()
+        self.assertEqual(small, large)
+
+    def test_related_names_are_serialized(self):
+        self.make_drops(1)
+        drop = self.client.get('/api/store/marketplace/').json()['results'][0]
+        self.assertEqual(drop['store_name'], "Plug 0 HQ")
+        self.assertEqual(drop['category_name'], "Tech")
+        self.assertEqual(drop['institution_name'], "University of Lagos")
+
+
+class MarketplacePaginationTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        owner = User.objects.create_user(email="plug@tribe.com", username="plug", password="password", is_plug=True)
+        store = Store.objects.create(owner=owner, institution=institution, name="Plug HQ")
+        # Same timestamp on every drop so the id tiebreaker is exercised.
+        Product.objects.bulk_create([Product(store=store, name=f"Drop {n}", price=Decimal('100.00')) for n in range(7)])
+        Product.objects.update(created_at=Product.objects.first().created_at)
+
+    def test_cursor_walks_every_drop_once(self):
+        seen, url = [], '/api/store/marketplace/?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(drop['id'] for drop in page['results'])
+            url = page['next']
+        self.assertEqual(seen, sorted(Product.objects.values_list('id', flat=True), reverse=True))
+
+    def test_previous_link_returns_the_prior_page(self):
+        first = self.client.get('/api/store/marketplace/?page_size=3').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_garbage_cursor_is_rejected(self):
+        response = self.client.get('/api/store/marketplace/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_price_bounds_filter_on_the_server(self):
+        cheap = Product.objects.order_by('id').first()
+        Product.objects.filter(pk=cheap.pk).update(price=Decimal('50.00'))
+        page = self.client.get('/api/store/marketplace/', {'max_price': '60'}).json()
+        self.assertEqual([drop['id'] for drop in page['results']], [cheap.id])
+        self.assertEqual(len(self.client.get('/api/store/marketplace/', {'min_price': '100'}).json()['results']), 6)
+        self.assertEqual(self.client.get('/api/store/marketplace/', {'min_price': 'cheap'}).status_code, 400)
+
+
+class MarketplaceSearchTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        owner = User.objects.create_user(email="plug@tribe.com", username="plug", password="password", is_plug=True)
+        self.store = Store.objects.create(owner=owner, institution=institution, name="Gadget Palace")
+        self.tech = Category.objects.create(name="Tech", slug="tech")
+        self.laptop = Product.objects.create(store=self.store, category=self.tech, name="MacBook Pro", price=Decimal('900000.00'))
+        self.sleeve = Product.objects.create(store=self.store, name="Laptop sleeve", description="Fits a MacBook", price=Decimal('8000.00'))
+
+    def search(self, term):
+        return [drop['id'] for drop in self.client.get('/api/store/marketplace/', {'search': term}).json()['results']]
+
+    def test_prefix_match_ranks_name_above_description(self):
+        self.assertEqual(self.search('macb'), [self.laptop.id, self.sleeve.id])
+
+    def test_index_follows_writes(self):
+        self.store.name = "Campus Hub"
+        self.store.save()
+        self.assertEqual(self.search('gadget'), [])
+        self.assertEqual(sorted(self.search('hub')), sorted([self.laptop.id, self.sleeve.id]))
+
+        self.assertEqual(self.search('tech'), [self.laptop.id])
+        self.tech.delete()
+        self.assertEqual(self.search('tech'), [])
+
+        self.sleeve.delete()
+        self.assertEqual(self.search('macbook'), [self.laptop.id])
+
+    def test_filters_apply_before_ranking(self):
+        # Better matches elsewhere than a full page of results must not crowd out the awoof drop.
+        Product.objects.bulk_create([
+            Product(store=self.store, name=f"MacBook Air {n}", price=Decimal('700000.00')) for n in range(300)
+        ])
+        search.reindex_store(self.store.id)
+        awoof = Product.objects.create(store=self.store, name="Charger", description="For any macbook",
+                                       price=Decimal('5000.00'), is_awoof=True)
+        response = self.client.get('/api/store/marketplace/', {'search': 'macbook', 'awoof': 'true'}).json()
+        self.assertEqual([drop['id'] for drop in response['results']], [awoof.id])
+
+
+class AsyncReadPathTests(APITestCase):
+    """The aio/ endpoints must serve exactly what their sync twins do."""
+
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        category = Category.objects.create(name="Tech", slug="tech")
+        owner = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True)
+        store = Store.objects.create(owner=owner, institution=institution, name="Plug HQ")
+        self.drops = [
+            Product.objects.create(store=store, category=category, name=f"MacBook {n}", price=Decimal('1000.00'), is_awoof=n % 2 == 0)
+            for n in range(7)
+        ]
+
+    def assertSameJSON(self, sync_url, async_url):
+        expected, actual = self.client.get(sync_url), self.client.get(async_url)
+        self.assertEqual(actual.status_code, expected.status_code)
+        # Cursor links point back at the endpoint that served them.
+        self.assertEqual(json.loads(actual.content.decode().replace('/aio/', '/')), expected.json())
+        return actual
+
+    def test_list_endpoints_match(self):
+        for sync_url, async_url in (
+            ('/api/store/marketplace/?page_size=3&awoof=1', '/api/store/aio/marketplace/?page_size=3&awoof=1'),
+            ('/api/store/marketplace/?search=macbook', '/api/store/aio/marketplace/?search=macbook'),
+            ('/api/store/circles/', '/api/store/aio/circles/'),
+            ('/api/core/institutions/', '/api/core/aio/institutions/'),
+            ('/api/core/campuses/', '/api/core/aio/campuses/'),
+        ):
+            self.assertSameJSON(sync_url, async_url)
+
+    def test_cursor_walk_matches(self):
+        response = self.client.get('/api/store/aio/marketplace/?page_size=3')
+        seen = []
+        while True:
+            body = response.json()
+            seen += [drop['id'] for drop in body['results']]
+            if not body['next']:
+                break
+            response = self.client.get(body['next'])
+        self.assertEqual(seen, [drop.id for drop in reversed(self.drops)])
+
+    def test_detail_and_errors_match(self):
+        self.assertSameJSON(f'/api/store/marketplace/{self.drops[0].id}/', f'/api/store/aio/marketplace/{self.drops[0].id}/')
+        self.assertSameJSON('/api/store/marketplace/999999/', '/api/store/aio/marketplace/999999/')
+        self.assertSameJSON('/api/store/marketplace/?cursor=bogus', '/api/store/aio/marketplace/?cursor=bogus')
+
+    def test_async_list_is_cached_and_revalidates(self):
+        first = self.client.get('/api/store/aio/circles/')
+        second = self.client.get('/api/store/aio/circles/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        Category.objects.create(name="Books", slug="books")
+        self.assertEqual(self.client.get('/api/store/aio/circles/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class LedgerReconciliationTests(APITestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        owner = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True)
+        self.store = Store.objects.create(owner=owner, institution=institution, name="Plug HQ")
+        balances.lock_in_escrow(self.store.pk, Decimal('10000.00'))
+        balances.release_escrow(self.store.pk, Decimal('4000.00'))
+        balances.debit_wallet(self.store.pk, Decimal('1000.00'))
+
+    def test_checkpoint_plus_delta_matches_full_ledger(self):
+        LedgerEntry.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        call_command('reconcile_ledger', checkpoint=True, stdout=StringIO())
+        self.assertEqual(BalanceCheckpoint.objects.get().escrow_balance, Decimal('6000.00'))
+
+        balances.refund_escrow(self.store.pk, Decimal('500.00'))
+        self.assertEqual(balances.balance_of(self.store.pk), (Decimal('5500.00'), Decimal('2880.00')))
+
+    def test_tampered_checkpoint_is_reported(self):
+        BalanceCheckpoint.objects.create(
+            store=self.store, escrow_balance=Decimal('6000.00'), wallet_balance=Decimal('9999.00'),
+            last_entry_id=LedgerEntry.objects.latest('id').id,
+        )
+        with self.assertRaises(CommandError):
+            call_command('reconcile_ledger', stdout=StringIO(), stderr=StringIO())
+
+    def test_store_lists_annotate_balances_in_one_query(self):
+        LedgerEntry.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        call_command('reconcile_ledger', checkpoint=True, stdout=StringIO())
+        balances.refund_escrow(self.store.pk, Decimal('500.00'))
+        for n in range(3):
+            owner = User.objects.create(email=f"plug{n}@tribe.com", username=f"plug{n}", is_plug=True)
+            balances.lock_in_escrow(Store.objects.create(owner=owner, institution=self.store.institution, name=f"Plug {n}").pk, Decimal('100.00'))
+
+        with self.assertNumQueries(1):
+            listed = {store.pk: store.balances for store in balances.with_balances(Store.objects.all())}
+        self.assertEqual(listed, {store.pk: balances.balance_of(store.pk) for store in Store.objects.all()})
+        self.assertEqual([str(amount) for amount in listed[self.store.pk]], ['5500.00', '2880.00'])
+
+    def test_refresh_from_db_rereads_balances(self):
+        store = balances.with_balances(Store.objects.all()).get()
+        self.assertEqual(store.wallet_balance, Decimal('2880.00'))
+        balances.release_escrow(self.store.pk, Decimal('1000.00'))
+        self.assertEqual(store.wallet_balance, Decimal('2880.00'))
+        store.refresh_from_db()
+        self.assertEqual(store.balances, balances.balance_of(self.store.pk))
+        self.assertEqual(store.escrow_balance, Decimal('5000.00'))
+
+    def test_overdraft_is_rolled_back(self):
+        with self.assertRaises(balances.InsufficientFunds):
+            balances.debit_wallet(self.store.pk, Decimal('5000.00'))
+        self.assertEqual(balances.balance_of(self.store.pk).wallet, Decimal('2880.00'))
+
+
+def phone_photo(name='IMG_0001.jpg', size=(3000, 2000)):
+    """A landscape JPEG whose EXIF says to display it rotated, as phone cameras write them."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    exif[0x010F] = 'PhoneMaker'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'orange').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImagePipelineTests(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=media)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.owner = User.objects.create(email="plug@tribe.com", username="plug", is_plug=True)
+        store = Store.objects.create(owner=self.owner, institution=institution, name="Plug HQ")
+        self.drop = Product.objects.create(store=store, name="Ankara Dress", price=Decimal('5000.00'))
+        self.cover = ProductImage.objects.create(product=self.drop, image=phone_photo(), position=0)
+        ProductImage.objects.create(product=self.drop, image=phone_photo('IMG_0002.jpg'), position=1)
+
+    def process(self):
+        call_command('process_images', '--once', '--workers=1', stdout=StringIO())
+        self.cover.refresh_from_db()
+
+    def test_new_photos_are_resized_and_stripped_off_the_request_path(self):
+        self.assertEqual(self.cover.variants_status, 'PENDING')
+        self.assertEqual((self.cover.width, self.cover.height), (2000, 3000))  # upright, straight from the upload
+        card = json.loads(self.client.get('/api/store/marketplace/').content)['results'][0]
+        self.assertTrue(card['image'].endswith(self.cover.image.name))  # the original until processed
+        self.assertIsNone(card['thumbnail'])
+
+        self.process()
+        self.assertEqual(self.cover.variants_status, 'READY')
+        thumb = self.cover.variants['thumb']
+        self.assertEqual((thumb['width'], thumb['height']), (267, 400))  # upright, longest edge 400
+        with default_storage.open(thumb['jpeg']) as stored, Image.open(stored) as image:
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_listings_carry_the_cover_and_the_drop_page_the_gallery(self):
+        self.process()
+        card = json.loads(self.client.get('/api/store/marketplace/').content)['results'][0]
+        self.assertNotIn('gallery', card)
+        self.assertRegex(card['image'], r'/media/products/variants/\w\w/\w{64}\.webp$')
+        self.assertEqual(card['thumbnail']['height'], 400)
+
+        page = self.client.get(f'/api/store/marketplace/{self.drop.pk}/').data
+        self.assertEqual(page['image'], page['gallery'][0]['sizes']['detail']['webp'])
+        self.assertEqual([photo['position'] for photo in page['gallery']], [0, 1])
+        self.assertEqual(page['gallery'][1]['sizes']['card']['height'], 800)
+        self.assertEqual((page['gallery'][1]['width'], page['gallery'][1]['height']), (2000, 3000))
+
+    def test_gallery_edits_keep_positions_compact(self):
+        self.process()
+        self.client.force_authenticate(self.owner)
+        second = self.drop.images.get(position=1)
+        response = self.client.patch(f'/api/store/my-drops/{self.drop.pk}/', {
+            'image': phone_photo('IMG_0003.jpg'),
+            'uploaded_images': [phone_photo('IMG_0004.jpg'), phone_photo('IMG_0005.jpg')],
+            'removed_images': [second.pk],
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ProductImage.objects.filter(pk__in=[self.cover.pk, second.pk]).exists())
+        gallery = list(self.drop.images.values_list('position', 'variants_status'))
+        self.assertEqual(gallery, [(0, 'PENDING'), (1, 'PENDING'), (2, 'PENDING')])
+        self.assertEqual(len(response.data['gallery']), 3)
+
+    def test_photo_count_is_capped(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(f'/api/store/my-drops/{self.drop.pk}/', {
+            'uploaded_images': [phone_photo(f'IMG_1{n:03}.jpg', size=(40, 30)) for n in range(9)],
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.drop.images.count(), 2)
+
+    def test_full_save_from_an_older_instance_keeps_the_rendered_variants(self):
+        stale = ProductImage.objects.get(pk=self.cover.pk)  # loaded while the photo was still pending
+        self.process()
+        stale.position = 0
+        stale.save()
+        self.cover.refresh_from_db()
+        self.assertEqual(self.cover.variants_status, 'READY')
+        self.assertIn('detail', self.cover.variants)
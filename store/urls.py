@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import StoreViewSet, ProductViewSet, MarketplaceProductViewSet, CategoryListView, PayoutRequestViewSet
+from .views import (
+    StoreViewSet, ProductViewSet, MarketplaceProductViewSet, CategoryListView, PayoutRequestViewSet,
+    AsyncCategoryListView, AsyncMarketplaceView,
+)
 
 router = DefaultRouter()
 router.register(r'hustle-hq', StoreViewSet, basename='store')
@@ -11,4 +14,8 @@ router.register(r'marketplace', MarketplaceProductViewSet, basename='marketplace
 urlpatterns = [
     path('', include(router.urls)),
     path('circles/', CategoryListView.as_view(), name='circle-list'),
+    # Async-native twins of the public read endpoints, for ASGI deployments
+    path('aio/circles/', AsyncCategoryListView.as_view(), name='aio-circle-list'),
+    path('aio/marketplace/', AsyncMarketplaceView.as_view(), name='aio-marketplace-list'),
+    path('aio/marketplace/<int:pk>/', AsyncMarketplaceView.as_view(), name='aio-marketplace-detail'),
 ]
@@ -1,42 +1,55 @@
 from rest_framework import viewsets, generics, permissions, status, parsers
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from decimal import Decimal, InvalidOperation
 from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework.exceptions import ValidationError
+from asgiref.sync import sync_to_async
+from core.aio import AsyncReadView
+from core.cache import CachedListMixin
+from core.idempotency import IdempotentCreateMixin
+from core.pagination import KeysetCursorPagination
+from core.uploads import BoundedUploadMixin
 from core.permissions import IsPlug, IsStoreOwner, IsProductOwner
-from .models import Store, Category, Product, PayoutRequest
-from .serializers import StoreSerializer, CategorySerializer, ProductSerializer, PayoutRequestSerializer
+from .models import Store, Category, Product, ProductImage, PayoutRequest
+from .serializers import (
+    StoreSerializer, CategorySerializer, ProductSerializer, PayoutRequestSerializer, DropCardSerializer, DropDetailSerializer,
+)
+from .search import search_products
+from . import balances
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedListMixin, generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (permissions.AllowAny,)
+    cache_namespace = 'circles'
 
 class StoreViewSet(viewsets.ModelViewSet):
     serializer_class = StoreSerializer
     permission_classes = (permissions.IsAuthenticated, IsPlug, IsStoreOwner)
 
     def get_queryset(self):
-        return Store.objects.filter(owner=self.request.user)
+        return balances.with_balances(Store.objects.filter(owner=self.request.user).select_related('owner', 'institution'))
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
     @action(detail=False, methods=['get'])
     def my_store(self, request):
-        store = Store.objects.filter(owner=request.user).first()
+        store = self.get_queryset().first()
         if not store:
             return Response({"detail": "No store found for this user."}, status=status.HTTP_404_NOT_FOUND)
         serializer = self.get_serializer(store)
         return Response(serializer.data)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(BoundedUploadMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = (permissions.IsAuthenticated, IsPlug, IsProductOwner)
     parser_classes = (parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser)
 
     def get_queryset(self):
-        return Product.objects.filter(store__owner=self.request.user)
+        return Product.objects.filter(store__owner=self.request.user).select_related('store__institution', 'category').prefetch_related('images')
 
     def perform_create(self, serializer):
         try:
@@ -47,7 +60,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         except Exception as e:
             raise ValidationError(f"Council systems reported a glitch: {str(e)}")
 
-class PayoutRequestViewSet(viewsets.ModelViewSet):
+class PayoutRequestViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     serializer_class = PayoutRequestSerializer
     permission_classes = (permissions.IsAuthenticated, IsPlug)
 
@@ -57,36 +70,99 @@ class PayoutRequestViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         with transaction.atomic():
             store = Store.objects.get(owner=self.request.user)
-            amount = serializer.validated_data['amount']
-            
-            if store.wallet_balance < amount:
-                raise ValidationError("Insufficient wallet balance for this payout request.")
-            
-            # Deduct funds immediately upon request
-            store.wallet_balance -= amount
-            store.save()
-            
-            serializer.save(store=store)
+            payout = serializer.save(store=store)
+
+            # Deduct funds immediately upon request; an overdraft rolls the request back too.
+            try:
+                balances.debit_wallet(store.id, payout.amount, payout=payout)
+            except balances.InsufficientFunds as e:
+                raise ValidationError(str(e))
+
+def marketplace_queryset(params, gallery=False):
+    # Every row is serialized with its store, institution and circle names,
+    # so join them up front instead of lazily fetching them per product.
+    # Photos come in one more query: just the covers for a listing, every photo for a drop page.
+    queryset = Product.objects.select_related('store__institution', 'category')
+    if gallery:
+        queryset = queryset.prefetch_related('images')
+    else:
+        queryset = queryset.prefetch_related(Prefetch('images', queryset=ProductImage.objects.filter(position=0), to_attr='covers'))
+    institution_id = params.get('institution')
+    category_id = params.get('circle') # UI Term: Circle
+    is_awoof = params.get('awoof')
+    store_id = params.get('store')
+
+    if store_id:
+        queryset = queryset.filter(store_id=store_id)
+    if institution_id:
+        queryset = queryset.filter(store__institution_id=institution_id)
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    if is_awoof:
+        queryset = queryset.filter(is_awoof=True)
+    for param, lookup in (('min_price', 'price__gte'), ('max_price', 'price__lte')):
+        if params.get(param):
+            try:
+                bound = Decimal(params[param])
+            except InvalidOperation:
+                bound = None
+            if bound is None or not bound.is_finite():
+                raise ValidationError({param: "Enter a number."})
+            queryset = queryset.filter(**{lookup: bound})
 
-class MarketplaceProductViewSet(viewsets.ReadOnlyModelViewSet):
+    return queryset.order_by('-created_at')
+
+class MarketplaceProductViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     """
     Viewset for Citizens to browse 'The Drop'.
-    Supports filtering by institution and category.
+    Supports filtering by store, institution, category, awoof and price, and ranked
+    full-text search with ?search= (see store.search).
+    Listings carry only cover thumbnails; the drop page gets the full gallery (see store.images).
     """
-    serializer_class = ProductSerializer
+    serializer_class = DropCardSerializer
     permission_classes = (permissions.AllowAny,)
+    pagination_class = KeysetCursorPagination
+    cache_namespace = 'marketplace'
 
     def get_queryset(self):
-        queryset = Product.objects.all()
-        institution_id = self.request.query_params.get('institution')
-        category_id = self.request.query_params.get('circle') # UI Term: Circle
-        is_awoof = self.request.query_params.get('awoof')
-
-        if institution_id:
-            queryset = queryset.filter(store__institution_id=institution_id)
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-        if is_awoof:
-            queryset = queryset.filter(is_awoof=True)
-            
-        return queryset.order_by('-created_at')
+        return marketplace_queryset(self.request.query_params, gallery=self.action == 'retrieve')
+
+    def get_serializer_class(self):
+        return DropDetailSerializer if self.action == 'retrieve' else DropCardSerializer
+
+    def list(self, request, *args, **kwargs):
+        term = request.query_params.get('search', '').strip()
+        if not term:
+            return super().list(request, *args, **kwargs)
+        # Ranked results don't fit the (created_at, id) keyset, so search returns
+        # only the best `page_size` matches in the usual page envelope.
+        limit = self.paginator.get_page_size(request)
+        drops = search_products(self.filter_queryset(self.get_queryset()), term, limit)
+        serializer = self.get_serializer(drops, many=True)
+        return Response({"next": None, "previous": None, "results": serializer.data})
+
+class AsyncCategoryListView(AsyncReadView):
+    serializer_class = CategorySerializer
+    cache_namespace = 'circles'
+
+    def get_queryset(self, request):
+        return Category.objects.all()
+
+class AsyncMarketplaceView(AsyncReadView):
+    """The marketplace list and detail endpoints on the async ORM (see core.aio)."""
+    serializer_class = DropCardSerializer
+    detail_serializer_class = DropDetailSerializer
+    pagination_class = KeysetCursorPagination
+    cache_namespace = 'marketplace'
+
+    def get_queryset(self, request):
+        return marketplace_queryset(request.query_params, gallery='pk' in self.kwargs)
+
+    async def list(self, request):
+        term = request.query_params.get('search', '').strip()
+        if not term:
+            return await super().list(request)
+        # Ranking runs raw SQL on the FTS index, which has no async driver to use.
+        limit = self.pagination_class().get_page_size(request)
+        drops = await sync_to_async(lambda: list(search_products(self.get_queryset(request), term, limit)))()
+        return {"next": None, "previous": None, "results": self.serialize(drops, request, many=True)}
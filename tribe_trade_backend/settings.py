@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import os
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -72,7 +73,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -95,6 +96,7 @@ MIDDLEWARE = [
 AUTH_USER_MODEL = 'users.CustomUser'
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 
 ROOT_URLCONF = 'tribe_trade_backend.urls'
@@ -125,10 +127,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Concurrent writers (webhooks, releases, payouts) queue on the write lock instead of
+        # failing: WAL lets readers proceed during a write, IMMEDIATE takes the lock up front
+        # so two transactions can't deadlock upgrading from read to write.
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+        # A file (not the shared in-memory default) so threaded tests get real locking.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# Local memory by default. Set CACHE_URL to share the cache between workers:
+#   redis://host:6379/0          -> Redis (requires the `redis` package)
+#   file:///var/tmp/tribe_cache  -> filesystem
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_URL[len('file://'):]}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tribe-trade'}}
+
+# Public list endpoints (institutions, campuses, circles, marketplace) cache their rendered
+# responses here; writes to the underlying models invalidate them (see core.cache).
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Order and payout creation replay the first response to retries sent with the same
+# Idempotency-Key header (see core.idempotency). Purge old keys with `manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Plug order items and verification requests support `?since=` incremental sync (see core.sync).
+# Deletes are remembered this long; purge older ones with `manage.py purge_tombstones`.
+SYNC_TOMBSTONE_TTL = int(os.getenv('SYNC_TOMBSTONE_TTL', 30 * 24 * 60 * 60))
+
+# Authenticated users are cached per token in a per-process LRU in front of the shared
+# cache (see users.authentication); token deletes and user saves evict them.
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_LOCAL_CACHE_SIZE = 1024
+AUTH_TOKEN_LOCAL_TTL = 5
+
+# Photo uploads (drops, mandate ID cards, avatars) stream to temp files and are refused
+# with 413 past these sizes, before the body is read when Content-Length says so (see core.uploads).
+UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024))
+UPLOAD_MAX_REQUEST_SIZE = int(os.getenv('UPLOAD_MAX_REQUEST_SIZE', 64 * 1024 * 1024))
+
+# Login and registration hash passwords in a bounded thread pool (see users.hashing).
+# Defaults: one worker per CPU, and 8 running-or-waiting hashes per worker before 503s.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0)) or None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -181,3 +240,23 @@ FLW_ENCRYPTION_KEY = os.getenv('FLW_ENCRYPTION_KEY')
 # Media Files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads are stored once per distinct content and reference-counted (see core.storage);
+# `manage.py gc_media` removes unreferenced files, `manage.py dedupe_media` converts old ones.
+# With S3_BUCKET set, media lives in an S3-compatible bucket (AWS, MinIO, ...) and clients
+# PUT photos straight to it with presigned URLs from /api/core/uploads/ (see core.s3).
+# S3_MEDIA_URL is the public base URL for reads (a CDN, say); by default the bucket's own.
+# An upload token can be attached up to S3_UPLOAD_GRACE seconds after its URL expires.
+S3_BUCKET = os.getenv('S3_BUCKET', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', 'https://s3.amazonaws.com')
+S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID', '')
+S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY', '')
+S3_MEDIA_URL = os.getenv('S3_MEDIA_URL', '')
+S3_UPLOAD_EXPIRES = int(os.getenv('S3_UPLOAD_EXPIRES', 15 * 60))
+S3_UPLOAD_GRACE = 60 * 60
+
+STORAGES = {
+    'default': {'BACKEND': 'core.s3.S3Storage' if S3_BUCKET else 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
@@ -0,0 +1,104 @@
+"""
+Token authentication with the user cached per token.
+
+Lookups go through a small in-process LRU, then the shared cache, and only then the
+database (one query, with the user's institution joined so profile responses need
+none). Entries are evicted when a token is deleted or its user is saved; see
+users.signals. Other processes' LRUs can lag such a change by AUTH_TOKEN_LOCAL_TTL.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class LocalLRU:
+    """A thread-safe, size-bounded LRU whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalLRU(
+    size=getattr(settings, 'AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', 5),
+)
+
+
+def shared_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_key(token_key):
+    # Never put raw tokens into a shared cache.
+    return f"authtoken:{hashlib.sha256(token_key.encode()).hexdigest()}"
+
+
+def evict(*token_keys):
+    keys = [cache_key(token_key) for token_key in token_keys]
+    for key in keys:
+        local_cache.delete(key)
+    shared_cache().delete_many(keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for DRF's TokenAuthentication that skips the token/user join on cache hits."""
+
+    def authenticate_credentials(self, key):
+        ckey = cache_key(key)
+        # Users are cached pickled, so every request gets its own instance to mutate.
+        blob = local_cache.get(ckey)
+        if blob is None:
+            blob = shared_cache().get(ckey)
+            if blob is None:
+                blob = self.load_user(key)
+                shared_cache().set(ckey, blob, getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300))
+            local_cache.set(ckey, blob)
+        user = pickle.loads(blob)
+        return (user, key)
+
+    def load_user(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user__institution').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return pickle.dumps(token.user)
@@ -0,0 +1,59 @@
+"""
+Password hashing off the event loop.
+
+PBKDF2 holds a CPU for hundreds of milliseconds, so the async auth views hand it to a
+small thread pool (hashlib releases the GIL while it works). Admission control keeps
+a sign-up rush from queueing without limit: once PASSWORD_HASH_MAX_PENDING hashes are
+running or waiting, further requests are turned away with 503 and Retry-After.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    async def run(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise Overloaded()
+            self.pending += 1
+        try:
+            return await asyncio.wrap_future(self.executor.submit(fn, *args))
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+
+workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+pool = BoundedExecutor(workers, getattr(settings, 'PASSWORD_HASH_MAX_PENDING', None) or workers * 8)
+
+
+async def make_password(raw_password):
+    return await pool.run(hashers.make_password, raw_password)
+
+
+async def check_password(user, raw_password):
+    """Verify `raw_password`, re-hashing it in the pool and saving it if the stored hash is outdated."""
+    if not await pool.run(hashers.check_password, raw_password, user.password):
+        return False
+    preferred = hashers.get_hasher()
+    if hashers.identify_hasher(user.password).algorithm != preferred.algorithm or preferred.must_update(user.password):
+        user.password = await make_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return True
@@ -0,0 +1,39 @@
+from django.db.models import Q
+from .models import identity_key
+
+
+def backfill_identity_keys(model, batch_size=5000):
+    """
+    Fill in missing email_key/username_key values, walking the users table in primary
+    key order one batch at a time. A key already held by another account (emails or
+    usernames differing only by case) is left empty and reported rather than guessed.
+    Returns (rows updated, [(user pk, field, key) collisions]).
+    """
+    updated, collisions = 0, []
+    missing = model._default_manager.filter(Q(email_key__isnull=True) | Q(username_key__isnull=True)).order_by('pk')
+    last_pk = None
+    while True:
+        page = missing.filter(pk__gt=last_pk) if last_pk is not None else missing
+        batch = list(page.only('pk', 'email', 'username', 'email_key', 'username_key')[:batch_size])
+        if not batch:
+            return updated, collisions
+        last_pk = batch[-1].pk
+
+        for field, source in (('email_key', 'email'), ('username_key', 'username')):
+            wanted = {user.pk: identity_key(getattr(user, source)) for user in batch if getattr(user, field) is None}
+            taken = set(
+                model._default_manager.filter(**{f'{field}__in': [key for key in wanted.values() if key]})
+                .values_list(field, flat=True)
+            )
+            for user in batch:
+                key = wanted.get(user.pk)
+                if key is None:
+                    continue
+                if key in taken:
+                    collisions.append((user.pk, field, key))
+                else:
+                    taken.add(key)
+                    setattr(user, field, key)
+
+        model._default_manager.bulk_update(batch, ['email_key', 'username_key'])
+        updated += len(batch)
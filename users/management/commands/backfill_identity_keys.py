@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from users.identity import backfill_identity_keys
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the normalized email/username keys that logins are matched on, in batches. "
+        "Reports accounts whose email or username collides case-insensitively with another's."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated, collisions = backfill_identity_keys(get_user_model(), options['batch_size'])
+        for pk, field, key in collisions:
+            self.stderr.write(f"User {pk}: {field} '{key}' already belongs to another account; resolve by hand.")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled identity keys for {updated} users ({len(collisions)} collisions)."))
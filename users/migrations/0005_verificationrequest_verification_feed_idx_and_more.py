@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_customuser_avatar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='verificationrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='verification_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificationrequest',
+            index=models.Index(fields=['user', 'status'], name='verification_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificationrequest',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['-created_at', '-id'], name='verification_pending_idx'),
+        ),
+    ]
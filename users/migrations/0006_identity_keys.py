@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:32
+
+import logging
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def backfill(apps, schema_editor):
+    from users.identity import backfill_identity_keys
+    _, collisions = backfill_identity_keys(apps.get_model('users', 'CustomUser'))
+    # Those accounts keep an empty key and log in by the `iexact` fallback until resolved by hand.
+    for pk, field, key in collisions:
+        logger.warning("User %s: %s '%s' already belongs to another account; resolve by hand.", pk, field, key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_verificationrequest_verification_feed_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_key',
+            field=models.CharField(editable=False, max_length=254, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='username_key',
+            field=models.CharField(editable=False, max_length=150, null=True, unique=True),
+        ),
+        # Same routine as `manage.py backfill_identity_keys`, which repairs any rows written later around save().
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
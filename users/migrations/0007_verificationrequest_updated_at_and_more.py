@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # Existing rows start out as last changed when they were created.
+    apps.get_model('users', 'VerificationRequest').objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_identity_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verificationrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='verificationrequest',
+            index=models.Index(fields=['updated_at', 'id'], name='verification_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='verificationrequest',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='verification_user_sync_idx'),
+        ),
+    ]
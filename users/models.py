@@ -2,6 +2,13 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+
+def identity_key(value):
+    """The case-insensitive form of an email or username that logins are matched on."""
+    value = (value or '').strip().lower()
+    return value or None
+
+
 class CustomUser(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.EmailField(unique=True)
@@ -11,10 +18,35 @@ class CustomUser(AbstractUser):
     institution = models.ForeignKey('core.Institution', on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # Normalized copies of email and username, so a login is one unique-index lookup
+    # instead of two `iexact` scans. Kept in sync by save(); rows written around save()
+    # are repaired by `manage.py backfill_identity_keys`. A key stays empty while a
+    # case-only duplicate holds it (see free_key).
+    email_key = models.CharField(max_length=254, unique=True, null=True, editable=False)
+    username_key = models.CharField(max_length=150, unique=True, null=True, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    def save(self, *args, **kwargs):
+        self.email_key = self.free_key('email_key', identity_key(self.email))
+        self.username_key = self.free_key('username_key', identity_key(self.username))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'email', 'username'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'email_key', 'username_key'}
+        super().save(*args, **kwargs)
+
+    def free_key(self, field, key):
+        """
+        `key`, or None while another account holds it: legacy emails or usernames that
+        differ only by case keep an empty key (and log in by LoginView's fallback) until
+        resolved by hand, instead of failing every save.
+        """
+        if key is None or getattr(self, field) == key:
+            return key
+        taken = type(self)._default_manager.filter(**{field: key}).exclude(pk=self.pk).exists()
+        return None if taken else key
+
     @property
     def role_display(self):
         if self.is_plug: return 'Plug'
@@ -36,6 +68,16 @@ class VerificationRequest(models.Model):
     id_card = models.ImageField(upload_to='verifications/', null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='verification_feed_idx'),
+            models.Index(fields=['updated_at', 'id'], name='verification_sync_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='verification_user_sync_idx'),
+            models.Index(fields=['user', 'status'], name='verification_user_status_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status='PENDING'), name='verification_pending_idx'),
+        ]
 
     def __str__(self):
         return f"Verification for {self.user.email} - {self.status}"
@@ -1,12 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from core.uploads import PhotoUploadField
 from store.models import Store
+from .models import identity_key
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
     institution_name = serializers.SerializerMethodField()
     password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    avatar = PhotoUploadField(upload_to='avatars/', required=False, allow_null=True)
 
     class Meta:
         model = User
@@ -32,35 +36,38 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ('email', 'username', 'password', 'phone_number', 'is_plug', 'is_citizen', 'institution')
 
+    def validate_email(self, value):
+        if User.objects.filter(email_key=identity_key(value)).exists():
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
+
+    def validate_username(self, value):
+        if User.objects.filter(username_key=identity_key(value)).exists():
+            raise serializers.ValidationError("A user with that username already exists.")
+        return value
+
     def create(self, validated_data):
-        user = User.objects.create_user(
+        # The async register view hashes the password in its own pool and passes the result in.
+        password = validated_data.pop('password_hash', None) or make_password(validated_data['password'])
+        user = User.objects.create(
             email=validated_data['email'].lower().strip(),
-            username=validated_data['username'].strip(),
-            password=validated_data['password'],
+            username=User.normalize_username(validated_data['username'].strip()),
+            password=password,
             phone_number=validated_data.get('phone_number', ''),
             is_plug=validated_data.get('is_plug', False),
             is_citizen=validated_data.get('is_citizen', True),
             institution=validated_data.get('institution')
         )
-        
+
         # Create Store for Plugs
-        if user.is_plug:
-            institution_id = self.context['request'].data.get('institution')
-            if institution_id:
-                from core.models import Institution
-                # Try to find the institution by ID, create store only if found
-                institution = Institution.objects.filter(id=institution_id).first()
-                if institution:
-                    Store.objects.create(
-                        owner=user,
-                        name=f"{user.username}'s HQ",
-                        institution=institution
-                    )
-                else:
-                    # If no institution found, create store without institution (make nullable)
-                    # For now, skip store creation if institution not found
-                    pass
-        
+        # For now, skip store creation if the plug picked no institution
+        if user.is_plug and user.institution:
+            Store.objects.create(
+                owner=user,
+                name=f"{user.username}'s HQ",
+                institution=user.institution
+            )
+
         return user
 
 from django.conf import settings
@@ -80,10 +87,13 @@ class SuperAdminRegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop('secret_key')
-        user = User.objects.create_superuser(
-            email=validated_data['email'],
-            username=validated_data['username'],
-            password=validated_data['password']
+        password = validated_data.pop('password_hash', None) or make_password(validated_data['password'])
+        user = User.objects.create(
+            email=User.objects.normalize_email(validated_data['email']),
+            username=User.normalize_username(validated_data['username']),
+            password=password,
+            is_staff=True,
+            is_superuser=True
         )
         return user
 
@@ -93,6 +103,7 @@ class VerificationRequestSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
     institution = serializers.SerializerMethodField()
+    id_card = PhotoUploadField(upload_to='verifications/', required=False, allow_null=True)
 
     class Meta:
         model = VerificationRequest
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import evict
+
+
+@receiver(post_delete, sender=Token, dispatch_uid='auth_cache_token_deleted')
+def forget_token(sender, instance, **kwargs):
+    evict(instance.key)
+
+
+@receiver(post_save, sender=get_user_model(), dispatch_uid='auth_cache_user_saved')
+def forget_user(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    keys = list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+    if keys:
+        # Evict again on commit in case a request re-cached the old row in between.
+        evict(*keys)
+        transaction.on_commit(lambda: evict(*keys))
@@ -1,3 +1,156 @@
-from django.test import TestCase
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from core.models import Institution
+from . import hashing
+from .authentication import local_cache
+from .models import VerificationRequest
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        local_cache.clear()
+        institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+        self.user = User.objects.create(email="citizen@tribe.com", username="citizen", institution=institution)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_profile_costs_no_queries(self):
+        self.client.get('/api/users/profile/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.data['institution_name'], "University of Lagos")
+        self.assertEqual(len(queries), 0)
+
+    def test_user_save_is_seen_on_the_next_request(self):
+        self.client.get('/api/users/profile/')
+        self.user.has_greencheck = True
+        self.user.save()
+        self.assertTrue(self.client.get('/api/users/profile/').data['has_greencheck'])
+
+    def test_profile_update_keeps_fields_changed_behind_the_cache(self):
+        self.client.get('/api/users/profile/')
+        User.objects.filter(pk=self.user.pk).update(has_greencheck=True, is_staff=True)  # skips the invalidating signal
+        response = self.client.patch('/api/users/profile/', {'phone_number': '08030000000'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['has_greencheck'])
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.phone_number, self.user.has_greencheck, self.user.is_staff), ('08030000000', True, True))
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/api/users/profile/')
+        self.token.delete()
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+
+class IdentityKeyLoginTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="Ada@Tribe.com", username="AdaPlug", password="s3cret-pass")
+
+    def login(self, identity):
+        return self.client.post('/api/users/login/', {'username': identity, 'password': 's3cret-pass'}, format='json')
+
+    def test_login_is_case_insensitive_on_email_or_username(self):
+        for identity in ("ada@tribe.com", " ADA@TRIBE.COM ", "adaplug"):
+            self.assertEqual(self.login(identity).status_code, 200, identity)
+        self.assertEqual(self.login("nobody").status_code, 400)
+
+    def test_login_is_one_indexed_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.login("adaplug")
+        lookup = queries[0]['sql']
+        self.assertIn('"username_key"', lookup)
+        self.assertNotIn('LIKE', lookup)
+
+    def test_backfill_fills_keys_and_reports_collisions(self):
+        other = User.objects.create_user(email="ada2@tribe.com", username="someone", password="x")
+        User.objects.filter(pk=self.user.pk).update(email_key=None, username_key=None)
+        User.objects.filter(pk=other.pk).update(username='ADAPLUG', email_key=None, username_key=None)
+        err = StringIO()
+        call_command('backfill_identity_keys', batch_size=1, stdout=StringIO(), stderr=err)
+        keys = dict(User.objects.values_list('email', 'username_key'))
+        self.assertEqual(sorted(filter(None, keys.values())), ['adaplug'])
+        self.assertIn("already belongs to another account", err.getvalue())
+        self.assertEqual(User.objects.get(pk=other.pk).email_key, 'ada2@tribe.com')
+
+    def test_migration_logs_collisions(self):
+        migration = import_module('users.migrations.0006_identity_keys')
+        other = User.objects.create_user(email="ada2@tribe.com", username="someone", password="x")
+        User.objects.filter(pk__in=[self.user.pk, other.pk]).update(username_key=None)
+        User.objects.filter(pk=other.pk).update(username='ADAPLUG')
+        with self.assertLogs(migration.__name__, 'WARNING') as logs:
+            migration.backfill(apps, None)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("username_key 'adaplug' already belongs to another account", logs.output[0])
+
+    def test_case_only_duplicates_can_save_and_log_in(self):
+        # A legacy account whose email differs from another's only by case, as the backfill leaves it.
+        twin = User.objects.create_user(email="ada-twin@tribe.com", username="adatwin", password="twin-pass")
+        User.objects.filter(pk=twin.pk).update(email="ADA@TRIBE.COM", email_key=None)
+        twin = User.objects.get(pk=twin.pk)
+
+        twin.has_greencheck = True
+        twin.save()
+        twin.set_password("twin-pass")
+        twin.save()
+        self.assertIsNone(User.objects.get(pk=twin.pk).email_key)
+
+        response = self.client.post('/api/users/login/', {'username': "ADA@TRIBE.COM", 'password': 'twin-pass'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], "ADA@TRIBE.COM")
+        self.assertEqual(self.login("ada@tribe.com").json()['user']['email'], self.user.email)
+
+
+class AsyncAuthViewTests(APITestCase):
+    def setUp(self):
+        self.institution = Institution.objects.create(name="University of Lagos", slug="unilag")
+
+    def register(self, **extra):
+        return self.client.post('/api/users/register/', {
+            'email': 'New.Plug@Tribe.com', 'username': 'newplug', 'password': 's3cret-pass',
+            'institution': self.institution.id, **extra,
+        }, format='json')
+
+    def test_register_hashes_in_the_pool_and_opens_the_plug_store(self):
+        response = self.register(is_plug=True)
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email='new.plug@tribe.com')
+        self.assertTrue(user.check_password('s3cret-pass'))
+        self.assertEqual(user.store.institution, self.institution)
+        self.assertEqual(response.json()['token'], Token.objects.get(user=user).key)
+
+    def test_register_reports_validation_errors(self):
+        self.register()
+        response = self.register(email='NEW.PLUG@tribe.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_saturated_pool_turns_requests_away(self):
+        User.objects.create_user(email="ada@tribe.com", username="ada", password="s3cret-pass")
+        limit, hashing.pool.max_pending = hashing.pool.max_pending, 0
+        try:
+            response = self.client.post('/api/users/login/', {'username': 'ada', 'password': 's3cret-pass'}, format='json')
+        finally:
+            hashing.pool.max_pending = limit
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+
+
+class VerificationQueueTests(APITestCase):
+    def test_council_queue_filters_on_status_server_side(self):
+        council = User.objects.create(email="council@tribe.com", username="council", is_staff=True, is_superuser=True)
+        for n in range(60):
+            citizen = User.objects.create(email=f"c{n}@tribe.com", username=f"c{n}")
+            VerificationRequest.objects.create(user=citizen, matric_no=str(n), status='PENDING' if n < 3 else 'APPROVED')
+        self.client.force_authenticate(council)
+        page = self.client.get('/api/users/verifications/', {'status': 'pending'}).json()
+        self.assertEqual(sorted(request['matric_no'] for request in page['results']), ['0', '1', '2'])
+        self.assertIsNone(page['next'])
@@ -1,67 +1,116 @@
+import json
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from core.uploads import BoundedUploadMixin
+from . import hashing
+from .models import identity_key
 from .serializers import UserSerializer, RegisterSerializer, SuperAdminRegisterSerializer
 
 User = get_user_model()
 
-class RegisterView(generics.CreateAPIView):
-    # ... existing code ...
-    queryset = User.objects.all()
-    permission_classes = (permissions.AllowAny,)
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def overloaded():
+    return JsonResponse(
+        {"detail": "Too many sign-ins right now. Please try again in a moment."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '2'},
+    )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAuthView(View):
+    """
+    Base for the async auth endpoints. Password hashing runs in the bounded pool from
+    users.hashing, so a rush of sign-ups queues there (or is turned away with 503)
+    instead of tying up request workers. Served natively under asgi.py.
+    """
+    http_method_names = ['post', 'options']
+
+
+class RegisterView(AsyncAuthView):
     serializer_class = RegisterSerializer
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
+    async def post(self, request, *args, **kwargs):
+        data = request_data(request)
+        if data is None:
+            return JsonResponse({"detail": "Malformed request body."}, status=status.HTTP_400_BAD_REQUEST)
+        if hashing.pool.saturated():
+            return overloaded()
+        serializer = self.serializer_class(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            password_hash = await hashing.make_password(serializer.validated_data['password'])
+        except hashing.Overloaded:
+            return overloaded()
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+        token, created = await Token.objects.aget_or_create(user=user)
+        return JsonResponse({
             "user": UserSerializer(user).data,
             "token": token.key
         }, status=status.HTTP_201_CREATED)
 
-class SuperAdminRegisterView(generics.CreateAPIView):
-    queryset = User.objects.all()
-    permission_classes = (permissions.AllowAny,)
+class SuperAdminRegisterView(RegisterView):
     serializer_class = SuperAdminRegisterSerializer
 
-    def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({
-            "user": UserSerializer(user).data,
-            "token": token.key
-        }, status=status.HTTP_201_CREATED)
-
-class LoginView(ObtainAuthToken):
-    def post(self, request, *args, **kwargs):
-        identity = request.data.get('username', '').strip()
-        password = request.data.get('password', '')
-        
-        print(f"[AUTH DEBUG] Login attempt for identity: '{identity}'")
-        
-        # Try finding the user by email first (normalized)
-        user = User.objects.filter(email__iexact=identity.lower()).first()
-        
-        # If not found by email, try by username
-        if not user:
-            user = User.objects.filter(username__iexact=identity).first()
-            
-        if user and user.check_password(password):
-            print(f"[AUTH DEBUG] Auth successful for: {user.email}")
-            token, created = Token.objects.get_or_create(user=user)
-            return Response({
+class LoginView(AsyncAuthView):
+    async def post(self, request, *args, **kwargs):
+        if hashing.pool.saturated():
+            # Turn the request away before it costs a lookup.
+            return overloaded()
+        data = request_data(request) or {}
+        typed = str(data.get('username', '')).strip()
+        identity = identity_key(typed)
+        password = str(data.get('password', ''))
+
+        # One lookup over both unique keys; an email match wins over someone's username.
+        user = None
+        if identity:
+            matches = User.objects.select_related('institution').filter(Q(email_key=identity) | Q(username_key=identity))[:2]
+            user = min([match async for match in matches], key=lambda match: match.email_key != identity, default=None)
+            if user is None or typed not in (user.email, user.username):
+                # Legacy accounts that differ from another only by case have no key (see
+                # CustomUser.free_key): match those the old way, preferring the exact spelling.
+                legacy = User.objects.select_related('institution').filter(
+                    Q(email_key__isnull=True, email__iexact=identity) | Q(username_key__isnull=True, username__iexact=identity)
+                )[:5]
+                legacy = [match async for match in legacy]
+                exact = [match for match in legacy if typed in (match.email, match.username)]
+                if exact:
+                    user = exact[0]
+                elif user is None and legacy:
+                    user = min(legacy, key=lambda match: match.email.lower() != identity)
+
+        try:
+            verified = user is not None and await hashing.check_password(user, password)
+        except hashing.Overloaded:
+            return overloaded()
+
+        if verified:
+            token, created = await Token.objects.aget_or_create(user=user)
+            return JsonResponse({
                 "user": UserSerializer(user).data,
                 "token": token.key
             })
-        
-        print(f"[AUTH DEBUG] Auth failed for identity: '{identity}'")
-        return Response({"non_field_errors": ["Invalid credentials. Check your email/username and password."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({"non_field_errors": ["Invalid credentials. Check your email/username and password."]}, status=status.HTTP_400_BAD_REQUEST)
 
 from django.conf import settings
 
@@ -85,26 +134,47 @@ class SuperAdminLoginView(ObtainAuthToken):
             "token": token.key
         })
 
-class ProfileView(generics.RetrieveUpdateAPIView):
+class ProfileView(BoundedUploadMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # The authenticated user may come from the token cache, a little behind the row;
+        # saving it would write those stale fields (greencheck, staff) back over newer ones.
+        return User.objects.select_related('institution').get(pk=self.request.user.pk)
 
 from .models import VerificationRequest
 from .serializers import VerificationRequestSerializer
 from rest_framework import viewsets, decorators
-
-class VerificationRequestViewSet(viewsets.ModelViewSet):
+from core.pagination import KeysetCursorPagination
+from core.sync import DeltaSyncMixin
+
+class VerificationRequestViewSet(BoundedUploadMixin, DeltaSyncMixin, viewsets.ModelViewSet):
+    """
+    Mandate requests; the Council sees all of them. Filter with `?status=` (e.g. PENDING
+    for the Council queue). Pass `?since=` for incremental sync (see core.sync).
+    """
     queryset = VerificationRequest.objects.all()
     serializer_class = VerificationRequestSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
+        queryset = VerificationRequest.objects.select_related('user__store__institution')
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+        state = self.request.query_params.get('status')
+        if state and self.action == 'list':
+            queryset = queryset.filter(status=state.upper())
+        return queryset
+
+    def get_tombstones(self):
+        tombstones = super().get_tombstones()
         if self.request.user.is_superuser:
-            return VerificationRequest.objects.all()
-        return VerificationRequest.objects.filter(user=self.request.user)
+            return tombstones
+        return tombstones.filter(scope_id=str(self.request.user.pk))
 
     def perform_create(self, serializer):
         # Check if user already has a pending or approved request